@@ -1,21 +1,37 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr, Field
+from typing import Optional
 import grpc
-import pika
-import json
+import hmac
 import os
-from zeep import Client
-from zeep.transports import Transport
-from requests import Session
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import logging
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from metrics import DOWNSTREAM_LATENCY, GrpcLatencyInterceptor, RequestMetricsMiddleware
+import tracing
+import logsetup
+import profiling
+from order_cache import OrderCache, OrderEventListener
+from replay_cache import KeyReused, ReplayCache
+from resilience import (
+    DeadlineExceeded, DeadlineMiddleware, Downstream, Overloaded,
+    breaker_from_env, bulkhead_from_env, remaining
+)
 
 #  HATEOAS gen needs base URL
 API_GATEWAY_URL = os.getenv("API_GATEWAY_URL", "http://localhost:8000")
 
 # Setup logger
-logging.basicConfig(level=logging.INFO)
+logsetup.setup()
 logger = logging.getLogger(__name__)
+# backend errors repeat on every request during an outage, rate limited per message
+error_log = logsetup.Sampled(logger)
 
 # Import gRPC
 try:
@@ -23,10 +39,84 @@ try:
     import order_pb2_grpc
     GRPC_AVAILABLE = True
 except ImportError as e:
-    logger.warning(f"gRPC modules not available: {e}")
+    logger.warning("gRPC modules not available: %s", e)
     GRPC_AVAILABLE = False
 
-app = FastAPI(title="Order System API Gateway")
+# Config
+SOAP_SERVICE_URL = os.getenv("SOAP_SERVICE_URL", "http://product-validator:8080/ws/ProductValidator?wsdl")
+GRPC_SERVICE_HOST = os.getenv("GRPC_SERVICE_HOST", "order-processor")
+GRPC_SERVICE_PORT = os.getenv("GRPC_SERVICE_PORT", "50051")
+PRODUCTS_CACHE_TTL = float(os.getenv("PRODUCTS_CACHE_TTL", "30"))
+# upper bound for a single SOAP call / WSDL fetch, the request budget may cut it shorter
+SOAP_TIMEOUT = float(os.getenv("SOAP_TIMEOUT", "5"))
+# order views kept by the gateway (see order_cache.py), 0 turns the cache off
+ORDER_CACHE_SIZE = int(os.getenv("ORDER_CACHE_SIZE", "10000"))
+# staleness bound for a view whose order events got lost
+ORDER_CACHE_TTL = float(os.getenv("ORDER_CACHE_TTL", "30"))
+# POST /orders results kept by Idempotency-Key (see replay_cache.py), and for how long
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# POST /admin/profile answers 404 unless set, callers send it as X-Admin-Token
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# how long each warm-up step may take before /ready gives up waiting for it
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "10"))
+# executor threads beyond the bulkhead limits: a call cut off by its deadline or
+# a hedge's losing attempt gives its slot back while its thread still runs
+EXECUTOR_SPARE_WORKERS = int(os.getenv("EXECUTOR_SPARE_WORKERS", "8"))
+# algorithms order-processor may compress responses with, advertised in
+# grpc-accept-encoding (gzip, deflate; empty: uncompressed only)
+GRPC_ACCEPT_COMPRESSION = os.getenv("GRPC_ACCEPT_COMPRESSION", "gzip,deflate")
+# largest gRPC response taken in, a 100k-order listing is above gRPC's 4 MB default
+GRPC_MAX_RECEIVE_MB = int(os.getenv("GRPC_MAX_RECEIVE_MB", "64"))
+
+# gRPC codes that mean the processor is in trouble (trip the breaker), not a bad request
+GRPC_BACKEND_FAILURES = {
+    grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.INTERNAL, grpc.StatusCode.UNKNOWN
+}
+
+def is_grpc_failure(exc) -> bool:
+    if isinstance(exc, grpc.RpcError):
+        return exc.code() in GRPC_BACKEND_FAILURES
+    return True
+
+# one bulkhead + breaker per backend - a slow validator can only use up its own slots
+# (AMQP is published by order-processor's outbox, the gateway has no broker calls)
+soap_backend = Downstream(
+    "soap", bulkhead_from_env("soap", limit=16, max_queue=32), breaker_from_env("soap"), timeout=SOAP_TIMEOUT
+)
+grpc_backend = Downstream(
+    "grpc", bulkhead_from_env("grpc", limit=32, max_queue=64), breaker_from_env("grpc"),
+    is_failure=is_grpc_failure
+)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # blocking backend calls run in the default executor, sized so every bulkhead fits
+    workers = soap_backend.bulkhead.max_limit + grpc_backend.bulkhead.max_limit + EXECUTOR_SPARE_WORKERS
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backend"))
+    # the port is served (and /health is live) while warm_up runs, /ready waits for it
+    warming = asyncio.create_task(warm_up())
+    # kill -USR1 works like POST /admin/profile with the PROFILE_* defaults
+    profiling.install_signal_handler()
+    listener = None
+    if ORDER_CACHE_SIZE > 0:
+        listener = order_events["listener"](order_cache)
+        listener.start()
+    yield
+    warming.cancel()
+    if listener is not None:
+        listener.stop()
+    if grpc_channel["raw"] is not None:
+        # frees an executor thread still waiting in connect_grpc
+        grpc_channel["ready"].cancel()
+        grpc_channel["raw"].close()
+        # a later startup in this process (tests) opens a fresh channel
+        grpc_channel.update(raw=None, stub=None, ready=None)
+
+
+app = FastAPI(title="Order System API Gateway", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,12 +125,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Config
-SOAP_SERVICE_URL = os.getenv("SOAP_SERVICE_URL", "http://product-validator:8080/ws/ProductValidator?wsdl")
-GRPC_SERVICE_HOST = os.getenv("GRPC_SERVICE_HOST", "order-processor")
-GRPC_SERVICE_PORT = os.getenv("GRPC_SERVICE_PORT", "50051")
-RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+app.add_middleware(tracing.TracingMiddleware)
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
 
 
 class OrderRequest(BaseModel):
@@ -70,49 +157,220 @@ def get_hateoas_links(order_id: str, current_status: str) -> dict:
     
     return links
 
+def order_view(order_id: str, status: str, product_id: str, email: str, quantity: int) -> dict:
+    return {
+        "order_id": order_id,
+        "status": status,
+        "product_id": product_id,
+        "email": email,
+        "quantity": quantity,
+        "_links": get_hateoas_links(order_id, status)
+    }
+
+def order_to_dict(o) -> dict:
+    # Protobuf OrderResponse -> JSON (Dict) + HATEOAS
+    return order_view(o.order_id, o.status, o.product_id, o.email, o.quantity)
+
+# OrderPageV2 status -> the status strings of OrderResponse ("STATUS_ON_DELIVERY" -> "on delivery")
+STATUS_V2_NAMES = (
+    {value: name[len("STATUS_"):].lower().replace("_", " ") for name, value in order_pb2.Status.items()}
+    if GRPC_AVAILABLE else {}
+)
+# the OrderPageV2 columns the views are built from
+LISTING_V2_MASK = ("status", "product", "email", "quantity")
+
+def page_v2_to_dicts(page) -> list:
+    # OrderPageV2 (columns) -> the same views as order_to_dict
+    names, products, emails = STATUS_V2_NAMES, list(page.products), list(page.emails)
+    return [
+        order_view(f"ORD-{key:016X}", names[status], products[product], emails[email], quantity)
+        for key, status, product, email, quantity in zip(page.ids, page.status, page.product, page.email, page.quantity)
+    ]
+
+def with_status(view: dict, status: str) -> dict:
+    # cached order view after an order event
+    return {**view, "status": status, "_links": get_hateoas_links(view["order_id"], status)}
+
+order_cache = OrderCache(ORDER_CACHE_SIZE, ORDER_CACHE_TTL, with_status)
+idempotent_orders = ReplayCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL)
+# what feeds the cache its order events, embedded mode swaps in its in-process feed
+order_events = {"listener": OrderEventListener}
+
+# one channel for the whole process (opened by warm_up), gRPC reconnects it on its own;
+# embedded mode puts an in-process stub here instead
+grpc_channel = {"raw": None, "stub": None, "ready": None}
+
+# False once order-processor answered a v2 listing with UNIMPLEMENTED (an older
+# processor), listings use the v1 messages from then on
+listing_v2 = {"supported": True}
+
+# grpc_compression_algorithm bits
+GRPC_COMPRESSION_BITS = {"deflate": 1 << 1, "gzip": 1 << 2}
+
+def accepted_algorithms(names: str) -> int:
+    """grpc.compression_enabled_algorithms_bitset for a comma separated list, identity is always accepted"""
+    accepted = 1
+    for name in filter(None, (n.strip().lower() for n in names.split(","))):
+        if name not in GRPC_COMPRESSION_BITS:
+            raise ValueError(
+                f"GRPC_ACCEPT_COMPRESSION: unknown algorithm {name!r}, "
+                f"allowed: {', '.join(sorted(GRPC_COMPRESSION_BITS))}"
+            )
+        accepted |= GRPC_COMPRESSION_BITS[name]
+    return accepted
+
+# checked once at startup, not on every channel build
+GRPC_ACCEPTED_ALGORITHMS = accepted_algorithms(GRPC_ACCEPT_COMPRESSION)
+
+def grpc_channel_options() -> list:
+    return [
+        ("grpc.compression_enabled_algorithms_bitset", GRPC_ACCEPTED_ALGORITHMS),
+        ("grpc.max_receive_message_length", GRPC_MAX_RECEIVE_MB * 1024 * 1024),
+    ]
+
 def get_grpc_stub():
-    channel = grpc.insecure_channel(f"{GRPC_SERVICE_HOST}:{GRPC_SERVICE_PORT}")
-    return order_pb2_grpc.OrderProcessorStub(channel), channel
+    if grpc_channel["stub"] is None:
+        raw = grpc.insecure_channel(f"{GRPC_SERVICE_HOST}:{GRPC_SERVICE_PORT}", options=grpc_channel_options())
+        channel = grpc.intercept_channel(raw, GrpcLatencyInterceptor(), tracing.GrpcClientTracingInterceptor())
+        grpc_channel["ready"] = grpc.channel_ready_future(raw)
+        grpc_channel["raw"], grpc_channel["stub"] = raw, order_pb2_grpc.OrderProcessorStub(channel)
+    return grpc_channel["stub"]
 
-def send_notification_rabbitmq(order_id: str, email: str, status: str):
+def grpc_call(method: str, request):
+    # blocking, run through grpc_backend; the remaining budget becomes the gRPC deadline
     try:
-        credentials = pika.PlainCredentials('guest', 'guest')
-        params = pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials)
-        connection = pika.BlockingConnection(params)
-        channel = connection.channel()
-        channel.queue_declare(queue='notifications', durable=True)
-        
-        message = {
-            "order_id": order_id,
-            "email": email,
-            "type": "status_update",
-            "new_status": status
-        }
-        
-        channel.basic_publish(
-            exchange='',
-            routing_key='notifications',
-            body=json.dumps(message)
-        )
-        connection.close()
-    except Exception as e:
-        logger.error(f"RabbitMQ Error: {e}")
+        return getattr(get_grpc_stub(), method)(request, timeout=remaining())
+    except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+            raise DeadlineExceeded(f"{method} deadline exceeded") from e
+        raise
+
+def connect_grpc(timeout: float):
+    get_grpc_stub()
+    grpc_channel["ready"].result(timeout=timeout)
+
+def soap_timeout() -> float:
+    left = remaining()
+    return SOAP_TIMEOUT if left is None else min(left, SOAP_TIMEOUT)
+
+# parsed WSDL, fetched once (by warm_up or the first call) instead of on every call
+soap_wsdl = {"document": None}
+
+def soap_client(timeout: float):
+    """zeep client with its own transport (the call's timeout, trace headers) over the cached WSDL"""
+    # zeep + lxml are a good part of the import time and only needed here
+    from requests import Session
+    from zeep import Client
+    from zeep.transports import Transport
+
+    session = Session()
+    # validator sees the trace in its HTTP headers
+    tracing.inject(session.headers)
+    transport = Transport(session=session, timeout=timeout, operation_timeout=timeout)
+    if soap_wsdl["document"] is None:
+        client = Client(SOAP_SERVICE_URL, transport=transport)
+        soap_wsdl["document"] = client.wsdl
+        return client
+    return Client(soap_wsdl["document"], transport=transport)
+
+def validate_product_soap(product_id: str) -> bool:
+    from requests.exceptions import Timeout as RequestsTimeout
+
+    with tracing.span("soap.client/validateProduct", product_id=product_id):
+        start = time.perf_counter()
+        try:
+            return soap_client(soap_timeout()).service.validateProduct(product_id)
+        except RequestsTimeout as e:
+            raise DeadlineExceeded("validateProduct timed out") from e
+        finally:
+            DOWNSTREAM_LATENCY.labels("soap", "validateProduct").observe(time.perf_counter() - start)
+
+# catalog changes rarely, cached so /products does not depend on gRPC + SOAP per request;
+# the last catalog / listing is also the fallback while the processor is failing
+products_cache = {"data": None, "expires": 0.0}
+orders_cache = {"data": None}
+
+STALE_HEADERS = {"Warning": '110 - "Response is stale"'}
+
+# filled in by warm_up, /ready answers 503 until it is done
+readiness = {"ready": False, "checks": {}}
+
+async def warm_up():
+    """
+    Pays the cold-start costs before /ready reports ready: WSDL fetch + parse,
+    gRPC connection, product catalog. A failed step is recorded and left to the
+    first request (and the breakers) - a backend being down does not keep the
+    gateway out of rotation.
+    """
+    loop = asyncio.get_running_loop()
+    checks = readiness["checks"]
+    start = time.perf_counter()
+    # its own threads, a slow WSDL fetch or connect never holds one of the bulkheads'
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="warm-up")
+
+    async def step(name, fn, *args):
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                await fn(*args)
+            else:
+                await loop.run_in_executor(executor, fn, *args)
+            checks[name] = "ok"
+        except Exception as e:
+            logger.warning("Warm-up %s failed: %r", name, e)
+            checks[name] = f"failed: {type(e).__name__}"
+
+    steps = [step("soap_wsdl", soap_client, WARMUP_TIMEOUT)]
+    if GRPC_AVAILABLE:
+        steps.append(step("grpc_channel", connect_grpc, WARMUP_TIMEOUT))
+    try:
+        await asyncio.gather(*steps)
+    finally:
+        # not waiting: a step cut off by shutdown finishes in the background
+        executor.shutdown(wait=False)
+    if checks.get("grpc_channel") == "ok":
+        await step("products_cache", get_products)
+
+    readiness["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    readiness["ready"] = True
+    logger.info("Warm-up done in %ss: %s", readiness["warmup_seconds"], checks)
 
 # --- Endpoints ---
 
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"{exc.downstream} overloaded, retry later"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.get("/health")
+async def health():
+    # liveness: the process serves requests, whatever the backends do
+    return {"status": "healthy"}
+
+@app.get("/ready")
+async def ready():
+    body = {"status": "ready" if readiness["ready"] else "warming up", **readiness}
+    return JSONResponse(body, status_code=200 if readiness["ready"] else 503)
+
 @app.get("/products")
 async def get_products():
     """
     Frontend - Gateway - gRPC - SOAP - gRPC - Gateway - Frontend
     """
+    if products_cache["data"] is not None and time.monotonic() < products_cache["expires"]:
+        return products_cache["data"]
+
     if not GRPC_AVAILABLE:
         raise HTTPException(status_code=503, detail="gRPC unavailable")
     
     try:
-        stub, channel = get_grpc_stub()
-
-        response = stub.GetAvailableProducts(order_pb2.Empty())
-        channel.close()
+        response = await grpc_backend.call(grpc_call, "GetAvailableProducts", order_pb2.Empty(), hedge="GetAvailableProducts")
         
         # Protobuf -> JSON (Dict)
         products_data = []
@@ -123,95 +381,188 @@ async def get_products():
                 "icon": p.icon
             })
             
-        return {"products": products_data}
+        products_cache["data"] = {"products": products_data}
+        products_cache["expires"] = time.monotonic() + PRODUCTS_CACHE_TTL
+        return products_cache["data"]
         
-    except grpc.RpcError as e:
-        logger.error(f"gRPC Error: {e}")
+    except (grpc.RpcError, Overloaded, DeadlineExceeded) as e:
+        error_log.error("gRPC Error: %s", e)
+        if products_cache["data"] is not None:
+            return JSONResponse(products_cache["data"], headers=STALE_HEADERS)
+        if not isinstance(e, grpc.RpcError):
+            raise
         raise HTTPException(status_code=503, detail="Could not fetch products")
 
+async def list_orders(method: str, request_v1, request_v2):
+    """
+    Order views and next_before of a listing RPC: the v2 call (OrderPageV2) while
+    the processor has it, method itself with request_v1 otherwise.
+    """
+    if listing_v2["supported"]:
+        try:
+            page = await grpc_backend.call(grpc_call, f"{method}V2", request_v2, hedge=method)
+            return page_v2_to_dicts(page), page.next_before
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+            logger.warning("order-processor has no %sV2, listing with the v1 messages", method)
+            listing_v2["supported"] = False
+    response = await grpc_backend.call(grpc_call, method, request_v1, hedge=method)
+    return [order_to_dict(o) for o in response.orders], getattr(response, "next_before", "")
+
+async def list_orders_page(limit: Optional[int], before: Optional[str], since: Optional[str]) -> dict:
+    bounds = {"limit": limit or 0, "before": before or "", "since": since or ""}
+    try:
+        orders, next_before = await list_orders(
+            "ListOrders", order_pb2.ListOrdersRequest(**bounds),
+            order_pb2.ListOrdersV2Request(**bounds, read_mask={"paths": LISTING_V2_MASK})
+        )
+    except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+            raise HTTPException(status_code=400, detail=e.details())
+        error_log.error("gRPC List Error: %s", e)
+        raise HTTPException(status_code=503, detail="Could not fetch order list")
+
+    page = {"orders": orders, "_links": {}}
+    if next_before:
+        query = f"before={next_before}" + (f"&limit={limit}" if limit else "")
+        page["_links"]["next"] = {"href": f"{API_GATEWAY_URL}/orders?{query}"}
+    return page
+
+# most IDs one GET /orders?ids= may ask for (the processor's cap as well)
+MAX_ORDER_IDS = 1000
+
+async def get_orders_by_id(ids: str) -> dict:
+    order_ids = [order_id for order_id in ids.split(",") if order_id]
+    if len(order_ids) > MAX_ORDER_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ORDER_IDS} order ids")
+
+    try:
+        response = await grpc_backend.call(
+            grpc_call, "GetOrders", order_pb2.OrderIdsRequest(order_ids=order_ids), hedge="GetOrders"
+        )
+    except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+            raise HTTPException(status_code=400, detail=e.details())
+        error_log.error("gRPC GetOrders Error: %s", e)
+        raise HTTPException(status_code=503, detail="Could not fetch orders")
+
+    return {"orders": [order_to_dict(o) for o in response.orders], "not_found": list(response.not_found)}
+
 @app.get("/orders")
-async def get_all_orders():
+async def get_all_orders(limit: Optional[int] = Query(None, ge=1, le=1000), before: Optional[str] = None, since: Optional[str] = None,
+                         ids: Optional[str] = None):
     if not GRPC_AVAILABLE:
         return {"orders": []}
+
+    if ids is not None:
+        # comma-separated order IDs, one round trip for all of them
+        return await get_orders_by_id(ids)
+
+    if limit or before or since:
+        # newest first, a page at a time (order IDs are time-ordered)
+        return await list_orders_page(limit, before, since)
         
     try:
-        stub, channel = get_grpc_stub()
-        response = stub.GetAllOrders(order_pb2.Empty())
-        channel.close()
+        orders, _ = await list_orders("GetAllOrders", order_pb2.Empty(), order_pb2.ListOrdersV2Request(read_mask={"paths": LISTING_V2_MASK}))
         
-        orders_data = []
-        for o in response.orders:
-            orders_data.append({
-                "order_id": o.order_id,
-                "status": o.status,
-                "product_id": o.product_id,
-                "email": o.email,
-                "quantity": o.quantity,
-                # HATEOAS 
-                "_links": get_hateoas_links(o.order_id, o.status)
-            })
-            
-        return {"orders": orders_data}
+        orders_cache["data"] = {"orders": orders}
+        return orders_cache["data"]
         
     except Exception as e:
-        logger.error(f"gRPC List Error: {e}")
+        error_log.error("gRPC List Error: %s", e)
+        if orders_cache["data"] is not None:
+            return JSONResponse(orders_cache["data"], headers=STALE_HEADERS)
+        if isinstance(e, (Overloaded, DeadlineExceeded)):
+            raise
         raise HTTPException(status_code=503, detail="Could not fetch order list")
 
 @app.post("/orders", response_model=OrderResponse, status_code=201)
-async def create_order(order: OrderRequest):
+async def create_order(order: OrderRequest, idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255)):
+    if idempotency_key is None:
+        return await place_order(order, "")
+    try:
+        return await idempotent_orders.run(
+            idempotency_key, (order.product_id, order.email, order.quantity),
+            lambda: place_order(order, idempotency_key)
+        )
+    except KeyReused:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was used for a different order")
+
+async def place_order(order: OrderRequest, idempotency_key: str):
     try:
-        session = Session()
-        transport = Transport(session=session)
-        soap_client = Client(SOAP_SERVICE_URL, transport=transport)
-        is_valid = soap_client.service.validateProduct(order.product_id)
+        is_valid = await soap_backend.call(validate_product_soap, order.product_id)
         if not is_valid:
             raise HTTPException(status_code=400, detail="Product unavailable")
+    except (Overloaded, DeadlineExceeded):
+        raise
     except Exception as e:
-        logger.error(f"SOAP Validation fail: {e}")
+        error_log.error("SOAP Validation fail: %s", e)
 
         if isinstance(e, HTTPException): raise e
         raise HTTPException(status_code=503, detail="Validator unavailable")
 
     # przetwarzanie grpc
     try:
-        stub, channel = get_grpc_stub()
         grpc_req = order_pb2.OrderRequest(
             product_id=order.product_id,
             email=order.email,
-            quantity=order.quantity
+            quantity=order.quantity,
+            idempotency_key=idempotency_key
         )
-        response = stub.ProcessOrder(grpc_req)
-        channel.close()
+        response = await grpc_backend.call(grpc_call, "ProcessOrder", grpc_req)
     except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.FAILED_PRECONDITION:
+            raise HTTPException(status_code=409, detail=e.details())
+        if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+            raise HTTPException(status_code=400, detail=e.details())
+        # the processor's own idempotency store: key reused / first request still running
+        if e.code() == grpc.StatusCode.ALREADY_EXISTS:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was used for a different order")
+        if e.code() == grpc.StatusCode.ABORTED:
+            raise HTTPException(status_code=409, detail=e.details())
         raise HTTPException(status_code=500, detail=f"Order processing failed: {e}")
 
-    # RabbitMQ
-    send_notification_rabbitmq(response.order_id, order.email, "created")
+    # notification is published by order-processor (outbox)
+
+    view = order_to_dict(response)
+    order_cache.write_through(response.order_id, view, response.status)
+    return view
+
+# declared before /orders/{order_id} so "stats" is not taken for an order ID
+@app.get("/orders/stats")
+async def get_order_stats():
+    """Counts per status, per product and per creation time bucket, kept by the processor"""
+    try:
+        response = await grpc_backend.call(grpc_call, "GetOrderStats", order_pb2.Empty(), hedge="GetOrderStats")
+    except grpc.RpcError as e:
+        error_log.error("gRPC Stats Error: %s", e)
+        raise HTTPException(status_code=503, detail="Could not fetch order stats")
 
     return {
-        "order_id": response.order_id,
-        "status": response.status,
-        "product_id": response.product_id,
-        "email": response.email,
-        "quantity": response.quantity,
-        "_links": get_hateoas_links(response.order_id, response.status)
+        "total": response.total,
+        "by_status": dict(response.by_status),
+        "by_product": dict(response.by_product),
+        "bucket_seconds": response.bucket_seconds,
+        "created": [{"start": b.start, "count": b.count} for b in response.created],
+        "_links": {"all-orders": {"href": f"{API_GATEWAY_URL}/orders"}}
     }
 
 @app.get("/orders/{order_id}")
 async def get_order_details(order_id: str):
+    cached = order_cache.get(order_id)
+    if cached is not None:
+        return cached
+
+    version = order_cache.version()
     try:
-        stub, channel = get_grpc_stub()
-        response = stub.GetOrderStatus(order_pb2.OrderIdRequest(order_id=order_id))
-        channel.close()
-        
-        return {
-            "order_id": response.order_id,
-            "status": response.status,
-            "product_id": response.product_id,
-            "email": response.email,
-            "quantity": response.quantity,
-            "_links": get_hateoas_links(response.order_id, response.status)
-        }
+        response = await grpc_backend.call(
+            grpc_call, "GetOrderStatus", order_pb2.OrderIdRequest(order_id=order_id), hedge="GetOrderStatus"
+        )
+
+        view = order_to_dict(response)
+        order_cache.put(order_id, view, response.status, version)
+        return view
     except grpc.RpcError as e:
         if e.code() == grpc.StatusCode.NOT_FOUND:
             raise HTTPException(status_code=404, detail="Order not found")
@@ -228,12 +579,9 @@ async def cancel_order_get_helper(order_id: str):
 @app.delete("/orders/{order_id}/cancel")
 async def cancel_order(order_id: str):
     try:
-        stub, channel = get_grpc_stub()
-        response = stub.CancelOrder(order_pb2.OrderIdRequest(order_id=order_id))
-        channel.close()
-        
-        send_notification_rabbitmq(response.order_id, response.email, "cancelled")
-        
+        response = await grpc_backend.call(grpc_call, "CancelOrder", order_pb2.OrderIdRequest(order_id=order_id))
+        order_cache.write_through(response.order_id, order_to_dict(response), response.status)
+
         return {
             "message": "Order cancelled successfully",
             "order_id": response.order_id,
@@ -245,6 +593,24 @@ async def cancel_order(order_id: str):
              raise HTTPException(status_code=404, detail="Order not found")
         raise HTTPException(status_code=500, detail="Cancel failed")
 
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.post("/admin/profile")
+async def capture_profile(seconds: float = Query(10, gt=0, le=profiling.MAX_SECONDS),
+                          slow_ms: float = Query(profiling.PROFILE_SLOW_MS, ge=0),
+                          x_admin_token: Optional[str] = Header(None)):
+    """Samples live traffic for `seconds`, answers with the profile files (see profiling.py)"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    try:
+        return await asyncio.wrap_future(profiling.start_capture(seconds, slow_ms))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @app.get("/")
 async def root():
     return {
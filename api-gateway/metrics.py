@@ -0,0 +1,98 @@
+import time
+
+import grpc
+from prometheus_client import Counter, Gauge, Histogram
+
+import profiling
+
+# sub-millisecond buckets, most hops inside the compose network are fast
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUESTS = Counter(
+    "gateway_requests_total", "HTTP requests by route and status",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "gateway_request_latency_seconds", "HTTP request latency by route",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+DOWNSTREAM_LATENCY = Histogram(
+    "gateway_downstream_latency_seconds", "Latency of calls to SOAP / gRPC backends",
+    ["target", "method"], buckets=LATENCY_BUCKETS
+)
+BULKHEAD_IN_FLIGHT = Gauge(
+    "gateway_bulkhead_in_flight", "Calls currently running against a downstream",
+    ["downstream"]
+)
+BULKHEAD_LIMIT = Gauge(
+    "gateway_bulkhead_limit", "Current concurrency limit per downstream (moves with AIMD)",
+    ["downstream"]
+)
+BREAKER_STATE = Gauge(
+    "gateway_breaker_state", "Circuit breaker per backend: 0 closed, 1 open, 2 half-open",
+    ["downstream"]
+)
+HEDGED_CALLS = Counter(
+    "gateway_hedged_calls_total", "Idempotent reads that got a second attempt after the p95 delay",
+    ["downstream", "method"]
+)
+BULKHEAD_SHED = Counter(
+    "gateway_shed_total", "Requests rejected with 503 because a downstream bulkhead was full",
+    ["downstream"]
+)
+ORDER_CACHE_LOOKUPS = Counter(
+    "gateway_order_cache_lookups_total", "Order reads answered from the gateway's order cache (hit) or not (miss)",
+    ["result"]
+)
+ORDER_CACHE_ENTRIES = Gauge(
+    "gateway_order_cache_entries", "Order views currently cached in the gateway"
+)
+IDEMPOTENT_REPLAYS = Counter(
+    "gateway_idempotent_replays_total",
+    "POST /orders answered with the result of an earlier request with the same Idempotency-Key (stored or in flight)",
+    ["source"]
+)
+
+
+class RequestMetricsMiddleware:
+    """Plain ASGI middleware (cheaper than BaseHTTPMiddleware), labels by route template, not raw path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], path).observe(elapsed)
+            REQUESTS.labels(scope["method"], path, str(status)).inc()
+            # only while a profile capture runs
+            slow_calls = profiling.slow_calls
+            if slow_calls is not None:
+                slow_calls.record(f"{scope['method']} {path}", elapsed)
+
+
+class GrpcLatencyInterceptor(grpc.UnaryUnaryClientInterceptor):
+    """Times every OrderProcessorStub call, blocking and .future() alike"""
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        histogram = DOWNSTREAM_LATENCY.labels("grpc", client_call_details.method.rsplit("/", 1)[-1])
+        start = time.perf_counter()
+        call = continuation(client_call_details, request)
+        call.add_done_callback(lambda _: histogram.observe(time.perf_counter() - start))
+        return call
@@ -0,0 +1,199 @@
+"""
+Order views cached in the gateway, kept current by the processor's order events.
+
+An order changes only when it is created, cancelled or moved along its
+timeline, and order-processor's outbox publishes every one of those changes to
+the ORDER_EVENTS_EXCHANGE fanout. OrderEventListener subscribes to it and
+moves cached views forward, so GET /orders/{order_id} is answered without a
+gRPC call until the entry is evicted (LRU, ORDER_CACHE_SIZE) or expires
+(ORDER_CACHE_TTL, the bound for events that never arrive).
+
+The cache is only used while the subscription is up. Events missed during a
+disconnect cannot be replayed, so every (re)subscribe starts from an empty cache.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import ORDER_CACHE_LOOKUPS, ORDER_CACHE_ENTRIES
+
+logger = logging.getLogger("OrderCache")
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+# must match order-processor/outbox.py
+ORDER_EVENTS_EXCHANGE = "orders.events"
+
+# an order only moves forward: events older than the cached view are ignored
+STATUS_RANK = {"accepted": 0, "on delivery": 1, "delivered": 2, "cancelled": 3}
+
+CACHE_HITS = ORDER_CACHE_LOOKUPS.labels("hit")
+CACHE_MISSES = ORDER_CACHE_LOOKUPS.labels("miss")
+
+
+class OrderCache:
+    """
+    LRU of order views with a TTL. Reads from the processor are stored with the
+    version taken before the call; when an event for that order arrived in the
+    meantime the read may be older than the event and is not stored.
+    with_status(view, status) builds the view for a new status.
+    """
+
+    def __init__(self, max_size, ttl, with_status):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.with_status = with_status
+        self.live = False
+        self._lock = threading.Lock()
+        # order_id -> (view, status rank, expires)
+        self._entries = OrderedDict()
+        # order_id -> version of its last event, the most recent max_size orders
+        self._changed = OrderedDict()
+        self._version = 0
+        # version of the newest event forgotten from _changed
+        self._floor = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def version(self):
+        return self._version
+
+    def get(self, order_id):
+        if not self.live:
+            return None
+        with self._lock:
+            entry = self._entries.get(order_id)
+            if entry is not None and time.monotonic() >= entry[2]:
+                del self._entries[order_id]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(order_id)
+        if entry is None:
+            CACHE_MISSES.inc()
+            return None
+        CACHE_HITS.inc()
+        return entry[0]
+
+    def put(self, order_id, view, status, version):
+        """Stores a view read from the processor, version is version() from before the read"""
+        if not self.live:
+            return
+        with self._lock:
+            if version < self._floor or self._changed.get(order_id, 0) > version:
+                return
+            self._store(order_id, view, status)
+
+    def write_through(self, order_id, view, status):
+        """Stores a change the gateway made itself (reads still in flight lose to it)"""
+        if not self.live:
+            return
+        with self._lock:
+            self._mark_changed(order_id)
+            self._store(order_id, view, status)
+
+    def apply(self, order_id, status):
+        """Order event: moves the cached view forward"""
+        rank = STATUS_RANK.get(status)
+        with self._lock:
+            self._mark_changed(order_id)
+            entry = self._entries.get(order_id)
+            if entry is not None and rank is not None and rank > entry[1]:
+                self._entries[order_id] = (self.with_status(entry[0], status), rank, entry[2])
+
+    def subscribed(self):
+        with self._lock:
+            self._entries.clear()
+            # reads that started before the subscription may have missed events
+            self._version += 1
+            self._floor = self._version
+            self.live = True
+        ORDER_CACHE_ENTRIES.set(0)
+
+    def unsubscribed(self):
+        with self._lock:
+            self.live = False
+            self._entries.clear()
+        ORDER_CACHE_ENTRIES.set(0)
+
+    def _store(self, order_id, view, status):
+        # caller holds _lock
+        self._entries[order_id] = (view, STATUS_RANK.get(status, 0), time.monotonic() + self.ttl)
+        self._entries.move_to_end(order_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        ORDER_CACHE_ENTRIES.set(len(self._entries))
+
+    def _mark_changed(self, order_id):
+        # caller holds _lock
+        self._version += 1
+        self._changed[order_id] = self._version
+        self._changed.move_to_end(order_id)
+        while len(self._changed) > self.max_size:
+            _, forgotten = self._changed.popitem(last=False)
+            self._floor = forgotten
+
+
+def rabbitmq_connection():
+    # imported here, the gateway does not load pika unless the cache is on
+    import pika
+
+    credentials = pika.PlainCredentials('guest', 'guest')
+    params = pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials, heartbeat=600)
+    return pika.BlockingConnection(params)
+
+
+class OrderEventListener(threading.Thread):
+    """
+    Consumes ORDER_EVENTS_EXCHANGE through an exclusive queue (every gateway
+    replica gets every event) and feeds it to the cache. Reconnects with backoff;
+    while disconnected the cache is off and reads go to the processor.
+    """
+
+    def __init__(self, cache, connection_factory=rabbitmq_connection):
+        super().__init__(name="order-events", daemon=True)
+        self.cache = cache
+        self.connection_factory = connection_factory
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def on_message(self, ch, method, properties, body):
+        try:
+            event = json.loads(body)
+            self.cache.apply(event["order_id"], event["new_status"])
+        except (ValueError, KeyError) as e:
+            logger.warning("Bad order event %r: %s", body[:200], e)
+
+    def run(self):
+        backoff = 1
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = self.connection_factory()
+                channel = connection.channel()
+                channel.exchange_declare(exchange=ORDER_EVENTS_EXCHANGE, exchange_type="fanout")
+                queue = channel.queue_declare(queue="", exclusive=True, auto_delete=True).method.queue
+                channel.queue_bind(queue=queue, exchange=ORDER_EVENTS_EXCHANGE)
+                channel.basic_consume(queue=queue, on_message_callback=self.on_message, auto_ack=True)
+                # consuming before going live, no event falls between the two
+                self.cache.subscribed()
+                logger.info("Order cache subscribed to %s on %s", ORDER_EVENTS_EXCHANGE, RABBITMQ_HOST)
+                backoff = 1
+                while not self._stopped.is_set():
+                    connection.process_data_events(time_limit=1)
+            except Exception as e:
+                self.cache.unsubscribed()
+                logger.warning("Order cache off, event subscription failed: %s", e)
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                try:
+                    if connection is not None and connection.is_open:
+                        connection.close()
+                except Exception:
+                    pass
+        self.cache.unsubscribed()
@@ -12,29 +12,56 @@ from google.protobuf.internal import builder as _builder
 _sym_db = _symbol_database.Default()
 
 
+from google.protobuf import field_mask_pb2 as google_dot_protobuf_dot_field__mask__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0border.proto\x12\x05order\"\x07\n\x05\x45mpty\"C\n\x0cOrderRequest\x12\x12\n\nproduct_id\x18\x01 \x01(\t\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\x10\n\x08quantity\x18\x03 \x01(\x05\"\"\n\x0eOrderIdRequest\x12\x10\n\x08order_id\x18\x01 \x01(\t\"f\n\rOrderResponse\x12\x10\n\x08order_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x12\n\nproduct_id\x18\x03 \x01(\t\x12\r\n\x05\x65mail\x18\x04 \x01(\t\x12\x10\n\x08quantity\x18\x05 \x01(\x05\"1\n\x07Product\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04icon\x18\x03 \x01(\t\"/\n\x0bProductList\x12 \n\x08products\x18\x01 \x03(\x0b\x32\x0e.order.Product\"1\n\tOrderList\x12$\n\x06orders\x18\x01 \x03(\x0b\x32\x14.order.OrderResponse2\xb0\x02\n\x0eOrderProcessor\x12\x39\n\x0cProcessOrder\x12\x13.order.OrderRequest\x1a\x14.order.OrderResponse\x12\x38\n\x14GetAvailableProducts\x12\x0c.order.Empty\x1a\x12.order.ProductList\x12=\n\x0eGetOrderStatus\x12\x15.order.OrderIdRequest\x1a\x14.order.OrderResponse\x12:\n\x0b\x43\x61ncelOrder\x12\x15.order.OrderIdRequest\x1a\x14.order.OrderResponse\x12.\n\x0cGetAllOrders\x12\x0c.order.Empty\x1a\x10.order.OrderListb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0border.proto\x12\x05order\x1a google/protobuf/field_mask.proto\"\x07\n\x05\x45mpty\"\\\n\x0cOrderRequest\x12\x12\n\nproduct_id\x18\x01 \x01(\t\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\x10\n\x08quantity\x18\x03 \x01(\x05\x12\x17\n\x0fidempotency_key\x18\x04 \x01(\t\"\"\n\x0eOrderIdRequest\x12\x10\n\x08order_id\x18\x01 \x01(\t\"$\n\x0fOrderIdsRequest\x12\x11\n\torder_ids\x18\x01 \x03(\t\"f\n\rOrderResponse\x12\x10\n\x08order_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x12\n\nproduct_id\x18\x03 \x01(\t\x12\r\n\x05\x65mail\x18\x04 \x01(\t\x12\x10\n\x08quantity\x18\x05 \x01(\x05\"1\n\x07Product\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04icon\x18\x03 \x01(\t\"/\n\x0bProductList\x12 \n\x08products\x18\x01 \x03(\x0b\x32\x0e.order.Product\"1\n\tOrderList\x12$\n\x06orders\x18\x01 \x03(\x0b\x32\x14.order.OrderResponse\"A\n\x11ListOrdersRequest\x12\r\n\x05limit\x18\x01 \x01(\x05\x12\x0e\n\x06\x62\x65\x66ore\x18\x02 \x01(\t\x12\r\n\x05since\x18\x03 \x01(\t\"F\n\tOrderPage\x12$\n\x06orders\x18\x01 \x03(\x0b\x32\x14.order.OrderResponse\x12\x13\n\x0bnext_before\x18\x02 \x01(\t\"F\n\x0bOrderLookup\x12$\n\x06orders\x18\x01 \x03(\x0b\x32\x14.order.OrderResponse\x12\x11\n\tnot_found\x18\x02 \x03(\t\"*\n\nTimeBucket\x12\r\n\x05start\x18\x01 \x01(\x03\x12\r\n\x05\x63ount\x18\x02 \x01(\x03\"\xa4\x02\n\nOrderStats\x12\r\n\x05total\x18\x01 \x01(\x03\x12\x32\n\tby_status\x18\x02 \x03(\x0b\x32\x1f.order.OrderStats.ByStatusEntry\x12\x34\n\nby_product\x18\x03 \x03(\x0b\x32 .order.OrderStats.ByProductEntry\x12\x16\n\x0e\x62ucket_seconds\x18\x04 \x01(\x05\x12\"\n\x07\x63reated\x18\x05 \x03(\x0b\x32\x11.order.TimeBucket\x1a/\n\rByStatusEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x03:\x02\x38\x01\x1a\x30\n\x0e\x42yProductEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x03:\x02\x38\x01\"r\n\x13ListOrdersV2Request\x12\r\n\x05limit\x18\x01 \x01(\x05\x12\x0e\n\x06\x62\x65\x66ore\x18\x02 \x01(\t\x12\r\n\x05since\x18\x03 \x01(\t\x12-\n\tread_mask\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"\xb6\x01\n\x0bOrderPageV2\x12\x0b\n\x03ids\x18\x01 \x03(\x03\x12\x1d\n\x06status\x18\x02 \x03(\x0e\x32\r.order.Status\x12\x0f\n\x07product\x18\x03 \x03(\r\x12\r\n\x05\x65mail\x18\x04 \x03(\r\x12\x10\n\x08quantity\x18\x05 \x03(\x05\x12\x12\n\ncreated_at\x18\x06 \x03(\x03\x12\x10\n\x08products\x18\x07 \x03(\t\x12\x0e\n\x06\x65mails\x18\x08 \x03(\t\x12\x13\n\x0bnext_before\x18\t \x01(\t*y\n\x06Status\x12\x16\n\x12STATUS_UNSPECIFIED\x10\x00\x12\x13\n\x0fSTATUS_ACCEPTED\x10\x01\x12\x16\n\x12STATUS_ON_DELIVERY\x10\x02\x12\x14\n\x10STATUS_DELIVERED\x10\x03\x12\x14\n\x10STATUS_CANCELLED\x10\x04\x32\xd7\x04\n\x0eOrderProcessor\x12\x39\n\x0cProcessOrder\x12\x13.order.OrderRequest\x1a\x14.order.OrderResponse\x12\x38\n\x14GetAvailableProducts\x12\x0c.order.Empty\x1a\x12.order.ProductList\x12=\n\x0eGetOrderStatus\x12\x15.order.OrderIdRequest\x1a\x14.order.OrderResponse\x12\x37\n\tGetOrders\x12\x16.order.OrderIdsRequest\x1a\x12.order.OrderLookup\x12:\n\x0b\x43\x61ncelOrder\x12\x15.order.OrderIdRequest\x1a\x14.order.OrderResponse\x12.\n\x0cGetAllOrders\x12\x0c.order.Empty\x1a\x10.order.OrderList\x12\x38\n\nListOrders\x12\x18.order.ListOrdersRequest\x1a\x10.order.OrderPage\x12\x30\n\rGetOrderStats\x12\x0c.order.Empty\x1a\x11.order.OrderStats\x12@\n\x0eGetAllOrdersV2\x12\x1a.order.ListOrdersV2Request\x1a\x12.order.OrderPageV2\x12>\n\x0cListOrdersV2\x12\x1a.order.ListOrdersV2Request\x1a\x12.order.OrderPageV2b\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'order_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
-  _globals['_EMPTY']._serialized_start=22
-  _globals['_EMPTY']._serialized_end=29
-  _globals['_ORDERREQUEST']._serialized_start=31
-  _globals['_ORDERREQUEST']._serialized_end=98
-  _globals['_ORDERIDREQUEST']._serialized_start=100
-  _globals['_ORDERIDREQUEST']._serialized_end=134
-  _globals['_ORDERRESPONSE']._serialized_start=136
-  _globals['_ORDERRESPONSE']._serialized_end=238
-  _globals['_PRODUCT']._serialized_start=240
-  _globals['_PRODUCT']._serialized_end=289
-  _globals['_PRODUCTLIST']._serialized_start=291
-  _globals['_PRODUCTLIST']._serialized_end=338
-  _globals['_ORDERLIST']._serialized_start=340
-  _globals['_ORDERLIST']._serialized_end=389
-  _globals['_ORDERPROCESSOR']._serialized_start=392
-  _globals['_ORDERPROCESSOR']._serialized_end=696
+  _globals['_ORDERSTATS_BYSTATUSENTRY']._options = None
+  _globals['_ORDERSTATS_BYSTATUSENTRY']._serialized_options = b'8\001'
+  _globals['_ORDERSTATS_BYPRODUCTENTRY']._options = None
+  _globals['_ORDERSTATS_BYPRODUCTENTRY']._serialized_options = b'8\001'
+  _globals['_STATUS']._serialized_start=1339
+  _globals['_STATUS']._serialized_end=1460
+  _globals['_EMPTY']._serialized_start=56
+  _globals['_EMPTY']._serialized_end=63
+  _globals['_ORDERREQUEST']._serialized_start=65
+  _globals['_ORDERREQUEST']._serialized_end=157
+  _globals['_ORDERIDREQUEST']._serialized_start=159
+  _globals['_ORDERIDREQUEST']._serialized_end=193
+  _globals['_ORDERIDSREQUEST']._serialized_start=195
+  _globals['_ORDERIDSREQUEST']._serialized_end=231
+  _globals['_ORDERRESPONSE']._serialized_start=233
+  _globals['_ORDERRESPONSE']._serialized_end=335
+  _globals['_PRODUCT']._serialized_start=337
+  _globals['_PRODUCT']._serialized_end=386
+  _globals['_PRODUCTLIST']._serialized_start=388
+  _globals['_PRODUCTLIST']._serialized_end=435
+  _globals['_ORDERLIST']._serialized_start=437
+  _globals['_ORDERLIST']._serialized_end=486
+  _globals['_LISTORDERSREQUEST']._serialized_start=488
+  _globals['_LISTORDERSREQUEST']._serialized_end=553
+  _globals['_ORDERPAGE']._serialized_start=555
+  _globals['_ORDERPAGE']._serialized_end=625
+  _globals['_ORDERLOOKUP']._serialized_start=627
+  _globals['_ORDERLOOKUP']._serialized_end=697
+  _globals['_TIMEBUCKET']._serialized_start=699
+  _globals['_TIMEBUCKET']._serialized_end=741
+  _globals['_ORDERSTATS']._serialized_start=744
+  _globals['_ORDERSTATS']._serialized_end=1036
+  _globals['_ORDERSTATS_BYSTATUSENTRY']._serialized_start=939
+  _globals['_ORDERSTATS_BYSTATUSENTRY']._serialized_end=986
+  _globals['_ORDERSTATS_BYPRODUCTENTRY']._serialized_start=988
+  _globals['_ORDERSTATS_BYPRODUCTENTRY']._serialized_end=1036
+  _globals['_LISTORDERSV2REQUEST']._serialized_start=1038
+  _globals['_LISTORDERSV2REQUEST']._serialized_end=1152
+  _globals['_ORDERPAGEV2']._serialized_start=1155
+  _globals['_ORDERPAGEV2']._serialized_end=1337
+  _globals['_ORDERPROCESSOR']._serialized_start=1463
+  _globals['_ORDERPROCESSOR']._serialized_end=2062
 # @@protoc_insertion_point(module_scope)
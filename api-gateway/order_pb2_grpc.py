@@ -29,6 +29,11 @@ class OrderProcessorStub(object):
                 request_serializer=order__pb2.OrderIdRequest.SerializeToString,
                 response_deserializer=order__pb2.OrderResponse.FromString,
                 )
+        self.GetOrders = channel.unary_unary(
+                '/order.OrderProcessor/GetOrders',
+                request_serializer=order__pb2.OrderIdsRequest.SerializeToString,
+                response_deserializer=order__pb2.OrderLookup.FromString,
+                )
         self.CancelOrder = channel.unary_unary(
                 '/order.OrderProcessor/CancelOrder',
                 request_serializer=order__pb2.OrderIdRequest.SerializeToString,
@@ -39,6 +44,26 @@ class OrderProcessorStub(object):
                 request_serializer=order__pb2.Empty.SerializeToString,
                 response_deserializer=order__pb2.OrderList.FromString,
                 )
+        self.ListOrders = channel.unary_unary(
+                '/order.OrderProcessor/ListOrders',
+                request_serializer=order__pb2.ListOrdersRequest.SerializeToString,
+                response_deserializer=order__pb2.OrderPage.FromString,
+                )
+        self.GetOrderStats = channel.unary_unary(
+                '/order.OrderProcessor/GetOrderStats',
+                request_serializer=order__pb2.Empty.SerializeToString,
+                response_deserializer=order__pb2.OrderStats.FromString,
+                )
+        self.GetAllOrdersV2 = channel.unary_unary(
+                '/order.OrderProcessor/GetAllOrdersV2',
+                request_serializer=order__pb2.ListOrdersV2Request.SerializeToString,
+                response_deserializer=order__pb2.OrderPageV2.FromString,
+                )
+        self.ListOrdersV2 = channel.unary_unary(
+                '/order.OrderProcessor/ListOrdersV2',
+                request_serializer=order__pb2.ListOrdersV2Request.SerializeToString,
+                response_deserializer=order__pb2.OrderPageV2.FromString,
+                )
 
 
 class OrderProcessorServicer(object):
@@ -62,6 +87,13 @@ class OrderProcessorServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetOrders(self, request, context):
+        """many orders in one round trip, unknown IDs are listed in not_found
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def CancelOrder(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -74,6 +106,33 @@ class OrderProcessorServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ListOrders(self, request, context):
+        """newest first, one page at a time
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetOrderStats(self, request, context):
+        """counters kept up to date on every change, no pass over the orders
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetAllOrdersV2(self, request, context):
+        """v2 listings (OrderPageV2): same orders, compact encoding
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ListOrdersV2(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_OrderProcessorServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -92,6 +151,11 @@ def add_OrderProcessorServicer_to_server(servicer, server):
                     request_deserializer=order__pb2.OrderIdRequest.FromString,
                     response_serializer=order__pb2.OrderResponse.SerializeToString,
             ),
+            'GetOrders': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetOrders,
+                    request_deserializer=order__pb2.OrderIdsRequest.FromString,
+                    response_serializer=order__pb2.OrderLookup.SerializeToString,
+            ),
             'CancelOrder': grpc.unary_unary_rpc_method_handler(
                     servicer.CancelOrder,
                     request_deserializer=order__pb2.OrderIdRequest.FromString,
@@ -102,6 +166,26 @@ def add_OrderProcessorServicer_to_server(servicer, server):
                     request_deserializer=order__pb2.Empty.FromString,
                     response_serializer=order__pb2.OrderList.SerializeToString,
             ),
+            'ListOrders': grpc.unary_unary_rpc_method_handler(
+                    servicer.ListOrders,
+                    request_deserializer=order__pb2.ListOrdersRequest.FromString,
+                    response_serializer=order__pb2.OrderPage.SerializeToString,
+            ),
+            'GetOrderStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetOrderStats,
+                    request_deserializer=order__pb2.Empty.FromString,
+                    response_serializer=order__pb2.OrderStats.SerializeToString,
+            ),
+            'GetAllOrdersV2': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetAllOrdersV2,
+                    request_deserializer=order__pb2.ListOrdersV2Request.FromString,
+                    response_serializer=order__pb2.OrderPageV2.SerializeToString,
+            ),
+            'ListOrdersV2': grpc.unary_unary_rpc_method_handler(
+                    servicer.ListOrdersV2,
+                    request_deserializer=order__pb2.ListOrdersV2Request.FromString,
+                    response_serializer=order__pb2.OrderPageV2.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'order.OrderProcessor', rpc_method_handlers)
@@ -163,6 +247,23 @@ class OrderProcessor(object):
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
+    @staticmethod
+    def GetOrders(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/order.OrderProcessor/GetOrders',
+            order__pb2.OrderIdsRequest.SerializeToString,
+            order__pb2.OrderLookup.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
     @staticmethod
     def CancelOrder(request,
             target,
@@ -196,3 +297,71 @@ class OrderProcessor(object):
             order__pb2.OrderList.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ListOrders(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/order.OrderProcessor/ListOrders',
+            order__pb2.ListOrdersRequest.SerializeToString,
+            order__pb2.OrderPage.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetOrderStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/order.OrderProcessor/GetOrderStats',
+            order__pb2.Empty.SerializeToString,
+            order__pb2.OrderStats.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetAllOrdersV2(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/order.OrderProcessor/GetAllOrdersV2',
+            order__pb2.ListOrdersV2Request.SerializeToString,
+            order__pb2.OrderPageV2.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ListOrdersV2(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/order.OrderProcessor/ListOrdersV2',
+            order__pb2.ListOrdersV2Request.SerializeToString,
+            order__pb2.OrderPageV2.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
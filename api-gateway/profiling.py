@@ -0,0 +1,181 @@
+"""
+On-demand profiling shared by the Python services (keep the copies in
+api-gateway, order-processor and notification-service identical).
+
+A capture runs for a fixed number of seconds and writes two files to PROFILE_DIR:
+
+    <service>-<time>.folded     stack samples of every thread, in the collapsed
+                                format flamegraph.pl / speedscope / inferno read
+    <service>-<time>.slow.json  the slowest calls per route / RPC / lane that
+                                took longer than the capture's threshold
+
+Captures are started by the gateway's POST /admin/profile or by SIGUSR1
+(install_signal_handler). Nothing runs outside a capture: the sampler thread
+only exists while one is running, and the slow-call hooks in the metrics
+code are a single `slow_calls is None` check.
+"""
+import collections
+import heapq
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger("profiling")
+
+SERVICE_NAME = os.getenv("SERVICE_NAME", "unknown")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# what SIGUSR1 captures
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "100"))
+# seconds between stack samples
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+MAX_SECONDS = 300
+# slowest calls kept per name
+SLOW_CALLS_KEPT = 20
+
+# set while a capture runs, the hooks record into it
+slow_calls = None
+_running = threading.Lock()
+
+
+class SlowCalls:
+    """Calls above threshold seconds: a count per name and the slowest few of each"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = collections.Counter()
+        self._slowest = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        if seconds < self.threshold:
+            return
+        with self._lock:
+            self.counts[name] += 1
+            heap = self._slowest[name]
+            entry = (seconds, time.time())
+            if len(heap) < SLOW_CALLS_KEPT:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heappushpop(heap, entry)
+
+    def report(self):
+        with self._lock:
+            return {
+                name: {
+                    "count": self.counts[name],
+                    "slowest": [
+                        {"ms": round(seconds * 1000, 3), "at": round(at, 3)}
+                        for seconds, at in sorted(heap, reverse=True)
+                    ],
+                }
+                for name, heap in self._slowest.items()
+            }
+
+
+def _thread_group(name):
+    # "backend_12" / "notify-worker-3" -> one frame for the whole pool
+    return name.rstrip("0123456789").rstrip("_-") or name
+
+
+def sample_stacks(seconds, interval):
+    """Collapsed stacks of every other thread, sampled every interval for seconds"""
+    stacks = collections.Counter()
+    me = threading.get_ident()
+    labels = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_filename, code.co_name, code.co_firstlineno)
+                label = labels.get(key)
+                if label is None:
+                    label = labels[key] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                frames.append(label)
+                frame = frame.f_back
+            frames.append(_thread_group(names.get(ident, "thread")))
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def capture(seconds, slow_ms=PROFILE_SLOW_MS, interval=PROFILE_INTERVAL, directory=PROFILE_DIR):
+    """
+    Blocking capture, returns the written paths and a few totals. Raises
+    RuntimeError when another capture is running.
+    """
+    global slow_calls
+    if not _running.acquire(blocking=False):
+        raise RuntimeError("a profile capture is already running")
+    try:
+        seconds = min(seconds, MAX_SECONDS)
+        recorder = SlowCalls(slow_ms / 1000)
+        slow_calls = recorder
+        try:
+            stacks = sample_stacks(seconds, interval)
+        finally:
+            slow_calls = None
+
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{SERVICE_NAME}-{time.strftime('%Y%m%d-%H%M%S')}")
+        with open(f"{base}.folded", "w") as out:
+            for stack, count in stacks.most_common():
+                out.write(f"{stack} {count}\n")
+        slow = recorder.report()
+        with open(f"{base}.slow.json", "w") as out:
+            json.dump({"service": SERVICE_NAME, "seconds": seconds, "threshold_ms": slow_ms, "calls": slow}, out, indent=2)
+
+        result = {
+            "folded": f"{base}.folded",
+            "slow_calls": f"{base}.slow.json",
+            "samples": sum(stacks.values()),
+            "slow_call_counts": dict(recorder.counts),
+        }
+        logger.info("Profile written to %s (%d samples)", result["folded"], result["samples"])
+        return result
+    finally:
+        _running.release()
+
+
+def start_capture(seconds, slow_ms=PROFILE_SLOW_MS, interval=PROFILE_INTERVAL, directory=PROFILE_DIR):
+    """capture() on its own thread, returns a Future with its result"""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(capture(seconds, slow_ms, interval, directory))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="profiler", daemon=True).start()
+    return future
+
+
+def install_signal_handler():
+    """
+    kill -USR1 <pid> starts a PROFILE_SECONDS capture with the PROFILE_SLOW_MS
+    threshold. Only from the main thread and where SIGUSR1 exists (not Windows).
+    """
+    signum = getattr(signal, "SIGUSR1", None)
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def report_failure(future):
+        if future.exception() is not None:
+            logger.warning("Profile capture failed: %s", future.exception())
+
+    def on_signal(signum, frame):
+        start_capture(PROFILE_SECONDS, PROFILE_SLOW_MS).add_done_callback(report_failure)
+
+    signal.signal(signum, on_signal)
+    return True
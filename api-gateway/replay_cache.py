@@ -0,0 +1,88 @@
+"""
+Idempotency-Key for POST /orders, the gateway's half.
+
+The first request with a key runs; duplicates arriving while it runs await its
+outcome, later ones get its stored response, neither calls the validator or
+the processor again. The key also goes to the processor
+(OrderRequest.idempotency_key), whose own store catches the duplicates this
+cache does not see: ones sent to another gateway replica, or after the key was
+evicted here.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+from metrics import IDEMPOTENT_REPLAYS
+
+REPLAYED_STORED = IDEMPOTENT_REPLAYS.labels("stored")
+REPLAYED_IN_FLIGHT = IDEMPOTENT_REPLAYS.labels("in_flight")
+
+
+class KeyReused(Exception):
+    """The key belongs to a request with another body"""
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "future", "expires")
+
+    def __init__(self, fingerprint, future):
+        self.fingerprint = fingerprint
+        self.future = future
+        self.expires = None
+
+
+def _consume(future):
+    # a failure nobody waited for is not an "exception never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+class ReplayCache:
+    """
+    Results by idempotency key, LRU with a TTL. Only used from the event loop,
+    so it needs no lock. Failures are handed to the duplicates already waiting
+    but not stored: the next request with the key runs again.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def run(self, key, fingerprint, call):
+        """call()'s result, or the result of the earlier request with key"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires is not None and time.monotonic() >= entry.expires:
+            del self._entries[key]
+            entry = None
+
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                raise KeyReused(key)
+            self._entries.move_to_end(key)
+            (REPLAYED_STORED if entry.future.done() else REPLAYED_IN_FLIGHT).inc()
+            # shielded: a waiter that goes away must not cancel the first request
+            return await asyncio.shield(entry.future)
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume)
+        entry = self._entries[key] = _Entry(fingerprint, future)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+        try:
+            result = await call()
+        except BaseException as e:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        entry.expires = time.monotonic() + self.ttl
+        future.set_result(result)
+        return result
@@ -0,0 +1,369 @@
+import asyncio
+import contextvars
+import math
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from metrics import BREAKER_STATE, BULKHEAD_IN_FLIGHT, BULKHEAD_LIMIT, BULKHEAD_SHED, HEDGED_CALLS
+
+# default time budget of one gateway request, callers may ask for less with X-Request-Timeout
+REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET", "10"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.02"))
+# at most this share of calls gets a second (hedged) attempt
+HEDGE_RATIO = float(os.getenv("HEDGE_RATIO", "0.1"))
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+# the whole budget the request started with
+_budget = contextvars.ContextVar("budget", default=None)
+
+
+class Overloaded(Exception):
+    """Raised when a downstream bulkhead is full, handlers turn it into 503 + Retry-After"""
+
+    def __init__(self, downstream, retry_after, reason="overloaded"):
+        super().__init__(f"{downstream} {reason}")
+        self.downstream = downstream
+        self.retry_after = retry_after
+
+
+class CircuitOpen(Overloaded):
+    """Fail-fast while a backend's breaker is open, same 503 + Retry-After as shedding"""
+
+    def __init__(self, downstream, retry_after):
+        super().__init__(downstream, retry_after, reason="unavailable (circuit open)")
+
+
+class DeadlineExceeded(Exception):
+    """Request budget used up before or while calling a backend, handlers answer 504"""
+
+
+def remaining():
+    """Seconds left of the current request's budget, None outside a request"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("request budget exhausted")
+    return left
+
+
+@contextmanager
+def request_budget(seconds):
+    """Runs the block as one request with a budget of seconds"""
+    deadline = _deadline.set(time.monotonic() + seconds)
+    budget = _budget.set(seconds)
+    try:
+        yield
+    finally:
+        _budget.reset(budget)
+        _deadline.reset(deadline)
+
+
+class DeadlineMiddleware:
+    """Starts the request budget: min(REQUEST_BUDGET, X-Request-Timeout seconds)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        budget = REQUEST_BUDGET
+        for name, value in scope["headers"]:
+            if name == b"x-request-timeout":
+                try:
+                    budget = min(budget, float(value))
+                except ValueError:
+                    pass
+                break
+
+        with request_budget(budget):
+            await self.app(scope, receive, send)
+
+
+class Bulkhead:
+    """
+    Concurrency limit for one downstream with a short bounded queue for bursts.
+    Requests over limit + queue (or waiting longer than queue_timeout) are shed
+    right away, so a slow backend only ties up its own share of the gateway.
+
+    With adaptive=True the limit follows AIMD: +1 after a full limit's worth of
+    calls under latency_target, x0.75 (at most once per latency_target) when a
+    call is slower or fails.
+
+    Lives on the event loop, no locking needed.
+    """
+
+    def __init__(self, name, limit, max_queue, queue_timeout=0.5, adaptive=False,
+                 latency_target=0.5, min_limit=1, max_limit=None):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.latency_target = latency_target
+        self.min_limit = min_limit
+        self.max_limit = max_limit or limit * 4
+        self.in_flight = 0
+        self._waiters = deque()
+        self._successes = 0
+        self._last_decrease = 0.0
+        BULKHEAD_LIMIT.labels(name).set(limit)
+
+    @property
+    def retry_after(self):
+        return max(1, math.ceil(self.queue_timeout))
+
+    def _shed(self):
+        BULKHEAD_SHED.labels(self.name).inc()
+        return Overloaded(self.name, self.retry_after)
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            BULKHEAD_IN_FLIGHT.labels(self.name).set(self.in_flight)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._shed()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot over directly, in_flight is already counted.
+            # Not wait_for: on 3.11 it swallows a cancel that arrives after the handover
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over as the timeout fired, it is ours
+                return
+            raise self._shed()
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # cancelled after release() handed us its slot: pass it on
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, latency=None, ok=True):
+        if self.adaptive and latency is not None:
+            self._adapt(latency, ok)
+
+        while self._waiters and self.in_flight <= self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        BULKHEAD_IN_FLIGHT.labels(self.name).set(self.in_flight)
+
+    def _adapt(self, latency, ok):
+        now = time.monotonic()
+        if not ok or latency > self.latency_target:
+            if now - self._last_decrease > self.latency_target:
+                self.limit = max(self.min_limit, int(self.limit * 0.75))
+                self._last_decrease = now
+                self._successes = 0
+                BULKHEAD_LIMIT.labels(self.name).set(self.limit)
+        else:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                BULKHEAD_LIMIT.labels(self.name).set(self.limit)
+
+    async def run(self, fn, *args):
+        """Runs the blocking fn in a worker thread inside the bulkhead"""
+        await self.acquire()
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = await asyncio.to_thread(fn, *args)
+            ok = True
+            return result
+        finally:
+            self.release(time.perf_counter() - start, ok)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive failures, open -> half-open
+    after reset_timeout, where one probe decides between closed and open again.
+    Event loop only, like Bulkhead.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=5.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        BREAKER_STATE.labels(name).set(self.state)
+
+    def _set(self, state):
+        self.state = state
+        BREAKER_STATE.labels(self.name).set(state)
+
+    def check(self):
+        if self.state == self.CLOSED:
+            return
+        wait = self.opened_at + self.reset_timeout - time.monotonic()
+        if self.state == self.OPEN and wait <= 0:
+            self._set(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpen(self.name, max(1, math.ceil(wait)))
+
+    def abstain(self):
+        """The call ended without telling anything about the backend"""
+        self._probing = False
+
+    def record(self, ok):
+        self._probing = False
+        if ok:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self._set(self.CLOSED)
+            return
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set(self.OPEN)
+
+
+class LatencyWindow:
+    """Recent latencies of one call, p95 is the hedge delay"""
+
+    def __init__(self, size=200, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._p95 = None
+        self._stale = 0
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self._stale += 1
+
+    def p95(self):
+        if len(self.samples) < self.min_samples:
+            return None
+        # re-sorting 200 floats every 20 calls is cheap enough
+        if self._p95 is None or self._stale >= 20:
+            ordered = sorted(self.samples)
+            self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+            self._stale = 0
+        return self._p95
+
+
+class Downstream:
+    """
+    One backend as seen by the gateway: bulkhead + circuit breaker, and hedging
+    for idempotent calls. is_failure(exc) tells backend trouble (trips the
+    breaker) from normal errors like NOT_FOUND.
+
+    timeout is the longest the backend gets on its own (a request with the
+    default budget gives it that much). Running out of time in a request whose
+    budget the caller cut below it (X-Request-Timeout) is the caller's choice,
+    it leaves the breaker alone.
+    """
+
+    def __init__(self, name, bulkhead, breaker, is_failure=lambda exc: True, timeout=REQUEST_BUDGET):
+        self.name = name
+        self.bulkhead = bulkhead
+        self.breaker = breaker
+        self.is_failure = is_failure
+        self.timeout = timeout
+        self.latency = {}
+        self.calls = 0
+        self.hedges = 0
+
+    async def call(self, fn, *args, hedge=None):
+        """hedge=<call name> for idempotent reads: a second attempt starts after that call's p95"""
+        remaining()
+        self.breaker.check()
+        self.calls += 1
+        try:
+            if hedge:
+                result = await self._hedged(hedge, fn, args)
+            else:
+                result = await self.bulkhead.run(fn, *args)
+        except Overloaded:
+            # shed locally, says nothing about the backend
+            raise
+        except DeadlineExceeded:
+            budget = _budget.get()
+            if budget is not None and budget < self.timeout:
+                self.breaker.abstain()
+            else:
+                self.breaker.record(False)
+            raise
+        except Exception as exc:
+            self.breaker.record(not self.is_failure(exc))
+            raise
+        self.breaker.record(True)
+        return result
+
+    async def _timed(self, window, fn, args):
+        start = time.perf_counter()
+        result = await self.bulkhead.run(fn, *args)
+        window.observe(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, name, fn, args):
+        window = self.latency.setdefault(name, LatencyWindow())
+        first = asyncio.ensure_future(self._timed(window, fn, args))
+        p95 = window.p95()
+        if p95 is None:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=max(HEDGE_MIN_DELAY, p95))
+        if done or self.hedges >= self.calls * HEDGE_RATIO:
+            return await first
+
+        self.hedges += 1
+        HEDGED_CALLS.labels(self.name, name).inc()
+        pending = {first, asyncio.ensure_future(self._timed(window, fn, args))}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    # the loser keeps its bulkhead slot until its thread returns
+                    for other in pending:
+                        other.add_done_callback(lambda t: t.cancelled() or t.exception())
+                    return task.result()
+                if error is None or task is first:
+                    error = task.exception()
+        raise error
+
+
+def bulkhead_from_env(name, limit, max_queue):
+    prefix = f"BULKHEAD_{name.upper()}"
+    return Bulkhead(
+        name,
+        limit=int(os.getenv(f"{prefix}_LIMIT", limit)),
+        max_queue=int(os.getenv(f"{prefix}_QUEUE", max_queue)),
+        queue_timeout=float(os.getenv("BULKHEAD_QUEUE_TIMEOUT", "0.5")),
+        adaptive=os.getenv("BULKHEAD_ADAPTIVE", "0") == "1",
+        latency_target=float(os.getenv(f"{prefix}_LATENCY_TARGET", "0.5")),
+    )
+
+
+def breaker_from_env(name):
+    prefix = f"BREAKER_{name.upper()}"
+    return CircuitBreaker(
+        name,
+        failure_threshold=int(os.getenv(f"{prefix}_FAILURES", "5")),
+        reset_timeout=float(os.getenv(f"{prefix}_RESET", "5")),
+    )
@@ -49,9 +49,4 @@ def mock_soap():
 def mock_grpc():
     with patch('app.process_order_grpc') as mock:
         mock.return_value = "ORD-TEST123"
-        yield mock
-
-@pytest.fixture
-def mock_rabbitmq():
-    with patch('app.send_notification_rabbitmq') as mock:
         yield mock
\ No newline at end of file
@@ -1,3 +1,12 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as gateway
+import order_pb2
+
 def test_health(client):
     response = client.get("/health")
     assert response.status_code == 200
@@ -19,7 +28,7 @@ def test_get_order(client):
     assert response.status_code == 200
     assert response.json()["order_id"] == "ORD-123"
 
-def test_create_order_with_mocks(client, mock_soap, mock_grpc, mock_rabbitmq):
+def test_create_order_with_mocks(client, mock_soap, mock_grpc):
     response = client.post("/orders", json={
         "product_id": "PROD-001",
         "email": "test@example.com",
@@ -38,9 +47,89 @@ def test_create_order_with_mocks(client, mock_soap, mock_grpc, mock_rabbitmq):
 
     mock_soap.assert_called_once_with("PROD-001")
     mock_grpc.assert_called_once()
-    mock_rabbitmq.assert_called_once()
 
 def test_cancel_order(client):
     response = client.delete("/orders/ORD-123/cancel")
     assert response.status_code == 200
-    assert response.json()["status"] == "cancelled"
\ No newline at end of file
+    assert response.json()["status"] == "cancelled"
+
+def test_metrics(client):
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'gateway_requests_total{method="GET",route="/",status="200"}' in response.text
+
+def test_get_orders_too_many_ids(client):
+    ids = ",".join(f"ORD-{i:016X}" for i in range(1001))
+    response = client.get(f"/orders?ids={ids}")
+    assert response.status_code == 400
+
+def test_not_ready_until_warm_up_is_done(monkeypatch):
+    wsdl_fetched = threading.Event()
+    threads = []
+
+    def slow_wsdl(timeout):
+        threads.append(threading.current_thread().name)
+        wsdl_fetched.wait(5)
+
+    def processor_down(timeout):
+        raise ConnectionError("order-processor down")
+
+    monkeypatch.setattr(gateway, "soap_client", slow_wsdl)
+    monkeypatch.setattr(gateway, "connect_grpc", processor_down)
+    monkeypatch.setattr(gateway, "readiness", {"ready": False, "checks": {}})
+
+    with TestClient(gateway.app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "warming up"
+        assert client.get("/health").status_code == 200
+
+        wsdl_fetched.set()
+        deadline = time.monotonic() + 5
+        while client.get("/ready").status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        body = client.get("/ready").json()
+        assert body["status"] == "ready"
+        # a backend that is down is recorded, it does not keep the gateway unready
+        assert body["checks"]["soap_wsdl"] == "ok"
+        assert body["checks"]["grpc_channel"] == "failed: ConnectionError"
+        assert "products_cache" not in body["checks"]
+        # warm-up has its own threads, it leaves the backend executor to the bulkheads
+        assert threads[0].startswith("warm-up")
+
+def test_order_stats(client, monkeypatch):
+    stats = order_pb2.OrderStats(
+        total=3,
+        by_status={"accepted": 2, "cancelled": 1},
+        by_product={"PROD-001": 3},
+        bucket_seconds=60,
+        created=[order_pb2.TimeBucket(start=1760000000, count=1), order_pb2.TimeBucket(start=1760000060, count=2)],
+    )
+    calls = []
+
+    def processor(method, request):
+        calls.append(method)
+        return stats
+
+    monkeypatch.setattr(gateway, "grpc_call", processor)
+
+    response = client.get("/orders/stats")
+    assert response.status_code == 200
+    assert calls == ["GetOrderStats"]
+    body = response.json()
+    assert body == {
+        "total": 3,
+        "by_status": {"accepted": 2, "cancelled": 1},
+        "by_product": {"PROD-001": 3},
+        "bucket_seconds": 60,
+        "created": [{"start": 1760000000, "count": 1}, {"start": 1760000060, "count": 2}],
+        "_links": {"all-orders": {"href": f"{gateway.API_GATEWAY_URL}/orders"}},
+    }
+
+def test_accepted_compression_is_checked_at_startup():
+    assert gateway.accepted_algorithms("") == 1
+    assert gateway.accepted_algorithms(" GZIP, deflate ,") == 1 | 1 << 1 | 1 << 2
+    with pytest.raises(ValueError, match="'br', allowed: deflate, gzip"):
+        gateway.accepted_algorithms("gzip,br")
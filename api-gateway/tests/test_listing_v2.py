@@ -0,0 +1,46 @@
+import grpc
+
+import app as gateway
+import order_pb2
+
+
+class Unimplemented(grpc.RpcError):
+    def code(self):
+        return grpc.StatusCode.UNIMPLEMENTED
+
+
+def test_page_v2_gives_the_v1_views():
+    orders = [
+        order_pb2.OrderResponse(order_id="ORD-0000000000000002", status="on delivery", product_id="PROD-002", email="b@example.com", quantity=3),
+        order_pb2.OrderResponse(order_id="ORD-0000000000000001", status="cancelled", product_id="PROD-001", email="a@example.com", quantity=1),
+    ]
+    page = order_pb2.OrderPageV2(
+        ids=[2, 1],
+        status=[order_pb2.STATUS_ON_DELIVERY, order_pb2.STATUS_CANCELLED],
+        product=[0, 1], products=["PROD-002", "PROD-001"],
+        email=[0, 1], emails=["b@example.com", "a@example.com"],
+        quantity=[3, 1],
+    )
+    assert gateway.page_v2_to_dicts(page) == [gateway.order_to_dict(o) for o in orders]
+
+
+def test_listing_falls_back_to_v1_on_an_older_processor(client, monkeypatch):
+    calls = []
+
+    def older_processor(method, request):
+        calls.append(method)
+        if method.endswith("V2"):
+            raise Unimplemented()
+        return order_pb2.OrderPage(orders=[
+            order_pb2.OrderResponse(order_id="ORD-0000000000000001", status="accepted", product_id="PROD-001", email="a@example.com", quantity=1)
+        ])
+
+    monkeypatch.setattr(gateway, "grpc_call", older_processor)
+    monkeypatch.setitem(gateway.listing_v2, "supported", True)
+
+    for _ in range(2):
+        response = client.get("/orders", params={"limit": 10})
+        assert response.status_code == 200
+        assert response.json()["orders"][0]["order_id"] == "ORD-0000000000000001"
+    # the v2 call is not tried again
+    assert calls == ["ListOrdersV2", "ListOrders", "ListOrders"]
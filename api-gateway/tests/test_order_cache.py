@@ -0,0 +1,87 @@
+import json
+
+from order_cache import OrderCache, OrderEventListener
+
+
+def view(order_id, status):
+    return {"order_id": order_id, "status": status}
+
+
+def live_cache(max_size=100, ttl=60):
+    cache = OrderCache(max_size, ttl, lambda v, status: {**v, "status": status})
+    cache.subscribed()
+    return cache
+
+
+def test_off_until_subscribed():
+    cache = OrderCache(100, 60, lambda v, status: v)
+    cache.put("ORD-1", view("ORD-1", "accepted"), "accepted", cache.version())
+    assert cache.get("ORD-1") is None
+
+    cache.subscribed()
+    cache.put("ORD-1", view("ORD-1", "accepted"), "accepted", cache.version())
+    assert cache.get("ORD-1")["status"] == "accepted"
+
+    # events may be lost while disconnected, nothing survives
+    cache.unsubscribed()
+    cache.subscribed()
+    assert cache.get("ORD-1") is None
+
+
+def test_event_moves_cached_view_forward_only():
+    cache = live_cache()
+    cache.put("ORD-1", view("ORD-1", "accepted"), "accepted", cache.version())
+
+    cache.apply("ORD-1", "on delivery")
+    assert cache.get("ORD-1")["status"] == "on delivery"
+
+    cache.write_through("ORD-1", view("ORD-1", "cancelled"), "cancelled")
+    # late event from before the cancel
+    cache.apply("ORD-1", "delivered")
+    assert cache.get("ORD-1")["status"] == "cancelled"
+
+
+def test_read_racing_an_event_is_not_stored():
+    cache = live_cache()
+    version = cache.version()
+    # the event lands while the processor read is in flight
+    cache.apply("ORD-1", "cancelled")
+    cache.put("ORD-1", view("ORD-1", "accepted"), "accepted", version)
+    assert cache.get("ORD-1") is None
+
+    # other orders are not affected
+    cache.put("ORD-2", view("ORD-2", "accepted"), "accepted", version)
+    assert cache.get("ORD-2") is not None
+
+
+def test_read_started_before_subscribe_is_not_stored():
+    cache = OrderCache(100, 60, lambda v, status: v)
+    version = cache.version()
+    cache.subscribed()
+    cache.put("ORD-1", view("ORD-1", "accepted"), "accepted", version)
+    assert cache.get("ORD-1") is None
+
+
+def test_lru_and_ttl():
+    cache = live_cache(max_size=2)
+    for order_id in ("ORD-1", "ORD-2"):
+        cache.put(order_id, view(order_id, "accepted"), "accepted", cache.version())
+    cache.get("ORD-1")
+    cache.put("ORD-3", view("ORD-3", "accepted"), "accepted", cache.version())
+    assert cache.get("ORD-2") is None
+    assert cache.get("ORD-1") is not None
+    assert len(cache) == 2
+
+    expired = live_cache(ttl=0)
+    expired.put("ORD-1", view("ORD-1", "accepted"), "accepted", expired.version())
+    assert expired.get("ORD-1") is None
+
+
+def test_listener_applies_events_and_ignores_garbage():
+    cache = live_cache()
+    cache.put("ORD-1", view("ORD-1", "accepted"), "accepted", cache.version())
+    listener = OrderEventListener(cache)
+
+    listener.on_message(None, None, None, b"not json")
+    listener.on_message(None, None, None, json.dumps({"order_id": "ORD-1", "new_status": "delivered"}).encode())
+    assert cache.get("ORD-1")["status"] == "delivered"
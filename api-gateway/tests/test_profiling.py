@@ -0,0 +1,66 @@
+import json
+import threading
+import time
+
+import pytest
+
+import app as gateway
+import profiling
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_capture_writes_folded_stacks_and_slow_calls(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy_3")
+    worker.start()
+
+    def record_calls():
+        # hooks only see a recorder while the capture runs
+        while profiling.slow_calls is None:
+            time.sleep(0.001)
+        profiling.slow_calls.record("GET /orders", 0.25)
+        profiling.slow_calls.record("GET /orders", 0.01)
+
+    threading.Thread(target=record_calls).start()
+    try:
+        result = profiling.capture(0.2, slow_ms=100, interval=0.005, directory=str(tmp_path))
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiling.slow_calls is None
+    assert result["samples"] > 0
+    with open(result["folded"]) as f:
+        lines = f.read().splitlines()
+    assert any(line.startswith("busy;") and "busy_loop (test_profiling.py:" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    with open(result["slow_calls"]) as f:
+        slow = json.load(f)
+    assert slow["calls"]["GET /orders"]["count"] == 1
+    assert slow["calls"]["GET /orders"]["slowest"][0]["ms"] == 250
+
+
+def test_one_capture_at_a_time(tmp_path):
+    running = profiling.start_capture(0.3, directory=str(tmp_path))
+    time.sleep(0.05)
+    with pytest.raises(RuntimeError):
+        profiling.capture(0.1, directory=str(tmp_path))
+    assert running.result(timeout=5)["samples"] > 0
+
+
+def test_profile_endpoint_is_admin_only(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(gateway, "ADMIN_TOKEN", None)
+    assert client.post("/admin/profile", params={"seconds": 0.1}).status_code == 404
+
+    monkeypatch.setattr(gateway, "ADMIN_TOKEN", "secret")
+    monkeypatch.chdir(tmp_path)
+    assert client.post("/admin/profile", params={"seconds": 0.1}, headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.post("/admin/profile", params={"seconds": 0.1}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert (tmp_path / response.json()["folded"]).exists()
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from replay_cache import KeyReused, ReplayCache
+
+
+def test_duplicates_share_the_first_result():
+    async def scenario():
+        cache = ReplayCache(100, 60)
+        gate = asyncio.Event()
+        calls = []
+
+        async def place():
+            calls.append(1)
+            await gate.wait()
+            return {"order_id": f"ORD-{len(calls)}"}
+
+        # the second one arrives while the first is still running
+        first = asyncio.create_task(cache.run("k", ("PROD-001", 1), place))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.run("k", ("PROD-001", 1), place))
+        await asyncio.sleep(0.01)
+        gate.set()
+        assert await first == await second == {"order_id": "ORD-1"}
+
+        assert await cache.run("k", ("PROD-001", 1), place) == {"order_id": "ORD-1"}
+        assert len(calls) == 1
+
+        with pytest.raises(KeyReused):
+            await cache.run("k", ("PROD-002", 1), place)
+
+    asyncio.run(scenario())
+
+
+def test_failures_are_not_stored():
+    async def scenario():
+        cache = ReplayCache(100, 60)
+        outcomes = [ValueError("out of stock"), {"order_id": "ORD-1"}]
+
+        async def place():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with pytest.raises(ValueError):
+            await cache.run("k", "body", place)
+        assert await cache.run("k", "body", place) == {"order_id": "ORD-1"}
+
+    asyncio.run(scenario())
+
+
+def test_keys_expire_and_are_evicted():
+    async def scenario():
+        cache = ReplayCache(2, 0)
+        results = iter(range(10))
+
+        async def place():
+            return next(results)
+
+        assert await cache.run("a", "body", place) == 0
+        # ttl 0: stored results are gone straight away
+        assert await cache.run("a", "body", place) == 1
+
+        cache.ttl = 60
+        for key in ("b", "c", "d"):
+            await cache.run(key, "body", place)
+        assert len(cache) == 2
+
+    asyncio.run(scenario())
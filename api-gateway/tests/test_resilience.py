@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from resilience import (
+    Bulkhead, CircuitBreaker, CircuitOpen, DeadlineExceeded, Downstream, LatencyWindow, Overloaded, request_budget
+)
+
+
+def test_bulkhead_sheds_past_limit_and_queue():
+    async def scenario():
+        bulkhead = Bulkhead("test", limit=2, max_queue=1, queue_timeout=0.5)
+        gate = threading.Event()
+        calls = [asyncio.create_task(bulkhead.run(gate.wait)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+
+        # 2 running, 1 queued, the 4th is rejected right away
+        assert bulkhead.in_flight == 2
+        with pytest.raises(Overloaded) as rejected:
+            await calls[3]
+        assert rejected.value.retry_after == 1
+
+        gate.set()
+        await asyncio.gather(*calls[:3])
+        assert bulkhead.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_queued_call_times_out():
+    async def scenario():
+        bulkhead = Bulkhead("test", limit=1, max_queue=4, queue_timeout=0.05)
+        gate = threading.Event()
+        running = asyncio.create_task(bulkhead.run(gate.wait))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(Overloaded):
+            await bulkhead.run(gate.wait)
+
+        gate.set()
+        await running
+        assert bulkhead.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_slot_handed_to_a_cancelled_waiter_goes_to_the_next_one():
+    async def scenario():
+        bulkhead = Bulkhead("test", limit=1, max_queue=2, queue_timeout=1)
+        await bulkhead.acquire()
+        first = asyncio.create_task(bulkhead.acquire())
+        second = asyncio.create_task(bulkhead.acquire())
+        await asyncio.sleep(0)
+
+        bulkhead.release()
+        # the slot is first's now, but first goes away before it runs
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await asyncio.wait_for(second, 0.5)
+        assert bulkhead.in_flight == 1
+
+        bulkhead.release()
+        assert bulkhead.in_flight == 0
+    asyncio.run(scenario())
+
+def test_aimd_backs_off_on_slow_calls():
+    bulkhead = Bulkhead("test", limit=8, max_queue=0, adaptive=True, latency_target=0.1)
+    bulkhead.in_flight = 1
+    bulkhead.release(latency=1.0)
+    assert bulkhead.limit == 6
+
+    for _ in range(6):
+        bulkhead.in_flight = 1
+        bulkhead.release(latency=0.01)
+    assert bulkhead.limit == 7
+
+
+def test_breaker_opens_then_probes():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.check()
+        breaker.record(False)
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    time.sleep(0.06)
+    breaker.check()  # the half-open probe goes through ...
+    with pytest.raises(CircuitOpen):
+        breaker.check()  # ... alone
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_hedged_read_returns_the_faster_attempt():
+    async def scenario():
+        downstream = Downstream("test", Bulkhead("test", limit=4, max_queue=0), CircuitBreaker("test"))
+        window = downstream.latency["GetAllOrders"] = LatencyWindow(min_samples=1)
+        window.observe(0.01)
+        downstream.calls = 100  # hedge budget available
+
+        delays = iter([1.0, 0.0])
+        result = await downstream.call(lambda: time.sleep(next(delays)) or "ok", hedge="GetAllOrders")
+        assert result == "ok"
+        assert downstream.hedges == 1
+
+    asyncio.run(scenario())
+
+
+def test_deadline_of_a_shortened_budget_does_not_trip_the_breaker():
+    async def scenario():
+        breaker = CircuitBreaker("test", failure_threshold=2)
+        downstream = Downstream("test", Bulkhead("test", limit=4, max_queue=0), breaker, timeout=5)
+
+        def timed_out():
+            raise DeadlineExceeded("deadline exceeded")
+
+        # X-Request-Timeout below what the backend normally gets: the caller's doing
+        for _ in range(5):
+            with request_budget(0.5), pytest.raises(DeadlineExceeded):
+                await downstream.call(timed_out)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        for _ in range(2):
+            with request_budget(5), pytest.raises(DeadlineExceeded):
+                await downstream.call(timed_out)
+        assert breaker.state == CircuitBreaker.OPEN
+
+    asyncio.run(scenario())
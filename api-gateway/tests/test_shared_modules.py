@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SERVICES = ("api-gateway", "order-processor", "notification-service")
+
+
+@pytest.mark.parametrize("module", ["logsetup.py", "tracing.py", "profiling.py"])
+def test_copies_in_every_service_are_identical(module):
+    # each service image only gets its own directory, so these are copied, not shared
+    copies = {}
+    for service in SERVICES:
+        path = os.path.join(ROOT, service, module)
+        if not os.path.exists(path):
+            pytest.skip(f"{service} is not next to the gateway (inside its image)")
+        with open(path, "rb") as f:
+            copies[service] = f.read()
+    assert len(set(copies.values())) == 1, f"{module} differs between {', '.join(SERVICES)}"
@@ -0,0 +1,24 @@
+import tracing
+
+
+def test_traceparent_roundtrip():
+    with tracing.span("root") as root:
+        headers = tracing.inject({})
+
+    parsed = tracing.parse_traceparent(headers["traceparent"])
+    assert parsed.trace_id == root.trace_id
+    assert parsed.span_id == root.span_id
+    assert parsed.sampled == root.sampled
+
+
+def test_child_inherits_trace_and_sampling():
+    parent = tracing.parse_traceparent("00-" + "a" * 32 + "-" + "b" * 16 + "-00")
+    with tracing.span("child", parent=parent) as child:
+        assert child.trace_id == "a" * 32
+        assert child.parent_id == "b" * 16
+        assert not child.sampled
+
+
+def test_malformed_traceparent_is_ignored():
+    assert tracing.parse_traceparent("garbage") is None
+    assert tracing.parse_traceparent(None) is None
@@ -0,0 +1,346 @@
+"""
+End-to-end load test of the gateway against local stand-ins (see standins.py):
+fake SOAP validator, the real order-processor with an in-memory broker and the
+real gateway under uvicorn, each in its own process.
+
+    python benchmarks/loadtest.py --duration 20 --concurrency 32
+    python benchmarks/loadtest.py --routes "GET /,GET /products" --inject validator=500@5
+    python benchmarks/loadtest.py --compare benchmarks/results/<previous>.json
+    python benchmarks/loadtest.py --embedded          # gateway + processor + notifier in one process
+
+--embedded runs embedded/embedded.py instead of separate processor and gateway
+processes, the no-network baseline for the same workload.
+
+Reports throughput and p50/p95/p99 per route and writes the numbers to
+benchmarks/results/ (commit + timestamp in the name) so runs on different
+commits can be compared with --compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "results")
+
+PRODUCT_IDS = ["PROD-001", "PROD-002", "PROD-003", "PROD-004", "PROD-005", "PROD-006"]
+
+# route -> relative weight in the default mix
+DEFAULT_MIX = {
+    "GET /": 1,
+    "GET /products": 2,
+    "POST /orders": 2,
+    "GET /orders": 1,
+    "GET /orders/{order_id}": 4,
+    "GET /orders/{order_id}/status": 2,
+    "DELETE /orders/{order_id}/cancel": 0.5,
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+class Stack:
+    """Validator, processor and gateway subprocesses on free local ports (or validator + embedded)"""
+
+    def __init__(self, log_dir, gateway_env=None, embedded=False):
+        self.log_dir = log_dir
+        self.gateway_env = gateway_env or {}
+        self.embedded = embedded
+        self.processes = []
+        self.validator_port = free_port()
+        self.grpc_port = free_port()
+        self.processor_control_port = free_port()
+        self.gateway_port = free_port()
+        self.gateway_url = f"http://127.0.0.1:{self.gateway_port}"
+        self.soap_url = f"http://127.0.0.1:{self.validator_port}/ws/ProductValidator?wsdl"
+
+    def _spawn(self, name, cmd, cwd, env=None):
+        log = open(os.path.join(self.log_dir, f"{name}.log"), "w")
+        full_env = dict(os.environ, TRACE_SAMPLE_RATE="0", PYTHONUNBUFFERED="1", **(env or {}))
+        self.processes.append(subprocess.Popen(cmd, cwd=cwd, env=full_env, stdout=log, stderr=subprocess.STDOUT))
+
+    def start(self, gateway=True):
+        standins = os.path.join(HERE, "standins.py")
+        self._spawn("validator", [sys.executable, standins, "validator", "--port", str(self.validator_port)], HERE)
+        self._wait_http(f"http://127.0.0.1:{self.validator_port}/ws/ProductValidator?wsdl")
+
+        if self.embedded:
+            self._spawn("embedded", [
+                sys.executable, os.path.join(ROOT, "embedded", "embedded.py"), "--host", "127.0.0.1",
+                "--port", str(self.gateway_port), "--log-level", "warning",
+            ], ROOT, env={"SOAP_SERVICE_URL": self.soap_url, "API_GATEWAY_URL": self.gateway_url, **self.gateway_env})
+            self._wait_http(f"{self.gateway_url}/ready")
+            return
+
+        self._spawn("processor", [
+            sys.executable, standins, "processor", "--port", str(self.grpc_port),
+            "--soap-url", self.soap_url, "--metrics-port", str(free_port()),
+            "--control-port", str(self.processor_control_port),
+        ], HERE)
+        self._wait_http(f"http://127.0.0.1:{self.processor_control_port}/")
+        if gateway:
+            self.start_gateway()
+            # 503 until the gateway's warm-up is done
+            self._wait_http(f"{self.gateway_url}/ready")
+
+    def start_gateway(self):
+        self._spawn("gateway", [
+            sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+            "--port", str(self.gateway_port), "--log-level", "warning",
+        ], os.path.join(ROOT, "api-gateway"), env={
+            "SOAP_SERVICE_URL": self.soap_url,
+            "GRPC_SERVICE_HOST": "127.0.0.1",
+            "GRPC_SERVICE_PORT": str(self.grpc_port),
+            "API_GATEWAY_URL": self.gateway_url,
+            **self.gateway_env,
+        })
+
+    def _wait_http(self, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for process in self.processes:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{process.args} exited, see logs in {self.log_dir}")
+            try:
+                if httpx.get(url, timeout=1).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError(f"{url} not ready after {timeout}s, see logs in {self.log_dir}")
+
+    def inject(self, target, ms):
+        port = self.validator_port if target == "validator" else self.processor_control_port
+        httpx.post(f"http://127.0.0.1:{port}/_delay", params={"ms": ms}, timeout=5)
+
+    def processor_stats(self):
+        if self.embedded:
+            # no control port, the events go to the in-process notifier
+            return {}
+        return httpx.get(f"http://127.0.0.1:{self.processor_control_port}/", timeout=5).json()
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def build_request(route, order_ids, rng):
+    method, path = route.split(" ", 1)
+    if "{order_id}" in path:
+        if not order_ids:
+            return None
+        path = path.replace("{order_id}", rng.choice(order_ids))
+    body = None
+    if route == "POST /orders":
+        body = {"product_id": rng.choice(PRODUCT_IDS), "email": f"load{rng.randrange(10**6)}@example.com", "quantity": 1}
+    return method, path, body
+
+
+async def run_load(base_url, mix, duration, concurrency, seed=1, injections=(), stack=None):
+    samples = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    order_ids = []
+    routes, weights = zip(*mix.items())
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        # a few orders so the per-order routes have something to hit
+        for i in range(20):
+            response = await client.post("/orders", json={"product_id": PRODUCT_IDS[i % len(PRODUCT_IDS)], "email": "warmup@example.com"})
+            if response.status_code == 201:
+                order_ids.append(response.json()["order_id"])
+
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def injector(target, ms, at):
+            await asyncio.sleep(at)
+            await asyncio.to_thread(stack.inject, target, ms)
+
+        async def worker(index):
+            rng = random.Random(seed * 1000 + index)
+            while time.perf_counter() < deadline:
+                route = rng.choices(routes, weights)[0]
+                request = build_request(route, order_ids, rng)
+                if request is None:
+                    continue
+                method, path, body = request
+                t0 = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                    response = None
+                samples[route].append(time.perf_counter() - t0)
+                statuses[route][status] += 1
+                if route == "POST /orders" and status == 201:
+                    order_ids.append(response.json()["order_id"])
+
+        tasks = [asyncio.create_task(injector(*i)) for i in injections]
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        for task in tasks:
+            task.cancel()
+
+    return samples, statuses, elapsed, len(order_ids)
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(samples, statuses, elapsed):
+    routes = {}
+    for route, latencies in sorted(samples.items()):
+        latencies.sort()
+        ok = sum(count for status, count in statuses[route].items() if isinstance(status, int) and status < 400)
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": len(latencies) - ok,
+            "statuses": {str(k): v for k, v in statuses[route].items()},
+            "rps": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {"elapsed_s": elapsed, "total_requests": total, "total_rps": total / elapsed, "routes": routes}
+
+
+def print_report(summary):
+    print(f"\n{summary['total_requests']} requests in {summary['elapsed_s']:.1f}s -> {summary['total_rps']:.1f} req/s")
+    print(f"{'route':<34} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for route, r in summary["routes"].items():
+        print(f"{route:<34} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8.1f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f}")
+
+
+def compare(summary, previous, max_regression):
+    """Prints the deltas against an earlier result, returns the regressed routes"""
+    print(f"\nvs {previous.get('commit', '?')} ({previous.get('timestamp', '?')}):")
+    regressed = []
+    for route, r in summary["routes"].items():
+        old = previous["routes"].get(route)
+        if not old:
+            continue
+        p99_delta = (r["p99_ms"] - old["p99_ms"]) / old["p99_ms"] if old["p99_ms"] else 0.0
+        rps_delta = (r["rps"] - old["rps"]) / old["rps"] if old["rps"] else 0.0
+        flag = ""
+        if p99_delta > max_regression or rps_delta < -max_regression:
+            regressed.append(route)
+            flag = "  REGRESSION"
+        print(f"  {route:<34} p99 {old['p99_ms']:>8.2f} -> {r['p99_ms']:>8.2f} ({p99_delta:+.0%})  "
+              f"rps {old['rps']:>8.1f} -> {r['rps']:>8.1f} ({rps_delta:+.0%}){flag}")
+    return regressed
+
+
+def parse_mix(value):
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in value.split(","):
+        route, _, weight = item.partition("=")
+        route = route.strip()
+        if route not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown route {route!r}, pick from {list(DEFAULT_MIX)}")
+        mix[route] = float(weight) if weight else DEFAULT_MIX[route]
+    return mix
+
+
+def parse_injection(value):
+    # validator=500@10 -> 500ms on the validator from second 10
+    target, _, rest = value.partition("=")
+    ms, _, at = rest.partition("@")
+    if target not in ("validator", "processor"):
+        raise argparse.ArgumentTypeError("inject target is validator or processor")
+    return target, float(ms), float(at or 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--routes", type=parse_mix, default=None, help='"GET /=1,POST /orders=2" (default: mixed workload)')
+    parser.add_argument("--inject", type=parse_injection, action="append", default=[], metavar="TARGET=MS@SECONDS")
+    parser.add_argument("--gateway-env", action="append", default=[], metavar="KEY=VALUE", help="extra gateway environment")
+    parser.add_argument("--embedded", action="store_true", help="one process for gateway, processor and notifier")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="result file (default benchmarks/results/loadtest-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="p99 / throughput change that counts as a regression")
+    args = parser.parse_args(argv)
+    mix = args.routes or dict(DEFAULT_MIX)
+    if args.embedded and any(target == "processor" for target, _, _ in args.inject):
+        parser.error("--inject processor needs the separate processor process, not --embedded")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    log_dir = os.path.join(RESULTS_DIR, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    stack = Stack(log_dir, gateway_env=dict(item.split("=", 1) for item in args.gateway_env), embedded=args.embedded)
+    try:
+        stack.start()
+        samples, statuses, elapsed, orders = asyncio.run(
+            run_load(stack.gateway_url, mix, args.duration, args.concurrency, args.seed, args.inject, stack)
+        )
+        processor = stack.processor_stats()
+    finally:
+        stack.stop()
+
+    summary = summarize(samples, statuses, elapsed)
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "duration": args.duration, "concurrency": args.concurrency, "mix": mix,
+            "inject": args.inject, "gateway_env": args.gateway_env, "seed": args.seed,
+            "embedded": args.embedded,
+        },
+        "orders_created": orders,
+        "events_published": processor.get("published"),
+        **summary,
+    }
+    print_report(summary)
+    print(f"orders created: {orders}, order events published: {processor.get('published')}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{result['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(summary, json.load(f), args.max_regression):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+CPU spent per request with logging on: order-processor RPCs and the
+notification-service callback run in-process with INFO logging to stderr,
+for the working tree and for an earlier commit.
+
+    python benchmarks/logging_cost.py                      # working tree vs HEAD
+    python benchmarks/logging_cost.py --rev HEAD~3 -n 50000
+    LOG_RATE_LIMIT=0 python benchmarks/logging_cost.py     # no rate limit, every line written
+    python benchmarks/logging_cost.py --sink devnull       # cheapest possible stderr
+
+--sink pipe (default) reads the services' stderr from a pipe, like a container runtime does.
+
+cpu/op   process CPU per call, all threads (a background log writer included)
+wall/op  time spent in the calling thread per call
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SERVICES = ("order-processor", "notification-service")
+SHARED_NAMES = ("metrics", "tracing", "logsetup")
+
+
+def load(tree, directory, module):
+    path = os.path.join(tree, directory)
+    for name in SHARED_NAMES:
+        sys.modules.pop(name, None)
+    sys.path.insert(0, path)
+    try:
+        return importlib.import_module(module)
+    finally:
+        sys.path.remove(path)
+
+
+def drain():
+    # writes out what a queue-based handler still holds, so its cost is counted
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+
+def measure(fn, n):
+    for _ in range(min(n, 1000)):
+        fn()
+    drain()
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(n):
+        fn()
+    wall = time.perf_counter() - wall
+    drain()
+    return {"cpu_us": (time.process_time() - cpu) / n * 1e6, "wall_us": wall / n * 1e6}
+
+
+def run(tree, n, sink):
+    """Runs in a child process for one source tree, prints the results as JSON"""
+    if sink == "devnull":
+        sys.stderr = open(os.devnull, "w")
+    server = load(tree, "order-processor", "server")
+    import order_pb2
+    server.outbox.add = lambda order_id, email, status: None
+    servicer = server.OrderProcessorServicer()
+
+    class Context:
+        def set_code(self, code):
+            pass
+
+        def set_details(self, details):
+            pass
+
+    context = Context()
+    order_request = order_pb2.OrderRequest(product_id="PROD-001", email="user@example.com", quantity=1)
+    order_id = servicer.ProcessOrder(order_request, context).order_id
+    status_request = order_pb2.OrderIdRequest(order_id=order_id)
+
+    consumer = load(tree, "notification-service", "consumer")
+
+    class Channel:
+        def basic_ack(self, delivery_tag):
+            pass
+
+        def basic_nack(self, delivery_tag):
+            pass
+
+    class Method:
+        delivery_tag = 1
+
+    body = json.dumps({"order_id": order_id, "email": "user@example.com", "type": "status_update", "new_status": "on delivery"}).encode()
+    channel, method = Channel(), Method()
+
+    results = {
+        "processor.ProcessOrder": measure(lambda: servicer.ProcessOrder(order_request, context), n),
+        "processor.GetOrderStatus": measure(lambda: servicer.GetOrderStatus(status_request, context), n),
+        "notifier.callback": measure(lambda: consumer.callback(channel, method, None, body), n),
+    }
+    print(json.dumps(results))
+
+
+def export(rev):
+    tree = tempfile.mkdtemp(prefix="logging-cost-")
+    archive = subprocess.run(["git", "archive", rev, *SERVICES], cwd=ROOT, check=True, capture_output=True).stdout
+    subprocess.run(["tar", "-x", "-C", tree], input=archive, check=True)
+    return tree
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rev", default="HEAD", help="commit to compare the working tree against")
+    parser.add_argument("-n", type=int, default=20000, help="calls per operation")
+    parser.add_argument("--sink", choices=("pipe", "devnull"), default="pipe", help="where the services' stderr goes")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        run(args.run, args.n, args.sink)
+        return
+
+    results = {}
+    for label, tree in ((args.rev, export(args.rev)), ("working tree", ROOT)):
+        # stderr drained by this process (and thrown away) in the background
+        child = subprocess.run([sys.executable, __file__, "--run", tree, "-n", str(args.n), "--sink", args.sink],
+                               capture_output=True, text=True)
+        if child.returncode:
+            sys.exit(f"{label} failed:\n{child.stderr[-2000:]}")
+        results[label] = json.loads(child.stdout.strip().splitlines()[-1])
+
+    old, new = results[args.rev], results["working tree"]
+    print(f"{'operation':<28} {args.rev + ' cpu/op':>16} {'now cpu/op':>12} {'saved':>10} {args.rev + ' wall/op':>16} {'now wall/op':>12}")
+    for op in new:
+        saved = old[op]["cpu_us"] - new[op]["cpu_us"]
+        print(f"{op:<28} {old[op]['cpu_us']:>14.1f}us {new[op]['cpu_us']:>10.1f}us {saved:>8.1f}us "
+              f"{old[op]['wall_us']:>14.1f}us {new[op]['wall_us']:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Microbenchmarks for the gateway / processor / notifier hot functions, offline
+and in isolation (no gRPC, SOAP or RabbitMQ involved).
+
+    python benchmarks/micro.py                          # run, compare to the saved baseline
+    python benchmarks/micro.py --save-baseline          # record the current numbers
+    python benchmarks/micro.py --sizes 10000,1000000 -k GetAllOrders
+    python benchmarks/micro.py --threshold 0.10         # fail on >10% slowdown
+
+Every benchmark reports the median time per operation over several repeats.
+With a baseline present (default benchmarks/results/micro-baseline.json, per
+machine) the exit code is 1 when any benchmark got slower than
+baseline * (1 + threshold).
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+DEFAULT_BASELINE = os.path.join(HERE, "results", "micro-baseline.json")
+
+# modules with the same name in several services (metrics.py differs per service)
+SHARED_NAMES = ("metrics", "tracing", "logsetup")
+
+BENCHMARKS = []
+
+
+def benchmark(name, sizes=False):
+    """Registers setup(size) -> (fn, ops_per_call); sized benchmarks run for every --sizes entry"""
+    def register(setup):
+        BENCHMARKS.append((name, sizes, setup))
+        return setup
+    return register
+
+
+def load_service(directory, module):
+    """Imports a service module from its own directory without mixing up same-named helpers"""
+    path = os.path.join(ROOT, directory)
+    for name in SHARED_NAMES:
+        sys.modules.pop(name, None)
+    sys.path.insert(0, path)
+    try:
+        return importlib.import_module(module)
+    finally:
+        sys.path.remove(path)
+
+
+class _Context:
+    def set_code(self, code):
+        pass
+
+    def set_details(self, details):
+        pass
+
+
+def iter_synthetic_orders(size, now=None):
+    now = now or time.time()
+    products = ["PROD-001", "PROD-002", "PROD-003", "PROD-004", "PROD-005", "PROD-006"]
+    statuses = ["accepted", "on delivery", "delivered", "cancelled"]
+    for i in range(size):
+        # spread over the last minute, oldest first, so all timed transitions are hit
+        created_at = now - 60 + 60 * i / size
+        yield {
+            "order_id": f"ORD-{i:016X}",
+            "product_id": products[i % len(products)],
+            "email": f"user{i % 5000}@example.com",
+            "quantity": 1 + i % 3,
+            "status": statuses[i % len(statuses)],
+            "created_at": created_at,
+        }
+
+
+def synthetic_orders(size, now=None):
+    return {o["order_id"]: o for o in iter_synthetic_orders(size, now)}
+
+
+def fill_store(store, size):
+    import order_ids
+    for i, o in enumerate(iter_synthetic_orders(size)):
+        key = order_ids.make(
+            int(o["created_at"] * 1000), slot=(i >> order_ids.SEQUENCE_BITS) % (1 << order_ids.THREAD_BITS),
+            sequence=i % (1 << order_ids.SEQUENCE_BITS)
+        )
+        store.add(key, o["product_id"], o["email"], o["quantity"], o["status"])
+
+
+# --- gateway ---
+
+@benchmark("gateway.get_hateoas_links")
+def bench_hateoas_links(size):
+    app = load_service("api-gateway", "app")
+    return (lambda: app.get_hateoas_links("ORD-1A2B3C4D", "accepted")), 1
+
+
+@benchmark("gateway.order_to_dict (listing, per order)")
+def bench_order_to_dict(size):
+    app = load_service("api-gateway", "app")
+    import order_pb2
+    orders = [
+        order_pb2.OrderResponse(order_id=o["order_id"], status=o["status"], product_id=o["product_id"], email=o["email"], quantity=o["quantity"])
+        for o in synthetic_orders(1000).values()
+    ]
+    listing = order_pb2.OrderList(orders=orders)
+    return (lambda: [app.order_to_dict(o) for o in listing.orders]), len(orders)
+
+
+@benchmark("gateway.order_cache get (hit)")
+def bench_order_cache_hit(size):
+    app = load_service("api-gateway", "app")
+    cache = app.OrderCache(10000, 60, app.with_status)
+    cache.subscribed()
+    for o in synthetic_orders(10000).values():
+        cache.put(o["order_id"], o, o["status"], cache.version())
+    order_id = next(iter(synthetic_orders(1)))
+    return (lambda: cache.get(order_id)), 1
+
+
+@benchmark("gateway.order_cache apply (order event)")
+def bench_order_cache_apply(size):
+    app = load_service("api-gateway", "app")
+    cache = app.OrderCache(10000, 60, app.with_status)
+    cache.subscribed()
+    orders = list(synthetic_orders(10000))
+    for order_id in orders:
+        cache.put(order_id, {"order_id": order_id, "status": "accepted"}, "accepted", cache.version())
+    # every view already past "accepted" after the first round, the rest measures the bookkeeping
+    return (lambda: [cache.apply(order_id, "on delivery") for order_id in orders]), len(orders)
+
+# --- order-processor ---
+
+@benchmark("processor.new_order_id")
+def bench_new_order_id(size):
+    server = load_service("order-processor", "server")
+    return server.new_order_id, 1
+
+
+@benchmark("processor.update_order_status_based_on_time (per order)", sizes=True)
+def bench_update_status(size):
+    server = load_service("order-processor", "server")
+    server.orders_db.clear()
+    fill_store(server.orders_db, size)
+    update = server.update_order_status_based_on_time
+
+    def run():
+        for row in range(size):
+            update(row)
+
+    return run, size
+
+
+@benchmark("processor.GetAllOrders", sizes=True)
+def bench_get_all_orders(size):
+    server = load_service("order-processor", "server")
+    import order_pb2
+    server.orders_db.clear()
+    fill_store(server.orders_db, size)
+    servicer = server.OrderProcessorServicer()
+    # keep the outbox from growing across repeats
+    server.outbox.add = lambda order_id, email, status: None
+    return (lambda: servicer.GetAllOrders(order_pb2.Empty(), _Context())), 1
+
+
+@benchmark("processor.ListOrders (page of 100)", sizes=True)
+def bench_list_orders(size):
+    server = load_service("order-processor", "server")
+    import order_pb2
+    server.orders_db.clear()
+    fill_store(server.orders_db, size)
+    servicer = server.OrderProcessorServicer()
+    server.outbox.add = lambda order_id, email, status: None
+    # a page from the middle of the history
+    before = server.orders_db.order_id(size // 2)
+    request = order_pb2.ListOrdersRequest(limit=100, before=before)
+    return (lambda: servicer.ListOrders(request, _Context())), 1
+
+
+@benchmark("processor.GetOrders (100 ids)", sizes=True)
+def bench_get_orders(size):
+    server = load_service("order-processor", "server")
+    import order_pb2
+    server.orders_db.clear()
+    fill_store(server.orders_db, size)
+    servicer = server.OrderProcessorServicer()
+    server.outbox.add = lambda order_id, email, status: None
+    order_ids = [server.orders_db.order_id(row) for row in range(0, size, max(1, size // 100))][:100]
+    request = order_pb2.OrderIdsRequest(order_ids=order_ids)
+    return (lambda: servicer.GetOrders(request, _Context())), 1
+
+
+@benchmark("processor.GetOrderStats", sizes=True)
+def bench_get_order_stats(size):
+    server = load_service("order-processor", "server")
+    import order_pb2
+    server.orders_db.clear()
+    fill_store(server.orders_db, size)
+    servicer = server.OrderProcessorServicer()
+    server.outbox.add = lambda order_id, email, status: None
+    return (lambda: servicer.GetOrderStats(order_pb2.Empty(), _Context())), 1
+
+
+# --- notification-service ---
+
+@benchmark("notifier.callback (status_update JSON path)")
+def bench_callback(size):
+    consumer = load_service("notification-service", "consumer")
+
+    class Channel:
+        def basic_ack(self, delivery_tag):
+            pass
+
+        def basic_nack(self, delivery_tag):
+            pass
+
+    class Method:
+        delivery_tag = 1
+
+    body = json.dumps({"order_id": "ORD-1A2B3C4D", "email": "user@example.com", "type": "status_update", "new_status": "on delivery"}).encode()
+    channel, method = Channel(), Method()
+    return (lambda: consumer.callback(channel, method, None, body)), 1
+
+
+def measure(fn, ops, repeats, min_time):
+    # calibrate calls per repeat so one repeat takes at least min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= max(2, int(min_time / max(elapsed, 1e-9)))
+
+    runs = [elapsed]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append(time.perf_counter() - start)
+
+    per_op = [r / number / ops for r in runs]
+    return {"median_s": statistics.median(per_op), "min_s": min(per_op), "calls_per_repeat": number, "repeats": repeats}
+
+
+def fmt(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="order counts for the sized benchmarks (e.g. 10000,100000,1000000)")
+    parser.add_argument("-k", dest="keyword", help="only benchmarks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    # f-string messages are still formatted, nothing is written - the handlers are not what we measure
+    logging.disable(logging.CRITICAL)
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    failed = []
+    print(f"{'benchmark':<72} {'median/op':>12} {'min/op':>12} {'baseline':>12} {'change':>8}")
+    for name, sized, setup in BENCHMARKS:
+        for size in (sizes if sized else [None]):
+            label = f"{name} [n={size}]" if size else name
+            if args.keyword and args.keyword not in label:
+                continue
+            fn, ops = setup(size)
+            repeats = args.repeats if not size or size < 1_000_000 else max(3, args.repeats // 2)
+            result = results[label] = measure(fn, ops, repeats, args.min_time)
+
+            change = ""
+            reference = baseline.get(label)
+            if reference:
+                ratio = result["median_s"] / reference["median_s"] - 1
+                change = f"{ratio:+.0%}"
+                if ratio > args.threshold:
+                    failed.append(label)
+                    change += " !"
+            print(f"{label:<72} {fmt(result['median_s']):>12} {fmt(result['min_s']):>12} "
+                  f"{fmt(reference['median_s']) if reference else '-':>12} {change:>8}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+
+    if failed:
+        print(f"\n{len(failed)} regressed past {args.threshold:.0%}: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
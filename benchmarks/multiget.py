@@ -0,0 +1,86 @@
+"""
+100 order lookups over gRPC: one GetOrderStatus per order against a single
+GetOrders call, with the real order-processor serve() on a local port
+(RabbitMQ swapped for the in-memory broker from standins.py).
+
+    python benchmarks/multiget.py
+    python benchmarks/multiget.py --ids 100 --orders 10000 --repeats 20
+
+per-call channel  GetOrderStatus x N, a new channel each (what the gateway's grpc_call does)
+shared channel    GetOrderStatus x N over one channel
+GetOrders         one call for all N IDs
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import free_port  # noqa: E402
+from micro import load_service  # noqa: E402
+from standins import InMemoryBroker  # noqa: E402
+
+
+def timed(fn, repeats):
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ids", type=int, default=100, help="orders looked up per round")
+    parser.add_argument("--orders", type=int, default=10000, help="orders in the processor")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    server = load_service("order-processor", "server")
+    import grpc
+    import order_pb2
+    import order_pb2_grpc
+
+    port = free_port()
+    grpc_server = server.serve(
+        port=str(port), connection_factory=InMemoryBroker().connection, metrics_port=free_port(), block=False
+    )
+    target = f"127.0.0.1:{port}"
+    try:
+        channel = grpc.insecure_channel(target)
+        stub = order_pb2_grpc.OrderProcessorStub(channel)
+        created = [
+            stub.ProcessOrder(order_pb2.OrderRequest(product_id="PROD-001", email=f"user{i}@example.com", quantity=1)).order_id
+            for i in range(args.orders)
+        ]
+        order_ids = created[::max(1, len(created) // args.ids)][:args.ids]
+
+        def per_call_channel():
+            for order_id in order_ids:
+                with grpc.insecure_channel(target) as own:
+                    order_pb2_grpc.OrderProcessorStub(own).GetOrderStatus(order_pb2.OrderIdRequest(order_id=order_id))
+
+        def shared_channel():
+            for order_id in order_ids:
+                stub.GetOrderStatus(order_pb2.OrderIdRequest(order_id=order_id))
+
+        def multi_get():
+            stub.GetOrders(order_pb2.OrderIdsRequest(order_ids=order_ids))
+
+        print(f"{len(order_ids)} lookups, {args.orders} orders, median of {args.repeats}")
+        baseline = None
+        for name, fn in (("per-call channel", per_call_channel), ("shared channel", shared_channel), ("GetOrders", multi_get)):
+            elapsed = timed(fn, args.repeats)
+            baseline = baseline or elapsed
+            print(f"{name:<18} {elapsed * 1000:>9.2f} ms  {elapsed / len(order_ids) * 1e6:>9.1f} us/order  {baseline / elapsed:>6.1f}x")
+        channel.close()
+    finally:
+        grpc_server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
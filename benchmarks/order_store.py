@@ -0,0 +1,110 @@
+"""
+Memory and listing cost of the order-processor's order storage: the old
+dict-per-order layout against the columnar OrderStore (order-processor/store.py).
+
+    python benchmarks/order_store.py                        # 1M and 10M orders
+    python benchmarks/order_store.py --sizes 100000 --dict-max 100000
+
+bytes/order  tracemalloc delta of building the store, divided by the order count
+listing      what GetAllOrders does under db_lock: newest-first order, status
+             refresh and the response tuples (protobuf building excluded)
+
+The dict layout needs ~0.5 KB per order, sizes above --dict-max skip it.
+"""
+import argparse
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from micro import fill_store, load_service, synthetic_orders  # noqa: E402
+
+
+def measure_memory(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, after - before
+
+
+def dict_listing(orders_db, update):
+    # the pre-columnar GetAllOrders body
+    snapshot = []
+    for order in sorted(orders_db.values(), key=lambda x: x['created_at'], reverse=True):
+        update(order)
+        snapshot.append((order['order_id'], order['status'], order['product_id'], order['email'], order['quantity']))
+    return snapshot
+
+
+def dict_update(order, now=None):
+    if order['status'] == 'cancelled':
+        return False
+    previous = order['status']
+    elapsed = (now or time.time()) - order['created_at']
+    if elapsed > 25:
+        order['status'] = 'delivered'
+    elif elapsed > 10:
+        order['status'] = 'on delivery'
+    else:
+        order['status'] = 'accepted'
+    return order['status'] != previous
+
+
+def column_listing(server):
+    # the GetAllOrders body
+    server.advance_transitions(time.time())
+    return server.orders_db.snapshot(server.orders_db.newest_first())
+
+
+def timed(fn, repeats):
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000000,10000000")
+    parser.add_argument("--dict-max", type=int, default=2_000_000, help="largest size built with the dict layout")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    server = load_service("order-processor", "server")
+    server.outbox.add = lambda order_id, email, status: None
+
+    print(f"{'layout':<10} {'orders':>10} {'bytes/order':>12} {'listing':>10} {'per order':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        if size <= args.dict_max:
+            orders, used = measure_memory(lambda: synthetic_orders(size))
+            listing = timed(lambda: dict_listing(orders, dict_update), args.repeats)
+            print(f"{'dict':<10} {size:>10} {used / size:>12.1f} {listing:>9.2f}s {listing / size * 1e9:>8.0f}ns")
+            del orders
+        else:
+            print(f"{'dict':<10} {size:>10} {'skipped (--dict-max)':>34}")
+
+        def build():
+            server.orders_db.clear()
+            fill_store(server.orders_db, size)
+            return server.orders_db
+
+        store, used = measure_memory(build)
+        listing = timed(lambda: column_listing(server), args.repeats)
+        print(f"{'columnar':<10} {size:>10} {used / size:>12.1f} {listing:>9.2f}s {listing / size * 1e9:>8.0f}ns"
+              f"   (columns {store.nbytes() / size:.0f} B/order)")
+        store.clear()
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Soak test of order-processor's tiered retention: orders are created at a steady
+rate for a long time while the compactor moves final ones to the cold tier
+(order-processor/cold_store.py). Resident memory should level off once the
+hot tier holds COLD_AFTER seconds of orders, and the oldest orders must stay
+readable through GetOrderStatus.
+
+    python benchmarks/soak.py                                  # 10 min at 2000 orders/s
+    python benchmarks/soak.py --duration 120 --rate 5000 --cold-after 30
+
+Runs the servicer in-process (no gRPC, outbox events dropped) and reports, every
+--report seconds: orders created, hot / cold rows, RssAnon (the Python heap),
+RssFile (mapped cold pages that are resident) and the cold files' size on disk.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from micro import _Context, load_service  # noqa: E402
+
+
+def rss_kb():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=600)
+    parser.add_argument("--rate", type=float, default=2000, help="orders per second")
+    parser.add_argument("--cold-after", type=float, default=30, help="COLD_AFTER for the processor")
+    parser.add_argument("--report", type=float, default=10, help="seconds between report lines")
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    os.environ["COLD_AFTER"] = str(args.cold_after)
+    os.environ["COMPACT_INTERVAL"] = "1"
+    os.environ.setdefault("COLD_STORE_DIR", tempfile.mkdtemp(prefix="soak-cold-"))
+    server = load_service("order-processor", "server")
+    import order_pb2
+    import threading
+
+    server.outbox.add = lambda order_id, email, status: None
+    threading.Thread(target=server.compactor, name="compactor", daemon=True).start()
+    servicer, context = server.OrderProcessorServicer(), _Context()
+    rng = random.Random(1)
+    products = ["PROD-001", "PROD-002", "PROD-003", "PROD-004", "PROD-005", "PROD-006"]
+
+    first_ids = []
+    created = 0
+    start = next_report = time.monotonic()
+    print(f"{'t':>6} {'orders':>10} {'hot':>9} {'cold':>10} {'RssAnon':>10} {'RssFile':>10} {'cold disk':>10}  oldest")
+    while True:
+        now = time.monotonic()
+        elapsed = now - start
+        # catch up to the target rate, in small batches so the compactor gets the lock
+        due = min(int(elapsed * args.rate) - created, 500)
+        for _ in range(due):
+            request = order_pb2.OrderRequest(product_id=rng.choice(products), email=f"user{rng.randrange(10**6)}@example.com", quantity=1)
+            order_id = servicer.ProcessOrder(request, context).order_id
+            if len(first_ids) < 100:
+                first_ids.append(order_id)
+            created += 1
+
+        if now >= next_report or elapsed >= args.duration:
+            next_report += args.report
+            oldest = servicer.GetOrderStatus(order_pb2.OrderIdRequest(order_id=rng.choice(first_ids)), context) if first_ids else None
+            rss = rss_kb()
+            with server.db_lock:
+                hot, cold, disk = len(server.orders_db), len(server.cold_db), server.cold_db.nbytes()
+            print(f"{elapsed:>5.0f}s {created:>10} {hot:>9} {cold:>10} {rss['RssAnon'] / 1024:>8.1f}MB "
+                  f"{rss['RssFile'] / 1024:>8.1f}MB {disk / 2**20:>8.1f}MB  {oldest.status if oldest else '-'}", flush=True)
+            if elapsed >= args.duration:
+                break
+        if not due:
+            time.sleep(0.005)
+
+    missing = [i for i in first_ids if not servicer.GetOrderStatus(order_pb2.OrderIdRequest(order_id=i), context).order_id]
+    print(f"first {len(first_ids)} orders readable: {len(first_ids) - len(missing)}/{len(first_ids)}")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Local stand-ins for the load tests - no docker-compose stack needed.
+
+    python benchmarks/standins.py validator --port 18080 [--delay-ms 0]
+    python benchmarks/standins.py processor --port 15051 --soap-url http://127.0.0.1:18080/ws/ProductValidator?wsdl
+
+validator  Python ProductValidator: serves the JAX-WS WSDL and answers
+           validateProduct / getAvailableProducts from products.json
+processor  the real order-processor serve(), with RabbitMQ replaced by the
+           in-memory broker below
+
+Both accept `POST /_delay?ms=N` on their control port to inject latency while
+a test runs (the validator on its own port, the processor on --control-port).
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ProductValidator.wsdl")
+PRODUCTS_PATH = os.path.join(ROOT, "products.json")
+
+SOAP_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+VALIDATOR_NS = "http://validator.com/"
+
+logger = logging.getLogger("standins")
+
+
+class Delay:
+    """Injected latency, changed at runtime through the control endpoint"""
+
+    def __init__(self, ms=0.0):
+        self.ms = ms
+
+    def sleep(self):
+        if self.ms:
+            time.sleep(self.ms / 1000)
+
+
+def _envelope(body):
+    return (
+        f'<S:Envelope xmlns:S="{SOAP_NS}"><S:Body>{body}</S:Body></S:Envelope>'
+    ).encode()
+
+
+def _escape(value):
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _control(handler, delay):
+    query = parse_qs(urlparse(handler.path).query)
+    delay.ms = float(query.get("ms", ["0"])[0])
+    handler.send_response(200)
+    handler.end_headers()
+    handler.wfile.write(json.dumps({"delay_ms": delay.ms}).encode())
+
+
+def make_validator_handler(products, delay, public_url):
+    product_ids = {p["id"] for p in products}
+    wsdl = open(WSDL_PATH, "rb").read().replace(b"REPLACE_WITH_ACTUAL_URL", public_url.encode())
+    catalog = "".join(
+        f"<return><icon>{_escape(p['icon'])}</icon><id>{_escape(p['id'])}</id><name>{_escape(p['name'])}</name></return>"
+        for p in products
+    )
+
+    class ValidatorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body, content_type="text/xml; charset=utf-8"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if "wsdl" in self.path.lower():
+                return self._reply(200, wsdl)
+            self._reply(404, b"")
+
+        def do_POST(self):
+            if self.path.startswith("/_delay"):
+                return _control(self, delay)
+
+            payload = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            delay.sleep()
+
+            body = ET.fromstring(payload).find(f"{{{SOAP_NS}}}Body")
+            operation = body[0]
+            name = operation.tag.rsplit("}", 1)[-1]
+
+            if name == "validateProduct":
+                product_id = operation.findtext("productId")
+                valid = "true" if product_id in product_ids else "false"
+                response = f'<ns2:validateProductResponse xmlns:ns2="{VALIDATOR_NS}"><return>{valid}</return></ns2:validateProductResponse>'
+            elif name == "getAvailableProducts":
+                response = f'<ns2:getAvailableProductsResponse xmlns:ns2="{VALIDATOR_NS}">{catalog}</ns2:getAvailableProductsResponse>'
+            else:
+                return self._reply(500, _envelope(f"<S:Fault><faultcode>S:Client</faultcode><faultstring>Unknown operation {name}</faultstring></S:Fault>"))
+
+            self._reply(200, _envelope(response))
+
+    return ValidatorHandler
+
+
+def start_validator(port, delay_ms=0.0, products_path=PRODUCTS_PATH):
+    with open(products_path, encoding="utf-8") as f:
+        products = json.load(f)
+    delay = Delay(delay_ms)
+    url = f"http://127.0.0.1:{port}/ws/ProductValidator"
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_validator_handler(products, delay, url))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-validator", daemon=True).start()
+    logger.info(f"Fake ProductValidator on {url}?wsdl ({len(products)} products)")
+    return server, delay
+
+
+class InMemoryBroker:
+    """
+    Stand-in for RabbitMQ behind OutboxRelay - keeps the last messages of every
+    queue and counts the rest. Transactions behave like AMQP tx: nothing is
+    visible before tx_commit.
+    """
+
+    def __init__(self, keep=1000):
+        self.lock = threading.Lock()
+        self.queues = defaultdict(lambda: deque(maxlen=keep))
+        self.published = 0
+        self.commits = 0
+
+    def connection(self):
+        return _BrokerConnection(self)
+
+
+class _BrokerConnection:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+
+    def channel(self):
+        return _BrokerChannel(self.broker)
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class _BrokerChannel:
+    def __init__(self, broker):
+        self.broker = broker
+        self._transactional = False
+        self._pending = []
+
+    def queue_declare(self, queue, **kwargs):
+        with self.broker.lock:
+            self.broker.queues[queue]
+
+    def exchange_declare(self, exchange, **kwargs):
+        pass
+
+    def tx_select(self):
+        self._transactional = True
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        # fanout publishes (order events) are kept under the exchange name, not counted
+        self._pending.append((routing_key or exchange, body, properties, not exchange))
+        if not self._transactional:
+            self.tx_commit()
+
+    def tx_commit(self):
+        with self.broker.lock:
+            for queue, body, properties, counted in self._pending:
+                self.broker.queues[queue].append((body, properties))
+                self.broker.published += counted
+            self.broker.commits += 1
+        self._pending = []
+
+
+def run_processor(port, soap_url, metrics_port, control_port, delay_ms=0.0):
+    """Real order-processor serve() on a local port, RabbitMQ swapped for InMemoryBroker"""
+    os.environ["SOAP_SERVICE_URL"] = soap_url
+    sys.path.insert(0, os.path.join(ROOT, "order-processor"))
+    import grpc
+    import server
+
+    delay = Delay(delay_ms)
+
+    class DelayInterceptor(grpc.ServerInterceptor):
+        # sleeps inside the worker thread, intercept_service itself runs on the server loop
+        def intercept_service(self, continuation, handler_call_details):
+            handler = continuation(handler_call_details)
+            if handler is None or handler.unary_unary is None:
+                return handler
+            inner = handler.unary_unary
+
+            def delayed(request, context):
+                delay.sleep()
+                return inner(request, context)
+
+            return grpc.unary_unary_rpc_method_handler(
+                delayed,
+                request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer
+            )
+
+    broker = InMemoryBroker()
+    # injected latency sits in front of every RPC
+    grpc_server = server.serve(
+        port=str(port), connection_factory=broker.connection, metrics_port=metrics_port,
+        interceptors=[DelayInterceptor()], block=False
+    )
+
+    class ControlHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            _control(self, delay)
+
+        def do_GET(self):
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(json.dumps({"published": broker.published, "commits": broker.commits, "delay_ms": delay.ms}).encode())
+
+    control = ThreadingHTTPServer(("127.0.0.1", control_port), ControlHandler)
+    threading.Thread(target=control.serve_forever, name="processor-control", daemon=True).start()
+    logger.info(f"order-processor on 127.0.0.1:{port}, control on {control_port}")
+    grpc_server.wait_for_termination()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="service", required=True)
+
+    validator = sub.add_parser("validator")
+    validator.add_argument("--port", type=int, default=18080)
+    validator.add_argument("--delay-ms", type=float, default=0.0)
+
+    processor = sub.add_parser("processor")
+    processor.add_argument("--port", type=int, default=15051)
+    processor.add_argument("--soap-url", default="http://127.0.0.1:18080/ws/ProductValidator?wsdl")
+    processor.add_argument("--metrics-port", type=int, default=19100)
+    processor.add_argument("--control-port", type=int, default=19101)
+    processor.add_argument("--delay-ms", type=float, default=0.0)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(name)s - %(levelname)s - %(message)s")
+    logger.setLevel(logging.INFO)
+
+    if args.service == "validator":
+        start_validator(args.port, args.delay_ms)
+        threading.Event().wait()
+    else:
+        run_processor(args.port, args.soap_url, args.metrics_port, args.control_port, args.delay_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Gateway cold start against the local stand-ins (see loadtest.Stack): how long
+until /health answers, until /ready answers, and how slow the first requests
+are compared to the warmed-up steady state.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 5 --first-after health
+
+--first-after ready   first requests once /ready says so (what a load balancer does)
+--first-after health  first requests as soon as the process is live, racing the warm-up
+
+`import app` time on its own: python -X importtime -c "import app" (in api-gateway/)
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import Stack  # noqa: E402
+
+ROUTES = ("GET /products", "POST /orders", "GET /orders/{order_id}")
+
+
+def wait_for(client, path, deadline):
+    # True once the path answers below 500 (404: a gateway without that route)
+    while time.monotonic() < deadline:
+        try:
+            if client.get(path, timeout=1).status_code < 500:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def timed_request(client, route, order_id):
+    method, path = route.split(" ", 1)
+    path = path.replace("{order_id}", order_id or "ORD-0")
+    body = {"product_id": "PROD-001", "email": "startup@example.com", "quantity": 1} if method == "POST" else None
+    start = time.perf_counter()
+    response = client.request(method, path, json=body, timeout=30)
+    return time.perf_counter() - start, response
+
+
+def one_start(stack, first_after, steady_requests):
+    start = time.monotonic()
+    stack.start_gateway()
+    process = stack.processes[-1]
+    result = {}
+    try:
+        with httpx.Client(base_url=stack.gateway_url) as client:
+            deadline = start + 60
+            wait_for(client, "/health", deadline)
+            result["live"] = time.monotonic() - start
+            if first_after == "ready":
+                wait_for(client, "/ready", deadline)
+            result["ready"] = time.monotonic() - start
+
+            order_id = None
+            for route in ROUTES:
+                elapsed, response = timed_request(client, route, order_id)
+                if route == "POST /orders" and response.status_code == 201:
+                    order_id = response.json()["order_id"]
+                result[f"first {route}"] = elapsed
+            for route in ROUTES:
+                result[f"steady {route}"] = statistics.median(
+                    timed_request(client, route, order_id)[0] for _ in range(steady_requests)
+                )
+    finally:
+        stack.processes.remove(process)
+        process.terminate()
+        process.wait(timeout=10)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--first-after", choices=("ready", "health"), default="ready")
+    parser.add_argument("--steady", type=int, default=20, help="requests per route for the steady-state median")
+    args = parser.parse_args(argv)
+
+    stack = Stack(tempfile.mkdtemp(prefix="startup-"))
+    try:
+        stack.start(gateway=False)
+        runs = [one_start(stack, args.first_after, args.steady) for _ in range(args.runs)]
+    finally:
+        stack.stop()
+
+    print(f"gateway start, first requests after /{args.first_after}, median of {args.runs} runs")
+    print(f"{'':<32} {'first':>10} {'steady':>10}")
+    for name in ("live", "ready"):
+        print(f"{'time to /' + name if name == 'ready' else 'time to /health':<32} {statistics.median(r[name] for r in runs) * 1000:>8.0f}ms")
+    for route in ROUTES:
+        first = statistics.median(r[f"first {route}"] for r in runs)
+        steady = statistics.median(r[f"steady {route}"] for r in runs)
+        print(f"{route:<32} {first * 1000:>8.1f}ms {steady * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Stock reservations on one hot product: a single lock against the lock-striped
+StockLedger (order-processor/stock.py).
+
+    python benchmarks/stock.py
+    python benchmarks/stock.py --threads 64 --workers 64 --orders 20000 --shards 16
+
+ledger  --threads threads reserving one unit at a time straight on the ledger
+gRPC    ProcessOrder from --threads client threads against the real serve()
+        with --workers gRPC worker threads (RabbitMQ swapped for the in-memory
+        broker from standins.py)
+
+Every run sells out: the product is seeded with fewer units than there are
+reservations, and the run fails unless exactly the seeded quantity was sold.
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import free_port  # noqa: E402
+from micro import load_service  # noqa: E402
+from standins import InMemoryBroker  # noqa: E402
+
+PRODUCT_ID = "PROD-001"
+
+
+def run_threads(threads, work):
+    """work(index) on every thread at once, returns (seconds, results)"""
+    results = [None] * threads
+    start_line = threading.Barrier(threads + 1)
+
+    def run(index):
+        start_line.wait()
+        results[index] = work(index)
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start, results
+
+
+def ledger_run(stock, shards, threads, per_thread):
+    ledger = stock.StockLedger(shards)
+    seeded = threads * per_thread * 9 // 10
+    ledger.seed({PRODUCT_ID: seeded})
+
+    def reserve(_):
+        sold = 0
+        for _ in range(per_thread):
+            try:
+                ledger.reserve(PRODUCT_ID, 1)
+                sold += 1
+            except stock.OutOfStock:
+                pass
+        return sold
+
+    elapsed, sold = run_threads(threads, reserve)
+    return elapsed, sum(sold), seeded, ledger.available(PRODUCT_ID)
+
+
+def grpc_run(server, stock, shards, stub, order_pb2, grpc, threads, per_thread):
+    ledger = stock.StockLedger(shards)
+    seeded = threads * per_thread * 9 // 10
+    if shards:
+        ledger.seed({PRODUCT_ID: seeded})
+    server.stock_ledger = ledger
+
+    def order(index):
+        sold = 0
+        for i in range(per_thread):
+            request = order_pb2.OrderRequest(product_id=PRODUCT_ID, email=f"user{index}-{i}@example.com", quantity=1)
+            try:
+                stub.ProcessOrder(request, timeout=10)
+                sold += 1
+            except grpc.RpcError as e:
+                if e.code() != grpc.StatusCode.FAILED_PRECONDITION:
+                    raise
+        return sold
+
+    elapsed, sold = run_threads(threads, order)
+    return elapsed, sum(sold), seeded if shards else None, ledger.available(PRODUCT_ID)
+
+
+def report(name, elapsed, operations, sold, seeded, left):
+    if seeded is not None and (sold != seeded or left != 0):
+        raise SystemExit(f"{name}: sold {sold} of {seeded}, {left} left")
+    print(f"{name:<24} {operations / elapsed:>12,.0f} ops/s  {elapsed / operations * 1e6:>8.2f} us/op  sold {sold}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32, help="concurrent callers")
+    parser.add_argument("--workers", type=int, default=32, help="gRPC worker threads of the processor")
+    parser.add_argument("--reservations", type=int, default=200000, help="ledger reservations per run")
+    parser.add_argument("--orders", type=int, default=10000, help="ProcessOrder calls per run")
+    parser.add_argument("--shards", type=int, default=16, help="shards per product of the striped ledger")
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    server = load_service("order-processor", "server")
+    import grpc
+    import order_pb2
+    import order_pb2_grpc
+    import stock
+
+    ledger_per_thread = args.reservations // args.threads
+    print(f"ledger: {args.threads} threads, {ledger_per_thread * args.threads} reservations of one hot product")
+    for name, shards in (("single lock", 1), (f"{args.shards} shards", args.shards)):
+        elapsed, sold, seeded, left = ledger_run(stock, shards, args.threads, ledger_per_thread)
+        report(name, elapsed, ledger_per_thread * args.threads, sold, seeded, left)
+
+    server.GRPC_WORKERS = args.workers
+    port = free_port()
+    grpc_server = server.serve(
+        port=str(port), connection_factory=InMemoryBroker().connection, metrics_port=free_port(), block=False
+    )
+    grpc_per_thread = args.orders // args.threads
+    try:
+        with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+            stub = order_pb2_grpc.OrderProcessorStub(channel)
+            print(f"\ngRPC: {args.threads} clients, {args.workers} workers, {grpc_per_thread * args.threads} ProcessOrder calls")
+            # 0 shards: the product is not tracked, orders as before the ledger
+            for name, shards in (("no stock accounting", 0), ("single lock", 1), (f"{args.shards} shards", args.shards)):
+                elapsed, sold, seeded, left = grpc_run(
+                    server, stock, shards, stub, order_pb2, grpc, args.threads, grpc_per_thread
+                )
+                report(name, elapsed, grpc_per_thread * args.threads, sold, seeded, left)
+    finally:
+        grpc_server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Bytes on the wire and decode time of one big order listing: v1 GetAllOrders
+(OrderList) against v2 GetAllOrdersV2 (OrderPageV2, with fewer columns each row),
+each to a client accepting no compression, deflate and gzip. Runs the real
+order-processor serve() (RabbitMQ swapped for the in-memory broker from
+standins.py) behind a TCP relay that counts what the processor sends back.
+
+    python benchmarks/wire.py
+    python benchmarks/wire.py --orders 100000 --customers 20000 --repeats 5
+
+wire     bytes from the processor for one call (HTTP/2 frames included)
+call     the whole call from the client, median of --repeats
+parse    FromString of the serialized response, median
+decode   parsing it and reading every order into a (order_id, status,
+         product_id, email, quantity) tuple, median
+"""
+import argparse
+import logging
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import free_port  # noqa: E402
+from micro import load_service  # noqa: E402
+from standins import InMemoryBroker  # noqa: E402
+
+
+class CountingRelay(threading.Thread):
+    """TCP relay to the processor, counts the bytes it sends back"""
+
+    def __init__(self, target_port):
+        super().__init__(name="relay", daemon=True)
+        self.target_port = target_port
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.received = 0
+        self._lock = threading.Lock()
+
+    def pipe(self, source, sink, count):
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                if count:
+                    with self._lock:
+                        self.received += len(data)
+                sink.sendall(data)
+        except OSError:
+            pass
+        finally:
+            sink.close()
+
+    def run(self):
+        while True:
+            client, _ = self.listener.accept()
+            upstream = socket.create_connection(("127.0.0.1", self.target_port))
+            threading.Thread(target=self.pipe, args=(client, upstream, False), daemon=True).start()
+            threading.Thread(target=self.pipe, args=(upstream, client, True), daemon=True).start()
+
+    def take(self):
+        with self._lock:
+            received, self.received = self.received, 0
+        return received
+
+
+def parse_v1(order_pb2, data):
+    return order_pb2.OrderList.FromString(data)
+
+
+def parse_v2(order_pb2, data):
+    return order_pb2.OrderPageV2.FromString(data)
+
+
+def decode_v1(order_pb2, data):
+    return [(o.order_id, o.status, o.product_id, o.email, o.quantity) for o in order_pb2.OrderList.FromString(data).orders]
+
+
+def decode_v2(order_pb2, data):
+    page = order_pb2.OrderPageV2.FromString(data)
+    names = {value: name[len("STATUS_"):].lower().replace("_", " ") for name, value in order_pb2.Status.items()}
+    products, emails = list(page.products), list(page.emails) or [""]
+    email_column = page.email or [0] * len(page.ids)
+    return [
+        (f"ORD-{key:016X}", names[status], products[product], emails[email], quantity)
+        for key, status, product, email, quantity in zip(page.ids, page.status, page.product, email_column, page.quantity)
+    ]
+
+
+def median_time(fn, repeats):
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100000, help="orders in the listing")
+    parser.add_argument("--customers", type=int, default=20000, help="distinct emails among them")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--level", default="low", help="the processor's GRPC_COMPRESSION_LEVEL (none turns compression off)")
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    server = load_service("order-processor", "server")
+    import grpc
+    import order_pb2
+    import order_pb2_grpc
+    import order_ids
+    from google.protobuf import field_mask_pb2
+
+    products = [f"PROD-{i:03d}" for i in range(1, 7)]
+    with server.db_lock:
+        for i in range(args.orders):
+            server.insert_order(order_ids.next_key(), products[i % len(products)], f"customer{i % args.customers}@example.com", 1 + i % 3)
+
+    server.GRPC_COMPRESSION_LEVEL = args.level
+    port = free_port()
+    grpc_server = server.serve(
+        port=str(port), connection_factory=InMemoryBroker().connection, metrics_port=free_port(), block=False
+    )
+    relay = CountingRelay(port)
+    relay.start()
+    def columns(*paths):
+        return order_pb2.ListOrdersV2Request(read_mask=field_mask_pb2.FieldMask(paths=paths))
+
+    variants = (
+        ("v1 OrderList", "GetAllOrders", order_pb2.Empty(), parse_v1, decode_v1),
+        ("v2 all columns", "GetAllOrdersV2", columns(), parse_v2, decode_v2),
+        ("v2 gateway columns", "GetAllOrdersV2", columns("status", "product", "email", "quantity"), parse_v2, decode_v2),
+        ("v2 without email", "GetAllOrdersV2", columns("status", "product", "quantity"), parse_v2, decode_v2),
+    )
+    print(f"{args.orders} orders, {args.customers} customers, median of {args.repeats}")
+    print(f"{'':<20} {'compression':<12} {'wire':>12} {'call':>10} {'parse':>10} {'decode':>10}")
+    try:
+        for name, method, request, parse, decode in variants:
+            decode_time = None
+            # what the client accepts (grpc_compression_algorithm bits), the processor picks from it
+            for compression, accepted in (("none", 1), ("deflate", 1 | 1 << 1), ("gzip", 1 | 1 << 2)):
+                options = [("grpc.max_receive_message_length", -1), ("grpc.compression_enabled_algorithms_bitset", accepted)]
+                with grpc.insecure_channel(f"127.0.0.1:{relay.port}", options=options) as channel:
+                    call = getattr(order_pb2_grpc.OrderProcessorStub(channel), method)
+                    response = call(request)
+                    relay.take()
+                    call(request)
+                    wire = relay.take()
+                    call_time, _ = median_time(lambda: call(request), args.repeats)
+                if decode_time is None:
+                    data = response.SerializeToString()
+                    parse_time, _ = median_time(lambda: parse(order_pb2, data), args.repeats)
+                    decode_time, decoded = median_time(lambda: decode(order_pb2, data), args.repeats)
+                    assert len(decoded) == args.orders
+                print(f"{name:<20} {compression:<12} {wire / 1e6:>9.2f} MB {call_time * 1000:>7.0f} ms {parse_time * 1000:>7.1f} ms {decode_time * 1000:>7.0f} ms")
+    finally:
+        grpc_server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Single-process order system: the FastAPI gateway, OrderProcessorServicer and
+the notification workers in one Python process, for one-box (edge)
+deployments and as the no-network baseline in benchmarks.
+
+    python embedded/embedded.py --port 8000
+    SOAP_SERVICE_URL=http://127.0.0.1:18080/ws/ProductValidator?wsdl python embedded/embedded.py
+
+The services are the unchanged modules of api-gateway, order-processor and
+notification-service; only the hops between them are swapped:
+
+    gateway -> processor   LocalStub calls the servicer directly (through the
+                           processor's tracing / RPC metrics interceptors),
+                           nothing is serialized and no socket is involved
+    processor -> notifier  LocalRelay drains the outbox into the notifier's
+                           LaneScheduler and worker threads instead of RabbitMQ
+    processor -> gateway   the same relay feeds order events to the gateway's
+                           order cache instead of the orders.events fanout
+
+ProductValidator stays a separate SOAP service (SOAP_SERVICE_URL). Metrics of
+all three services are served on the gateway's /metrics.
+"""
+import argparse
+import collections
+import concurrent.futures
+import functools
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import types
+
+import grpc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules with the same name in several services (metrics.py differs per service);
+# profiling.py is not reloaded, one capture then covers all three services
+SHARED_NAMES = ("metrics", "tracing", "logsetup")
+
+# notifications handed to the notifier but not acked yet; beyond that the
+# events wait in the outbox, like they do when RabbitMQ is slow
+EMBEDDED_MAX_IN_FLIGHT = int(os.getenv("EMBEDDED_MAX_IN_FLIGHT", "10000"))
+
+logger = logging.getLogger("Embedded")
+
+
+def load(directory, *modules):
+    """
+    Imports modules of one service from its directory, with its own copies of
+    the shared helpers. SERVICE_NAME is the directory while importing, so spans
+    land in the same trace files as in the networked deployment.
+    """
+    path = os.path.join(ROOT, directory)
+    for name in SHARED_NAMES:
+        sys.modules.pop(name, None)
+    service_name = os.environ.get("SERVICE_NAME")
+    os.environ["SERVICE_NAME"] = directory
+    sys.path.insert(0, path)
+    try:
+        return [importlib.import_module(module) for module in modules]
+    finally:
+        sys.path.remove(path)
+        if service_name is None:
+            del os.environ["SERVICE_NAME"]
+        else:
+            os.environ["SERVICE_NAME"] = service_name
+
+
+class LocalRpcError(grpc.RpcError):
+    """What a failed call raises, like the grpc.RpcError of a remote call"""
+
+    def __init__(self, code, details):
+        super().__init__(f"{code.name}: {details}")
+        self._code = code
+        self._details = details
+
+    def code(self):
+        return self._code
+
+    def details(self):
+        return self._details
+
+
+class LocalContext:
+    """The parts of grpc.ServicerContext the servicer and its interceptors use"""
+
+    def __init__(self, timeout, metadata):
+        self._deadline = None if timeout is None else time.monotonic() + timeout
+        self._metadata = metadata
+        self._code = None
+        self._details = None
+
+    def invocation_metadata(self):
+        return self._metadata
+
+    def time_remaining(self):
+        return None if self._deadline is None else max(0.0, self._deadline - time.monotonic())
+
+    def is_active(self):
+        return True
+
+    def set_code(self, code):
+        self._code = code
+
+    def set_details(self, details):
+        self._details = details
+
+    def code(self):
+        return self._code
+
+    def details(self):
+        return self._details
+
+    def abort(self, code, details):
+        self._code, self._details = code, details
+        raise LocalRpcError(code, details)
+
+
+class _HandlerCallDetails(collections.namedtuple("_HandlerCallDetails", ("method", "invocation_metadata")), grpc.HandlerCallDetails):
+    pass
+
+
+class LocalStub:
+    """
+    OrderProcessorStub look-alike for the gateway: stub.Method(request, timeout=...)
+    runs the servicer method in the calling thread, wrapped by the processor's
+    server interceptors exactly like serve() does. A status code set by the
+    servicer comes back as LocalRpcError, an exception as UNKNOWN.
+    """
+
+    def __init__(self, servicer, service_name, interceptors, inject, latency):
+        self._servicer = servicer
+        self._service_name = service_name
+        self._interceptors = interceptors
+        # the gateway's tracing.inject, traceparent goes over as invocation metadata
+        self._inject = inject
+        self._latency = latency
+        self._methods = {}
+
+    def __getattr__(self, method):
+        call = self._methods.get(method)
+        if call is None:
+            handler = grpc.unary_unary_rpc_method_handler(getattr(self._servicer, method))
+            details = _HandlerCallDetails(f"/{self._service_name}/{method}", ())
+            # first interceptor outermost, as in grpc.server(interceptors=...)
+            for interceptor in reversed(self._interceptors):
+                handler = interceptor.intercept_service(lambda _, inner=handler: inner, details)
+            call = self._methods[method] = functools.partial(self._call, method, handler.unary_unary)
+        return call
+
+    def _call(self, method, behavior, request, timeout=None):
+        context = LocalContext(timeout, tuple(self._inject().items()))
+        start = time.perf_counter()
+        try:
+            response = behavior(request, context)
+        except grpc.RpcError:
+            raise
+        except Exception as e:
+            raise LocalRpcError(grpc.StatusCode.UNKNOWN, f"Exception calling application: {e}") from e
+        finally:
+            self._latency.labels("local", method).observe(time.perf_counter() - start)
+        code = context.code()
+        if code is not None and code != grpc.StatusCode.OK:
+            raise LocalRpcError(code, context.details())
+        return response
+
+
+class LocalDelivery:
+    """
+    Channel and method of one in-process message for the notifier's callback:
+    ack frees its in-flight slot, nack hands it to the workers again (the
+    broker's requeue).
+    """
+
+    delivery_tag = 1
+
+    def __init__(self, relay, lane, key, properties, body):
+        self.relay = relay
+        self.lane = lane
+        self.key = key
+        self.properties = properties
+        self.body = body
+        self.redelivered = False
+
+    def basic_ack(self, delivery_tag):
+        self.relay.in_flight.release()
+
+    def basic_nack(self, delivery_tag):
+        self.redelivered = True
+        self.relay.deliver(self)
+
+
+class LocalRelay(threading.Thread):
+    """
+    OutboxRelay for the embedded mode: outbox events go to the notifier's
+    LaneScheduler (same lanes, same per-order partition keys as the queues)
+    and to the gateway's order cache. Events leave the outbox once handed over.
+    """
+
+    def __init__(self, outbox, outbox_module, scheduler, lanes, order_cache, max_in_flight=EMBEDDED_MAX_IN_FLIGHT):
+        super().__init__(name="local-relay", daemon=True)
+        self.outbox = outbox
+        self.outbox_module = outbox_module
+        self.scheduler = scheduler
+        self.lane_of_queue = {cfg["queue"]: name for name, cfg in lanes.items()}
+        self.order_cache = order_cache
+        self.in_flight = threading.Semaphore(max_in_flight)
+
+    def deliver(self, delivery):
+        self.scheduler.put(delivery.lane, delivery.key, (delivery, delivery, delivery.properties, delivery.body, time.time()))
+
+    def publish(self, event, traceparent):
+        lane_queue = self.outbox_module.NOTIFICATION_LANES[event["type"]]
+        key = self.outbox_module.partition_queue(lane_queue, self.outbox_module.partition_for(event["order_id"]))
+        headers = {"published_at": time.time()}
+        if traceparent:
+            headers["traceparent"] = traceparent
+        properties = types.SimpleNamespace(headers=headers)
+        self.in_flight.acquire()
+        self.deliver(LocalDelivery(self, self.lane_of_queue[lane_queue], key, properties, json.dumps(event).encode()))
+        self.order_cache.apply(event["order_id"], event["new_status"])
+
+    def run(self):
+        while True:
+            batch = self.outbox.wait_batch(self.outbox_module.OUTBOX_BATCH_SIZE, 0, timeout=1)
+            if not batch:
+                continue
+            for event, traceparent in batch:
+                self.publish(event, traceparent)
+            self.outbox.ack(len(batch))
+            self.outbox_module.OUTBOX_PUBLISHED.inc(len(batch))
+
+
+class LocalOrderEvents:
+    """Takes the place of OrderEventListener: LocalRelay feeds the cache, it is live for the process' lifetime"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def start(self):
+        self.cache.subscribed()
+
+    def stop(self):
+        self.cache.unsubscribed()
+
+
+def build():
+    """Loads the three services into this process, connects them, returns the gateway's app module"""
+    server, outbox_module = load("order-processor", "server", "outbox")
+    (consumer,) = load("notification-service", "consumer")
+    (gateway,) = load("api-gateway", "app")
+
+    server.start_background(metrics_port=None)
+
+    scheduler = consumer.LaneScheduler(consumer.LANES)
+    for i in range(consumer.NOTIFY_WORKERS):
+        threading.Thread(target=consumer.worker_loop, args=(scheduler,), name=f"notify-worker-{i}", daemon=True).start()
+    LocalRelay(server.outbox, outbox_module, scheduler, consumer.LANES, gateway.order_cache).start()
+
+    service_name = server.order_pb2.DESCRIPTOR.services_by_name["OrderProcessor"].full_name
+    interceptors = [server.tracing.GrpcServerTracingInterceptor(), server.RpcMetricsInterceptor()]
+    gateway.grpc_channel["stub"] = LocalStub(
+        server.OrderProcessorServicer(), service_name, interceptors, gateway.tracing.inject, gateway.DOWNSTREAM_LATENCY
+    )
+    ready = concurrent.futures.Future()
+    ready.set_result(None)
+    gateway.grpc_channel["ready"] = ready
+    gateway.order_events["listener"] = LocalOrderEvents
+    gateway.profiling.SERVICE_NAME = "embedded"
+    return gateway
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info", help="uvicorn's log level")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    gateway = build()
+    logger.info("Gateway, processor and notifier in one process on %s:%d", args.host, args.port)
+    uvicorn.run(gateway.app, host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,66 +3,306 @@ import json
 import logging
 import time
 import os
+import threading
+import functools
+from collections import deque
 
-# log config
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from partitions import (
+    MEMBERSHIP_EXCHANGE, NOTIFICATION_PARTITIONS, HEARTBEAT_INTERVAL,
+    Membership, assign, partition_queue
 )
+import tracing
+import logsetup
+import profiling
+from metrics import CONSUMED, LANE_LATENCY, PROCESSING_TIME, REDELIVERED, start_metrics_server
+
+# log config (queue + writer thread, see logsetup.py)
+logsetup.setup()
 logger = logging.getLogger(__name__)
+# per-message lines, sampled and rate limited (LOG_SAMPLE_RATE / LOG_RATE_LIMIT)
+message_log = logsetup.Sampled(logger)
 
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
 
+# worker threads shared by all lanes
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "4"))
+
+# lanes - confirmations/cancellations are picked ahead of bulk status updates
+# weight = share of worker capacity when both lanes have work waiting
+# prefetch = how many unacked messages a lane may buffer locally, per partition
+LANES = {
+    "confirmation": {
+        "queue": "notifications.confirmation",
+        "weight": int(os.getenv("LANE_CONFIRMATION_WEIGHT", "4")),
+        "prefetch": int(os.getenv("LANE_CONFIRMATION_PREFETCH", "4")),
+    },
+    "status": {
+        "queue": "notifications.status",
+        "weight": int(os.getenv("LANE_STATUS_WEIGHT", "1")),
+        "prefetch": int(os.getenv("LANE_STATUS_PREFETCH", "2")),
+    },
+}
+
 # email sending simulation
 # in real scenario we would use smtp etc or something different
 def send_email_notification(order_id: str, email: str):
-    logger.info(f"Sending email notification...")
-    logger.info(f"To: {email}")
-    logger.info(f"Subject: Order confirmation {order_id}")
-    logger.info(f"Content: Your Order {order_id} has been accepted for processing")
+    message_log.info("Sending email to %s: Order confirmation %s - your order has been accepted for processing", email, order_id)
 
     # sending lag simulation
     time.sleep(1)
-    
-    logger.info(f"Sent successfully for order {order_id}")
+
+    message_log.info("Sent successfully for order %s", order_id)
 
 # callback to process message from queue
 def callback(ch, method, properties, body):
     try:
         message = json.loads(body)
-        logger.info(f"Received: {message}")
-        
+        message_log.info("Received: %s", message)
+
         order_id = message.get("order_id")
         email = message.get("email")
         notification_type = message.get("type", "unknown")
-        
+
         if notification_type == "order_confirmation":
             send_email_notification(order_id, email)
-        
+
         elif notification_type == "status_update":
             new_status = message.get("new_status")
-            logger.info(f"Status Update Notification for {order_id}: is now '{new_status}'")
+            message_log.info("Status Update Notification for %s: is now '%s'", order_id, new_status)
 
         elif notification_type == "order_cancellation":
-             logger.info(f"Order Cancelled Notification for {order_id}")
-             
+            message_log.info("Order Cancelled Notification for %s", order_id)
+
         else:
-            logger.warning(f"Unknown notification type: {notification_type}")
-            
+            message_log.warning("Unknown notification type: %s", notification_type)
+
         ch.basic_ack(delivery_tag=method.delivery_tag)
-        
+
     except Exception as e:
-        logger.error(f"Error processing message: {e}")
+        message_log.error("Error processing message: %s", e)
         ch.basic_nack(delivery_tag=method.delivery_tag)
 
+
+class ThreadsafeChannel:
+    """Channel proxy for worker threads, acks are handed back to the connection thread"""
+
+    def __init__(self, connection, channel):
+        self._connection = connection
+        self._channel = channel
+
+    def basic_ack(self, delivery_tag):
+        self._connection.add_callback_threadsafe(
+            functools.partial(self._channel.basic_ack, delivery_tag=delivery_tag)
+        )
+
+    def basic_nack(self, delivery_tag):
+        self._connection.add_callback_threadsafe(
+            functools.partial(self._channel.basic_nack, delivery_tag=delivery_tag)
+        )
+
+
+class LaneScheduler:
+    """
+    Local buffers for every lane + smooth weighted round robin between them.
+    Lanes without runnable work do not consume their share, so a single busy
+    lane still gets all workers.
+
+    Items carry their partition queue as key and a partition queue is handed to
+    one worker at a time, that keeps the per order ordering of the queue. Lanes
+    are not ordered against each other: an order's cancellation (confirmation
+    lane) may be handled before an earlier status update still waiting in the
+    status lane.
+    """
+
+    def __init__(self, lanes):
+        self._cond = threading.Condition()
+        self._buffers = {name: deque() for name in lanes}
+        self._weights = {name: cfg["weight"] for name, cfg in lanes.items()}
+        self._current = {name: 0 for name in lanes}
+        self._busy = set()
+        self._on_idle = {}
+
+    def put(self, lane, key, item):
+        with self._cond:
+            self._buffers[lane].append((key, item))
+            self._cond.notify()
+
+    def _runnable(self, lane):
+        for index, (key, _) in enumerate(self._buffers[lane]):
+            if key not in self._busy:
+                return index
+        return None
+
+    def get(self):
+        with self._cond:
+            while True:
+                ready = {}
+                for name in self._buffers:
+                    index = self._runnable(name)
+                    if index is not None:
+                        ready[name] = index
+                if ready:
+                    break
+                self._cond.wait()
+
+            total = 0
+            for name in ready:
+                self._current[name] += self._weights[name]
+                total += self._weights[name]
+            lane = max(ready, key=lambda name: self._current[name])
+            self._current[lane] -= total
+
+            buffer = self._buffers[lane]
+            key, item = buffer[ready[lane]]
+            del buffer[ready[lane]]
+            self._busy.add(key)
+            return lane, key, item
+
+    def done(self, key):
+        with self._cond:
+            self._busy.discard(key)
+            on_idle = self._on_idle.pop(key, None)
+            self._cond.notify_all()
+        if on_idle:
+            on_idle()
+
+    def revoke(self, key, on_idle):
+        """Drops buffered items of the partition, on_idle runs once nothing of it is in flight"""
+        with self._cond:
+            for buffer in self._buffers.values():
+                for entry in [entry for entry in buffer if entry[0] == key]:
+                    buffer.remove(entry)
+            if key in self._busy:
+                self._on_idle[key] = on_idle
+                return
+        on_idle()
+
+
+class PartitionedConsumer:
+    """
+    Owns a set of partition queues and rebalances them when replicas join or
+    leave. Every partition has its own channel - a revoked partition is closed
+    only after its in-flight message is acked, the broker then requeues the
+    buffered rest in order for the next owner. Partition queues are single
+    active consumer, so two replicas never consume one partition concurrently
+    even while their member views briefly disagree.
+    """
+
+    def __init__(self, connection, scheduler, membership=None):
+        self.connection = connection
+        self.scheduler = scheduler
+        self.membership = membership or Membership()
+        self.partitions = {
+            partition_queue(cfg["queue"], p): name
+            for name, cfg in LANES.items()
+            for p in range(NOTIFICATION_PARTITIONS)
+        }
+        self._channels = {}
+        self._members = None
+        self._control = None
+
+    def start(self):
+        self._control = self.connection.channel()
+        for queue in self.partitions:
+            self._control.queue_declare(queue=queue, durable=True, arguments={"x-single-active-consumer": True})
+
+        self._control.exchange_declare(exchange=MEMBERSHIP_EXCHANGE, exchange_type="fanout")
+        result = self._control.queue_declare(queue="", exclusive=True, auto_delete=True)
+        self._control.queue_bind(queue=result.method.queue, exchange=MEMBERSHIP_EXCHANGE)
+        self._control.basic_consume(
+            queue=result.method.queue,
+            on_message_callback=lambda ch, method, properties, body: self.membership.on_message(body),
+            auto_ack=True
+        )
+
+        self._heartbeat()
+        # give the peers one heartbeat to show up before the first assignment
+        self.connection.call_later(HEARTBEAT_INTERVAL * 1.5, self._tick)
+
+    def _heartbeat(self, leaving=False):
+        self._control.basic_publish(exchange=MEMBERSHIP_EXCHANGE, routing_key="", body=self.membership.heartbeat(leaving))
+
+    def _tick(self):
+        self._heartbeat()
+        members = self.membership.alive()
+        if members != self._members:
+            self._members = members
+            self.rebalance(members)
+        self.connection.call_later(HEARTBEAT_INTERVAL, self._tick)
+
+    def rebalance(self, members):
+        owned = assign(self.membership.replica_id, members, self.partitions)
+        revoked = set(self._channels) - owned
+        acquired = owned - set(self._channels)
+        logger.info("Rebalance: %d replicas, own %d partitions (+%d/-%d)", len(members), len(owned), len(acquired), len(revoked))
+
+        for queue in revoked:
+            channel = self._channels.pop(queue)
+            close = functools.partial(self.connection.add_callback_threadsafe, channel.close)
+            self.scheduler.revoke(queue, close)
+
+        for queue in sorted(acquired):
+            self._subscribe(queue)
+
+    def _subscribe(self, queue):
+        lane = self.partitions[queue]
+        channel = self.connection.channel()
+        channel.basic_qos(prefetch_count=LANES[lane]["prefetch"])
+        safe_channel = ThreadsafeChannel(self.connection, channel)
+
+        def on_message(ch, method, properties, body):
+            # deliveries racing a revoke stay unacked and are requeued on close
+            if self._channels.get(queue) is not channel:
+                return
+            self.scheduler.put(lane, queue, (safe_channel, method, properties, body, time.time()))
+
+        # consumer register
+        channel.basic_consume(queue=queue, on_message_callback=on_message)
+        self._channels[queue] = channel
+
+    def leave(self):
+        try:
+            self._heartbeat(leaving=True)
+        except Exception as e:
+            logger.warning("Could not announce leaving: %s", e)
+
+
+def worker_loop(scheduler):
+    while True:
+        lane, key, (ch, method, properties, body, received_at) = scheduler.get()
+        if method.redelivered:
+            REDELIVERED.labels(lane).inc()
+
+        headers = properties.headers or {}
+        start = time.perf_counter()
+        try:
+            parent = tracing.parse_traceparent(headers.get("traceparent"))
+            with tracing.span(f"amqp.consume/{lane}", parent=parent, partition=key) as message_span:
+                message_span.set("queued_ms", (time.time() - headers.get("published_at", received_at)) * 1000)
+                callback(ch, method, properties, body)
+        finally:
+            scheduler.done(key)
+
+        elapsed = time.perf_counter() - start
+        PROCESSING_TIME.labels(lane).observe(elapsed)
+        # only while a profile capture runs
+        slow_calls = profiling.slow_calls
+        if slow_calls is not None:
+            slow_calls.record(f"lane {lane}", elapsed)
+        CONSUMED.labels(lane).inc()
+        # end to end when the publisher stamped the message, local wait + work otherwise
+        started = headers.get("published_at", received_at)
+        LANE_LATENCY.labels(lane).observe(time.time() - started)
+
+
 def main():
-    
+
     logger.info("Waiting for notify service...")
-    
+
     # wait for rabbit
     max_retries = 30
     retry_count = 0
-    
+
     while retry_count < max_retries:
         try:
             credentials = pika.PlainCredentials('guest', 'guest')
@@ -72,43 +312,42 @@ def main():
                 heartbeat=600,
                 blocked_connection_timeout=300
             )
-            
+
             connection = pika.BlockingConnection(parameters)
-            channel = connection.channel()
-            
-            logger.info(f"Connected with RabbitMQ on {RABBITMQ_HOST}")
+
+            logger.info("Connected with RabbitMQ on %s", RABBITMQ_HOST)
             break
-            
+
         except pika.exceptions.AMQPConnectionError:
             retry_count += 1
-            logger.warning(f"Cant connect to RabbitMQ, try {retry_count}/{max_retries}")
+            logger.warning("Cant connect to RabbitMQ, try %d/%d", retry_count, max_retries)
             time.sleep(2)
-    
+
     if retry_count >= max_retries:
         logger.error("Cant connect to RabbitMQ")
         return
-    
-    channel.queue_declare(queue='notifications', durable=True)
-    
-    # orefetch, 1 message at a time
-    channel.basic_qos(prefetch_count=1)
-    
-    # consumer register
-    channel.basic_consume(
-        queue='notifications',
-        on_message_callback=callback
-    )
-    
-    logger.info("Waiting for messages...")
-    
+
+    scheduler = LaneScheduler(LANES)
+
+    consumer = PartitionedConsumer(connection, scheduler)
+    consumer.start()
+
+    for i in range(NOTIFY_WORKERS):
+        threading.Thread(target=worker_loop, args=(scheduler,), name=f"notify-worker-{i}", daemon=True).start()
+    start_metrics_server()
+    profiling.install_signal_handler()
+
+    logger.info("Replica %s waiting for messages on lanes %s with %d workers...", consumer.membership.replica_id, ", ".join(LANES), NOTIFY_WORKERS)
+
     try:
-        channel.start_consuming()
+        while True:
+            connection.process_data_events(time_limit=1)
     except KeyboardInterrupt:
         logger.info("stopping consumer...")
-        channel.stop_consuming()
     finally:
+        consumer.leave()
         connection.close()
         logger.info("Connection closed")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,28 @@
+import os
+
+from prometheus_client import Counter, Histogram, start_http_server
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONSUMED = Counter(
+    "notification_consumed_total", "Messages processed (rate() gives consumed/sec)",
+    ["lane"]
+)
+REDELIVERED = Counter(
+    "notification_redelivered_total", "Messages the broker delivered again after a nack or a lost consumer",
+    ["lane"]
+)
+PROCESSING_TIME = Histogram(
+    "notification_processing_seconds", "Time spent in the message callback",
+    ["lane"], buckets=LATENCY_BUCKETS
+)
+LANE_LATENCY = Histogram(
+    "notification_lane_latency_seconds", "Publish to processed latency per lane",
+    ["lane"], buckets=LATENCY_BUCKETS
+)
+
+
+def start_metrics_server(port=METRICS_PORT):
+    start_http_server(port)
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# must match NOTIFICATION_PARTITIONS of order-processor
+NOTIFICATION_PARTITIONS = int(os.getenv("NOTIFICATION_PARTITIONS", "8"))
+
+REPLICA_ID = os.getenv("REPLICA_ID") or f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+MEMBERSHIP_EXCHANGE = "notifications.members"
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", "2"))
+MEMBER_TIMEOUT = float(os.getenv("MEMBER_TIMEOUT", "6"))
+
+
+def partition_for(order_id, partitions=NOTIFICATION_PARTITIONS):
+    # crc32 is stable across processes (unlike hash())
+    return zlib.crc32(order_id.encode()) % partitions
+
+
+def partition_queue(lane_queue, partition):
+    return f"{lane_queue}.{partition}"
+
+
+def _score(member, partition):
+    return int.from_bytes(hashlib.md5(f"{member}/{partition}".encode()).digest()[:8], "big")
+
+
+def assign(replica_id, members, partitions):
+    """
+    Rendezvous hashing - every replica computes the same owner for a partition
+    from the same member list, and a join/leave only moves the partitions of
+    that one member.
+    """
+    if not members:
+        return set()
+    return {p for p in partitions if max(members, key=lambda m: _score(m, p)) == replica_id}
+
+
+class Membership:
+    """Replicas seen on the membership exchange, expiring after MEMBER_TIMEOUT"""
+
+    def __init__(self, replica_id=REPLICA_ID, timeout=MEMBER_TIMEOUT):
+        self.replica_id = replica_id
+        self.timeout = timeout
+        self._last_seen = {replica_id: time.monotonic()}
+
+    def on_message(self, body):
+        message = json.loads(body)
+        member = message["replica"]
+        if message.get("leaving"):
+            self._last_seen.pop(member, None)
+        else:
+            self._last_seen[member] = time.monotonic()
+
+    def heartbeat(self, leaving=False):
+        self._last_seen[self.replica_id] = time.monotonic()
+        return json.dumps({"replica": self.replica_id, "leaving": leaving})
+
+    def alive(self):
+        now = time.monotonic()
+        for member, seen in list(self._last_seen.items()):
+            if member != self.replica_id and now - seen > self.timeout:
+                del self._last_seen[member]
+        return sorted(self._last_seen)
@@ -0,0 +1,74 @@
+from consumer import LANES, LaneScheduler
+from partitions import partition_for, partition_queue
+
+
+def test_cancellation_can_overtake_a_status_update_of_another_lane():
+    # the documented exception to per-order ordering: lanes are not ordered against each other
+    scheduler = LaneScheduler(LANES)
+    partition = partition_for("ORD-0000000000000001")
+    status_queue = partition_queue(LANES["status"]["queue"], partition)
+    confirmation_queue = partition_queue(LANES["confirmation"]["queue"], partition)
+
+    scheduler.put("status", status_queue, "on delivery")
+    scheduler.put("confirmation", confirmation_queue, "cancelled")
+
+    assert scheduler.get() == ("confirmation", confirmation_queue, "cancelled")
+    assert scheduler.get() == ("status", status_queue, "on delivery")
+
+
+LANE_WEIGHTS = {"confirmation": {"weight": 4}, "status": {"weight": 1}}
+
+
+def test_lanes_share_by_weight_while_both_have_work():
+    scheduler = LaneScheduler(LANE_WEIGHTS)
+    for i in range(20):
+        scheduler.put("confirmation", f"c{i}", i)
+        scheduler.put("status", f"s{i}", i)
+
+    picked = []
+    for _ in range(10):
+        lane, key, _ = scheduler.get()
+        scheduler.done(key)
+        picked.append(lane)
+    assert picked.count("confirmation") == 8 and picked.count("status") == 2
+    # smooth: the status lane is not starved until the end of a round
+    assert "status" in picked[:5]
+
+
+def test_idle_lane_does_not_hold_back_the_busy_one():
+    scheduler = LaneScheduler(LANE_WEIGHTS)
+    for i in range(3):
+        scheduler.put("status", f"s{i}", i)
+    assert [scheduler.get()[0] for _ in range(3)] == ["status"] * 3
+
+
+def test_partition_is_handed_to_one_worker_at_a_time_in_order():
+    scheduler = LaneScheduler(LANE_WEIGHTS)
+    scheduler.put("confirmation", "q.1", "first")
+    scheduler.put("confirmation", "q.1", "second")
+    scheduler.put("confirmation", "q.2", "other")
+
+    assert scheduler.get() == ("confirmation", "q.1", "first")
+    # q.1 is busy, its second item waits behind the first
+    assert scheduler.get() == ("confirmation", "q.2", "other")
+    scheduler.done("q.1")
+    assert scheduler.get() == ("confirmation", "q.1", "second")
+
+
+def test_revoke_drops_buffered_items_and_waits_for_the_one_in_flight():
+    scheduler = LaneScheduler(LANE_WEIGHTS)
+    scheduler.put("confirmation", "q.1", "first")
+    scheduler.put("confirmation", "q.1", "second")
+    scheduler.put("status", "q.1", "third")
+    scheduler.put("status", "q.2", "other")
+    assert scheduler.get()[2] == "first"
+
+    idle = []
+    scheduler.revoke("q.1", lambda: idle.append("q.1"))
+    assert idle == []
+    scheduler.done("q.1")
+    assert idle == ["q.1"]
+    assert scheduler.get() == ("status", "q.2", "other")
+
+    scheduler.revoke("q.3", lambda: idle.append("q.3"))
+    assert idle == ["q.1", "q.3"]
@@ -0,0 +1,35 @@
+from partitions import assign
+
+PARTITIONS = range(64)
+
+
+def owners(members):
+    return {member: assign(member, members, PARTITIONS) for member in members}
+
+
+def test_every_partition_has_exactly_one_owner():
+    placement = owners(["a", "b", "c"])
+    assigned = [p for partitions in placement.values() for p in partitions]
+    assert sorted(assigned) == list(PARTITIONS)
+    # rendezvous hashing spreads them, no replica is left idle
+    assert all(placement.values())
+    # the member list's order does not matter, every replica computes the same split
+    assert owners(["c", "a", "b"]) == placement
+
+
+def test_leave_moves_only_the_leaving_members_partitions():
+    before = owners(["a", "b", "c"])
+    after = owners(["a", "c"])
+    assert before["a"] <= after["a"] and before["c"] <= after["c"]
+    assert after["a"] | after["c"] == set(PARTITIONS)
+
+
+def test_join_takes_partitions_only_from_others_without_shuffling_them():
+    before = owners(["a", "b"])
+    after = owners(["a", "b", "c"])
+    assert after["a"] <= before["a"] and after["b"] <= before["b"]
+    assert after["c"] == (before["a"] - after["a"]) | (before["b"] - after["b"])
+
+
+def test_no_members_owns_nothing():
+    assert assign("a", [], PARTITIONS) == set()
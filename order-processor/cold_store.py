@@ -0,0 +1,186 @@
+"""
+Cold tier of orders_db: orders created long ago and already final, moved out
+of the in-memory columns into two append-only files
+
+    orders.dat  one record per order: <key q><quantity i><status B><len H><len H> product_id email
+    orders.idx  (key q, offset into orders.dat q) per order, in key order
+
+Both are read through mmap, so pages come and go with the OS page cache and
+process memory does not grow with the cold tier. Records are appended through
+the file, not the mapping - only what gets read becomes resident.
+
+The compactor only ever moves the oldest hot rows, so keys arrive in ascending
+order and orders.idx stays sorted without being rewritten.
+"""
+import copy
+import mmap
+import os
+import struct
+import tempfile
+from bisect import bisect_left, bisect_right
+
+import order_ids
+from store import STATUSES
+
+RECORD = struct.Struct("<qiBHH")
+STATUS_OFFSET = 12
+INDEX_ENTRY = struct.Struct("<qq")
+
+
+class ColdStore:
+    """
+    Same read interface as OrderStore (row / values / snapshot / newest_first),
+    rows are positions in orders.idx. Statuses can still change (a delivered
+    order may be cancelled), that is a one-byte write in place.
+
+    Not thread-safe, callers hold db_lock.
+    """
+
+    def __init__(self, parent=None):
+        # the files go to a directory of their own under parent (the system
+        # temp directory by default), created with the first append: importing
+        # server.py elsewhere (benchmarks, embedded mode) must not truncate the
+        # files a running processor has mapped
+        self.parent = parent
+        self.directory = None
+        self._data = self._index = None
+        self._data_size = 0
+        self._count = 0
+        self._data_map = self._index_map = self._index_view = None
+        # views over orders.idx, usable like the hot keys column
+        self.keys = self.offsets = ()
+
+    def __len__(self):
+        return self._count
+
+    def _open(self):
+        if self.parent:
+            os.makedirs(self.parent, exist_ok=True)
+        # orders_db starts empty on every start, so does its cold tier
+        self.directory = tempfile.mkdtemp(prefix=f"order-processor-cold-{os.getpid()}-", dir=self.parent)
+        self._create()
+
+    def _create(self):
+        self._data = open(os.path.join(self.directory, "orders.dat"), "w+b")
+        self._index = open(os.path.join(self.directory, "orders.idx"), "w+b")
+
+    def _remove(self):
+        # unlinked, not truncated: a mapping still open keeps its pages
+        for f in (self._data, self._index):
+            f.close()
+            os.unlink(f.name)
+
+    def clear(self):
+        self._unmap()
+        if self._data is not None:
+            self._remove()
+            self._create()
+        self._data_size = self._count = 0
+
+    def close(self):
+        """Removes the files; a later append starts over in a new directory"""
+        self._unmap()
+        if self._data is not None:
+            self._remove()
+            os.rmdir(self.directory)
+            self._data = self._index = None
+        self._data_size = self._count = 0
+
+    def last_key(self):
+        return self.keys[-1] if self._count else None
+
+    def append(self, records):
+        """records: (key, status code, product_id, email, quantity), keys ascending and above last_key()"""
+        data, index = bytearray(), bytearray()
+        offset = self._data_size
+        for key, code, product_id, email, quantity in records:
+            product, address = product_id.encode(), email.encode()
+            index += INDEX_ENTRY.pack(key, offset + len(data))
+            data += RECORD.pack(key, quantity, code, len(product), len(address))
+            data += product
+            data += address
+        if not index:
+            return
+
+        if self._data is None:
+            self._open()
+        self._data.write(data)
+        self._index.write(index)
+        self._data.flush()
+        self._index.flush()
+        self._data_size += len(data)
+        self._count += len(index) // INDEX_ENTRY.size
+        self._remap()
+
+    def view(self):
+        """
+        Read-only copy of the store as it is now, usable after db_lock is
+        released: records never move, and appends remap this store, not the
+        copy. Only a status byte may change under it, a read sees it as it is
+        at that moment.
+        """
+        return copy.copy(self)
+
+    def _unmap(self):
+        # dropped, not closed: a view() may still read the old mappings, they
+        # are unmapped when the last reference goes
+        self._data_map = self._index_map = self._index_view = None
+        self.keys = self.offsets = ()
+
+    def _remap(self):
+        self._unmap()
+        self._data_map = mmap.mmap(self._data.fileno(), self._data_size, access=mmap.ACCESS_READ)
+        self._index_map = mmap.mmap(self._index.fileno(), self._count * INDEX_ENTRY.size, access=mmap.ACCESS_READ)
+        self._index_view = memoryview(self._index_map).cast("q")
+        self.keys, self.offsets = self._index_view[0::2], self._index_view[1::2]
+
+    def row(self, order_id):
+        key = order_ids.parse(order_id)
+        if key is None:
+            return None
+        row = bisect_left(self.keys, key)
+        if row < self._count and self.keys[row] == key:
+            return row
+        return None
+
+    def status_of(self, row):
+        return self._data_map[self.offsets[row] + STATUS_OFFSET]
+
+    def set_status(self, row, code):
+        # through the file, the read-only mapping sees it via the page cache
+        os.pwrite(self._data.fileno(), bytes((code,)), self.offsets[row] + STATUS_OFFSET)
+
+    def email_of(self, row):
+        return self.values(row)[3]
+
+    def record(self, row):
+        """(key, status code, product_id, email, quantity), like OrderStore.records"""
+        data, offset = self._data_map, self.offsets[row]
+        key, quantity, code, product_len, email_len = RECORD.unpack_from(data, offset)
+        start = offset + RECORD.size
+        product_id = data[start:start + product_len].decode()
+        email = data[start + product_len:start + product_len + email_len].decode()
+        return (key, code, product_id, email, quantity)
+
+    def values(self, row):
+        """(order_id, status, product_id, email, quantity) - the OrderResponse fields"""
+        key, code, product_id, email, quantity = self.record(row)
+        return (order_ids.format_key(key), STATUSES[code], product_id, email, quantity)
+
+    def records(self, rows):
+        return [self.record(row) for row in rows]
+
+    def snapshot(self, rows):
+        return [self.values(row) for row in rows]
+
+    def newest_first(self, limit=None, before=None, since=None):
+        """Same as OrderStore.newest_first, over orders.idx"""
+        hi = self._count if before is None else bisect_left(self.keys, before)
+        lo = 0 if since is None else bisect_right(self.keys, since)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return range(hi - 1, lo - 1, -1)
+
+    def nbytes(self):
+        """Size on disk, data + index"""
+        return self._data_size + self._count * INDEX_ENTRY.size
@@ -0,0 +1,109 @@
+"""
+ProcessOrder responses by idempotency key (OrderRequest.idempotency_key).
+
+The first call with a key runs; duplicates arriving while it runs wait for it
+and get its response, later ones get the stored response without creating an
+order, reserving stock or publishing a notification. A key reused for a
+different request is refused. Failed calls are not stored, the next call with
+the key runs again.
+
+Keys live IDEMPOTENCY_TTL seconds, at most IDEMPOTENCY_KEYS of them (least
+recently used go first). In memory like orders_db, per processor replica.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+IDEMPOTENCY_KEYS = int(os.getenv("IDEMPOTENCY_KEYS", "100000"))
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# longest a duplicate waits for the first call when it has no deadline of its own
+IDEMPOTENCY_WAIT = 30
+
+
+class KeyReused(Exception):
+    """The key belongs to a request with other fields"""
+
+
+class StillRunning(Exception):
+    """The first call with the key did not finish in time"""
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "response", "expires", "done")
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.response = None
+        self.expires = None
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """
+    Thread-safe. begin() either hands the key to the caller, who then calls
+    finish() or abandon(), or returns the response of the call that had it.
+    """
+
+    def __init__(self, max_size=IDEMPOTENCY_KEYS, ttl=IDEMPOTENCY_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def begin(self, key, fingerprint, timeout=None):
+        """
+        The stored response for key, waiting up to timeout seconds while the
+        first call runs; None when the caller got the key and runs the request.
+        Raises KeyReused or StillRunning.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires is not None and time.monotonic() >= entry.expires:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    self._entries[key] = _Entry(fingerprint)
+                    self._evict()
+                    return None
+                if entry.fingerprint != fingerprint:
+                    raise KeyReused(key)
+                if entry.response is not None:
+                    self._entries.move_to_end(key)
+                    return entry.response
+            left = None if deadline is None else deadline - time.monotonic()
+            if (left is not None and left <= 0) or not entry.done.wait(left):
+                raise StillRunning(key)
+            # finished: its response is there; abandoned: the key is free to take
+
+    def finish(self, key, response):
+        with self._lock:
+            entry = self._entries[key]
+            entry.response = response
+            entry.expires = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+        entry.done.set()
+
+    def abandon(self, key):
+        with self._lock:
+            entry = self._entries.pop(key)
+        entry.done.set()
+
+    def _evict(self):
+        # caller holds _lock; keys still running are kept, their callers finish or abandon them
+        excess = len(self._entries) - self.max_size
+        if excess <= 0:
+            return
+        stale = []
+        for key, entry in self._entries.items():
+            if entry.response is not None:
+                stale.append(key)
+                if len(stale) == excess:
+                    break
+        for key in stale:
+            del self._entries[key]
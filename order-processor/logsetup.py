@@ -0,0 +1,198 @@
+"""
+Logging setup shared by the Python services (keep the copies in api-gateway,
+order-processor and notification-service identical).
+
+setup() takes the place of logging.basicConfig: records are put on a bounded
+queue and a background thread formats and writes them in batches, the calling
+thread only builds the record. Messages use %-style arguments, so nothing is
+formatted for records that are filtered out, and the rest is formatted by the
+writer thread.
+
+Chatty lines on hot paths go through Sampled:
+
+    LOG_SAMPLE_RATE  share of sampled INFO lines that are written (default 1 = all)
+    LOG_RATE_LIMIT   lines per second per call site, WARNING and up included (0 = no limit)
+
+LOG_LEVEL sets the root level, LOG_FORMAT=json writes one JSON object per line
+(with the trace id when the record was logged inside a span).
+"""
+import atexit
+import collections
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+import tracing
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "50"))
+# records beyond this are dropped (and counted) instead of blocking the caller
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# how often the writer thread wakes up and writes the queued records
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.1"))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "service": tracing.SERVICE_NAME,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry)
+
+
+class QueueHandler(logging.Handler):
+    """
+    Appends records to a deque (no lock, append is atomic) and a writer thread
+    formats and writes whatever piled up every LOG_FLUSH_INTERVAL seconds, in
+    one write call. The calling thread never formats, never touches the stream.
+    """
+
+    def __init__(self, stream, formatter, with_trace=False, max_pending=LOG_QUEUE_SIZE):
+        super().__init__()
+        self.stream = stream
+        self.setFormatter(formatter)
+        self.with_trace = with_trace
+        self.max_pending = max_pending
+        self.queue = collections.deque()
+        self.dropped = 0
+        self._write_lock = threading.Lock()
+
+    def handle(self, record):
+        # logging.Handler.handle takes a lock around emit, the deque does not need it
+        if self.filter(record):
+            self.emit(record)
+        return record
+
+    def emit(self, record):
+        if len(self.queue) >= self.max_pending:
+            self.dropped += 1
+            return
+        if record.exc_info:
+            # the traceback does not outlive the except block, render it now
+            record.exc_text = self.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if self.with_trace:
+            # the span lives in the caller's context, the writer thread cannot see it
+            span = tracing.current_span()
+            record.trace_id = span.trace_id if span else None
+        self.queue.append(record)
+
+    def flush(self):
+        """Writes out everything queued so far (the writer thread, atexit, tests)"""
+        with self._write_lock:
+            lines = []
+            while self.queue:
+                record = self.queue.popleft()
+                try:
+                    lines.append(self.format(record))
+                except Exception:
+                    self.handleError(record)
+            if self.dropped:
+                lines.append(f"{self.dropped} log records dropped, LOG_QUEUE_SIZE={self.max_pending} was full")
+                self.dropped = 0
+            if lines:
+                lines.append("")
+                self.stream.write("\n".join(lines))
+                self.stream.flush()
+
+    def run_writer(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                # a broken stream must not kill the writer
+                pass
+
+
+def setup(level=LOG_LEVEL):
+    """
+    Like logging.basicConfig: does nothing when the root logger already has
+    handlers (tests, a second call). Returns the QueueHandler or None.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+
+    # no format string here uses the process name / id, skip looking them up
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    json_output = LOG_FORMAT == "json"
+    formatter = JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT)
+    handler = QueueHandler(sys.stderr, formatter, with_trace=json_output)
+    root.addHandler(handler)
+    root.setLevel(level)
+    threading.Thread(target=handler.run_writer, args=(LOG_FLUSH_INTERVAL,), name="log-writer", daemon=True).start()
+    # writes out what is still queued on a normal exit
+    atexit.register(handler.flush)
+    return handler
+
+
+class Sampled:
+    """
+    Logger front for hot paths. INFO lines are kept with probability
+    sample_rate, and every call site (message template) gets at most
+    rate_limit lines per second; how many were dropped is logged once the
+    site is allowed again. Disabled levels cost one isEnabledFor call.
+    """
+
+    def __init__(self, logger, sample_rate=LOG_SAMPLE_RATE, rate_limit=LOG_RATE_LIMIT):
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.rate_limit = rate_limit
+        # message template -> [tokens, last refill, dropped]
+        self._buckets = {}
+
+    def info(self, msg, *args):
+        self._log(logging.INFO, msg, args, self.sample_rate)
+
+    def warning(self, msg, *args):
+        self._log(logging.WARNING, msg, args, 1.0)
+
+    def error(self, msg, *args):
+        self._log(logging.ERROR, msg, args, 1.0)
+
+    def _log(self, level, msg, args, sample_rate):
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample_rate < 1 and random.random() >= sample_rate:
+            return
+        if self.rate_limit and not self._allow(msg):
+            return
+        self.logger.log(level, msg, *args)
+
+    def _allow(self, msg):
+        # token bucket per template; races between threads only blur the limit a little
+        now = time.monotonic()
+        bucket = self._buckets.get(msg)
+        if bucket is None:
+            bucket = self._buckets[msg] = [self.rate_limit, now, 0]
+        tokens = min(self.rate_limit, bucket[0] + (now - bucket[1]) * self.rate_limit)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            bucket[2] += 1
+            return False
+        bucket[0] = tokens - 1
+        if bucket[2]:
+            dropped, bucket[2] = bucket[2], 0
+            self.logger.warning("%d more lines like %r dropped by the rate limit", dropped, msg)
+        return True
@@ -0,0 +1,115 @@
+import os
+import time
+
+import grpc
+from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+import profiling
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+RPC_LATENCY = Histogram(
+    "processor_rpc_latency_seconds", "OrderProcessor RPC handling time",
+    ["method"], buckets=LATENCY_BUCKETS
+)
+RPC_TOTAL = Counter(
+    "processor_rpc_total", "OrderProcessor RPCs by status code",
+    ["method", "code"]
+)
+OUTBOX_PUBLISH_LATENCY = Histogram(
+    "processor_outbox_publish_seconds", "Time to publish and commit one outbox batch to RabbitMQ",
+    buckets=LATENCY_BUCKETS
+)
+OUTBOX_PUBLISHED = Counter("processor_outbox_published_total", "Order events published to RabbitMQ")
+IDEMPOTENT_REPLAYS = Counter(
+    "processor_idempotent_replays_total", "ProcessOrder calls answered with the stored response for their idempotency key"
+)
+
+
+class RpcMetricsInterceptor(grpc.ServerInterceptor):
+    """Wraps every unary handler once, per call cost is two clock reads + two metric updates"""
+
+    def __init__(self):
+        self._handlers = {}
+
+    def intercept_service(self, continuation, handler_call_details):
+        method = handler_call_details.method
+        wrapped = self._handlers.get(method)
+        if wrapped is None:
+            handler = continuation(handler_call_details)
+            if handler is None or handler.unary_unary is None:
+                return handler
+            wrapped = self._handlers[method] = self._wrap(method.rsplit("/", 1)[-1], handler)
+        return wrapped
+
+    @staticmethod
+    def _wrap(name, handler):
+        latency = RPC_LATENCY.labels(name)
+        inner = handler.unary_unary
+
+        def timed(request, context):
+            start = time.perf_counter()
+            code = None
+            try:
+                return inner(request, context)
+            except Exception:
+                # gRPC answers an escaped exception with UNKNOWN; abort() has set its own code
+                code = context.code() or grpc.StatusCode.UNKNOWN
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                latency.observe(elapsed)
+                if code is None:
+                    code = context.code()
+                RPC_TOTAL.labels(name, code.name if code else "OK").inc()
+                # only while a profile capture runs
+                slow_calls = profiling.slow_calls
+                if slow_calls is not None:
+                    slow_calls.record(name, elapsed)
+
+        return grpc.unary_unary_rpc_method_handler(
+            timed,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer
+        )
+
+
+class OrdersCollector:
+    """orders_db size and status distribution, computed at scrape time only"""
+
+    def __init__(self, status_counts):
+        self.status_counts = status_counts
+
+    def collect(self):
+        counts, pending_events = self.status_counts()
+        yield GaugeMetricFamily("processor_orders", "Orders held in orders_db", value=sum(counts.values()))
+        by_status = GaugeMetricFamily("processor_orders_by_status", "Orders per status", labels=["status"])
+        for status, count in counts.items():
+            by_status.add_metric([status], count)
+        yield by_status
+        yield GaugeMetricFamily("processor_outbox_pending", "Order events waiting in the outbox", value=pending_events)
+
+
+class StockCollector:
+    """Available quantity of every tracked product (stock.py), at scrape time"""
+
+    def __init__(self, stock_levels):
+        self.stock_levels = stock_levels
+
+    def collect(self):
+        available = GaugeMetricFamily("processor_stock_available", "Quantity left to reserve per product", labels=["product"])
+        for product, quantity in self.stock_levels().items():
+            available.add_metric([product], quantity)
+        yield available
+
+
+def start_metrics_server(status_counts, port=METRICS_PORT, stock_levels=None):
+    REGISTRY.register(OrdersCollector(status_counts))
+    if stock_levels is not None:
+        REGISTRY.register(StockCollector(stock_levels))
+    # None: another server in this process exposes REGISTRY (embedded mode)
+    if port is not None:
+        start_http_server(port)
@@ -0,0 +1,119 @@
+"""
+Time-ordered order IDs (snowflake layout, 63 bits):
+
+    | 42 bits ms since EPOCH_MS | 8 bits shard | 8 bits thread slot | 5 bits sequence |
+
+Written as ORD- plus 16 upper-case hex digits, fixed width, so string order is
+numeric order is creation order. Every thread owns a slot and its own
+sequence, generating an ID takes no lock.
+
+A slot goes back to the pool when its thread exits, together with its last
+(ms, sequence), so the next thread to take it carries on after the IDs it
+already gave out. More threads than slots generating IDs at once is an error,
+not a shared slot (256: the gateway's default executor in embedded mode is 192).
+"""
+import os
+import re
+import threading
+import time
+
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+
+SHARD_BITS = 8
+THREAD_BITS = 8
+SEQUENCE_BITS = 5
+TIMESTAMP_SHIFT = SHARD_BITS + THREAD_BITS + SEQUENCE_BITS
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+# threads that can generate IDs at the same time
+MAX_THREADS = 1 << THREAD_BITS
+
+# one per order-processor replica, IDs from different shards never collide
+ORDER_SHARD = int(os.getenv("ORDER_SHARD", "0")) & ((1 << SHARD_BITS) - 1)
+
+PREFIX = "ORD-"
+_HEX_DIGITS = re.compile("[0-9A-F]{16}")
+
+
+
+class _Slot:
+    __slots__ = ("number", "last_ms", "sequence")
+
+    def __init__(self, number):
+        self.number = number
+        self.last_ms = 0
+        self.sequence = 0
+
+
+class _Lease:
+    """Held in the owning thread's local storage only, gives the slot back when that goes"""
+
+    __slots__ = ("slot",)
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __del__(self):
+        _free_slots.append(self.slot)
+
+
+_local = threading.local()
+# slot 0 first; pop() and append() on a list are atomic under the GIL
+_free_slots = [_Slot(number) for number in reversed(range(MAX_THREADS))]
+
+
+def make(timestamp_ms, shard=ORDER_SHARD, slot=0, sequence=0):
+    return ((timestamp_ms - EPOCH_MS) << TIMESTAMP_SHIFT) | (shard << (THREAD_BITS + SEQUENCE_BITS)) | (slot << SEQUENCE_BITS) | sequence
+
+
+def next_key():
+    """New ID as an int, strictly increasing within the calling thread"""
+    slot = _local.__dict__.get("slot")
+    if slot is None:
+        slot = _take_slot()
+
+    now = time.time_ns() // 1_000_000
+    if now > slot.last_ms:
+        slot.last_ms = now
+        slot.sequence = 0
+    else:
+        # same millisecond (or the clock stepped back): keep counting, borrow the next ms when full
+        slot.sequence += 1
+        if slot.sequence > MAX_SEQUENCE:
+            slot.last_ms += 1
+            slot.sequence = 0
+    return make(slot.last_ms, ORDER_SHARD, slot.number, slot.sequence)
+
+
+def _take_slot():
+    try:
+        slot = _free_slots.pop()
+    except IndexError:
+        raise RuntimeError(f"More than {MAX_THREADS} threads generating order IDs at once") from None
+    _local.lease = _Lease(slot)
+    _local.slot = slot
+    return slot
+
+
+def format_key(key):
+    return f"{PREFIX}{key:016X}"
+
+
+def parse(order_id):
+    """int key of an order ID, None for anything this generator did not produce"""
+    # exactly what format_key writes: int() alone would also take lower case,
+    # "_" separators, a sign or spaces, several spellings of one order
+    if len(order_id) != len(PREFIX) + 16 or not order_id.startswith(PREFIX):
+        return None
+    digits = order_id[len(PREFIX):]
+    if not _HEX_DIGITS.fullmatch(digits):
+        return None
+    return int(digits, 16)
+
+
+def timestamp_ms(key):
+    return (key >> TIMESTAMP_SHIFT) + EPOCH_MS
+
+
+def first_key_at(timestamp_ms):
+    """Smallest key that can be generated at timestamp_ms, for time-range scans"""
+    return max(0, timestamp_ms - EPOCH_MS) << TIMESTAMP_SHIFT
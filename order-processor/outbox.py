@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import deque
+
+import pika
+
+from metrics import OUTBOX_PUBLISH_LATENCY, OUTBOX_PUBLISHED
+import tracing
+
+logger = logging.getLogger("OrderProcessor.Outbox")
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+# how long the relay lingers for more events before shipping a partial batch
+OUTBOX_LINGER = float(os.getenv("OUTBOX_LINGER", "0.01"))
+# events of one order always land in the same partition number, so within a
+# lane they stay in order (see NOTIFICATION_LANES for across lanes)
+NOTIFICATION_PARTITIONS = int(os.getenv("NOTIFICATION_PARTITIONS", "8"))
+
+# notification lanes (queue per lane), confirmations must not wait behind bulk status updates.
+# Ordering per order holds within a lane only: the notifier picks the confirmation
+# lane first, so a cancellation can overtake an earlier status_update of the same
+# order still queued in the status lane
+NOTIFICATION_LANES = {
+    "order_confirmation": "notifications.confirmation",
+    "order_cancellation": "notifications.confirmation",
+    "status_update": "notifications.status",
+}
+# every status change also goes to this fanout, gateways keep their order cache current from it
+ORDER_EVENTS_EXCHANGE = "orders.events"
+
+NOTIFICATION_TYPES = {
+    "created": "order_confirmation",
+    "cancelled": "order_cancellation",
+}
+
+
+def partition_for(order_id, partitions=NOTIFICATION_PARTITIONS):
+    # crc32 is stable across processes (unlike hash())
+    return zlib.crc32(order_id.encode()) % partitions
+
+
+def partition_queue(lane_queue, partition):
+    return f"{lane_queue}.{partition}"
+
+
+class Outbox:
+    """
+    Pending order events. add() is called inside the same critical section that
+    changes orders_db, so an event exists exactly when its state change does.
+    Events leave the outbox only after the broker accepted them.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._events = deque()
+
+    def add(self, order_id, email, status):
+        notification_type = NOTIFICATION_TYPES.get(status, "status_update")
+        event = {
+            "order_id": order_id,
+            "email": email,
+            "type": notification_type,
+            "new_status": status,
+        }
+        # the RPC span that caused the event continues in the notifier
+        current = tracing.current_span()
+        traceparent = current.traceparent if current is not None else None
+        with self._cond:
+            self._events.append((event, traceparent))
+            self._cond.notify()
+
+    def __len__(self):
+        return len(self._events)
+
+    def wait_batch(self, max_size, linger, timeout=None):
+        """Blocks until there is something to send, returns up to max_size events (still queued)"""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            if self._events:
+                deadline = time.monotonic() + linger
+                while len(self._events) < max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            return [self._events[i] for i in range(min(max_size, len(self._events)))]
+
+    def ack(self, count):
+        with self._cond:
+            for _ in range(count):
+                self._events.popleft()
+
+
+def rabbitmq_connection():
+    credentials = pika.PlainCredentials('guest', 'guest')
+    params = pika.ConnectionParameters(host=RABBITMQ_HOST, credentials=credentials, heartbeat=600)
+    return pika.BlockingConnection(params)
+
+
+class OutboxRelay(threading.Thread):
+    """
+    Streams outbox events to RabbitMQ. Every batch is published inside one AMQP
+    transaction, so a batch costs a single round trip and is removed from the
+    outbox only once committed (at-least-once delivery).
+    """
+
+    def __init__(self, outbox, connection_factory=rabbitmq_connection,
+                 batch_size=OUTBOX_BATCH_SIZE, linger=OUTBOX_LINGER):
+        super().__init__(name="outbox-relay", daemon=True)
+        self.outbox = outbox
+        self.connection_factory = connection_factory
+        self.batch_size = batch_size
+        self.linger = linger
+        self._connection = None
+        self._channel = None
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _connect(self):
+        self._connection = self.connection_factory()
+        self._channel = self._connection.channel()
+        for lane_queue in set(NOTIFICATION_LANES.values()):
+            for partition in range(NOTIFICATION_PARTITIONS):
+                self._channel.queue_declare(
+                    queue=partition_queue(lane_queue, partition),
+                    durable=True,
+                    arguments={"x-single-active-consumer": True}
+                )
+        self._channel.exchange_declare(exchange=ORDER_EVENTS_EXCHANGE, exchange_type="fanout")
+        self._channel.tx_select()
+        logger.info("Outbox relay connected to RabbitMQ on %s", RABBITMQ_HOST)
+
+    def _disconnect(self):
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
+
+    def publish_batch(self, batch):
+        start = time.perf_counter()
+        published_at = time.time()
+        for event, traceparent in batch:
+            headers = {"published_at": published_at}
+            if traceparent:
+                headers["traceparent"] = traceparent
+            self._channel.basic_publish(
+                exchange='',
+                routing_key=partition_queue(NOTIFICATION_LANES[event["type"]], partition_for(event["order_id"])),
+                body=json.dumps(event),
+                # lane latency on the consumer side is measured from here
+                properties=pika.BasicProperties(headers=headers)
+            )
+            # no email in here, the fanout reaches every gateway replica
+            self._channel.basic_publish(
+                exchange=ORDER_EVENTS_EXCHANGE,
+                routing_key='',
+                body=json.dumps({"order_id": event["order_id"], "new_status": event["new_status"]})
+            )
+        self._channel.tx_commit()
+        OUTBOX_PUBLISH_LATENCY.observe(time.perf_counter() - start)
+        OUTBOX_PUBLISHED.inc(len(batch))
+
+    def run(self):
+        backoff = 1
+        while not self._stopped.is_set():
+            try:
+                if self._channel is None:
+                    self._connect()
+                    backoff = 1
+
+                batch = self.outbox.wait_batch(self.batch_size, self.linger, timeout=1)
+                if not batch:
+                    # keeps heartbeats going while idle
+                    self._connection.process_data_events(time_limit=0)
+                    continue
+
+                self.publish_batch(batch)
+                self.outbox.ack(len(batch))
+
+            except Exception as e:
+                logger.error("Outbox relay error, %d events pending: %s", len(self.outbox), e)
+                self._disconnect()
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+        self._disconnect()
@@ -2,74 +2,403 @@ import grpc
 from concurrent import futures
 import time
 import logging
-import uuid
 import os
 import json
+import threading
 from zeep import Client
 from zeep.transports import Transport
 from requests import Session
 
 import order_pb2
 import order_pb2_grpc
+from outbox import Outbox, OutboxRelay, rabbitmq_connection
+from metrics import IDEMPOTENT_REPLAYS, METRICS_PORT, RpcMetricsInterceptor, start_metrics_server
+import order_ids
+from store import ACCEPTED, CANCELLED, DELIVERED, ON_DELIVERY, STATUSES, OrderStore
+from cold_store import ColdStore
+import stock
+import idempotency
+import tracing
+import logsetup
+import profiling
 
-logging.basicConfig(level=logging.INFO)
+logsetup.setup()
 logger = logging.getLogger("OrderProcessor")
+# per-RPC lines, sampled and rate limited (LOG_SAMPLE_RATE / LOG_RATE_LIMIT)
+rpc_log = logsetup.Sampled(logger)
 
 # config soap
 SOAP_SERVICE_URL = os.getenv("SOAP_SERVICE_URL", "http://product-validator:8080/ws/ProductValidator?wsdl")
+GRPC_PORT = os.getenv("GRPC_PORT", "50051")
+GRPC_WORKERS = int(os.getenv("GRPC_WORKERS", "10"))
+# response compression (none, low, medium, high), negotiated per call: gRPC picks
+# an algorithm the client lists in grpc-accept-encoding (gzip, deflate) and
+# answers clients that list none uncompressed. Off by default, on a LAN it
+# costs more time than the smaller listings save (benchmarks/wire.py)
+GRPC_COMPRESSION_LEVEL = os.getenv("GRPC_COMPRESSION_LEVEL", "none")
+COMPRESSION_LEVELS = {"none": 0, "low": 1, "medium": 2, "high": 3}
+# cap for one SOAP call, the caller's gRPC deadline may cut it shorter
+SOAP_TIMEOUT = float(os.getenv("SOAP_TIMEOUT", "5"))
 
-# database (in-memory)
-orders_db = {}
+# per-minute creation counts for GetOrderStats, a day of them by default
+STATS_BUCKET_SECONDS = int(os.getenv("STATS_BUCKET_SECONDS", "60"))
+STATS_BUCKETS = int(os.getenv("STATS_BUCKETS", "1440"))
 
-def update_order_status_based_on_time(order):
-    if order['status'] == 'cancelled':
-        return
+# database (in-memory, columnar - see store.py)
+orders_db = OrderStore(STATS_BUCKET_SECONDS, STATS_BUCKETS)
 
-    elapsed = time.time() - order['created_at']
+# orders created more than COLD_AFTER seconds ago and already final (delivered or
+# cancelled) move to cold_db (cold_store.py), checked every COMPACT_INTERVAL.
+# Measured from creation, not from when the order became final: with COLD_AFTER
+# above DELIVERED_AFTER every delivered order qualifies, and one cancelled just
+# now may move at once (its status stays cancelled there)
+COLD_AFTER = float(os.getenv("COLD_AFTER", "300"))
+COMPACT_INTERVAL = float(os.getenv("COMPACT_INTERVAL", "5"))
+# rows moved per db_lock hold, a big catch-up does not stall requests
+COMPACT_BATCH = 10000
+# its files live in a directory of their own under COLD_STORE_DIR (the temp directory by default)
+cold_db = ColdStore(os.getenv("COLD_STORE_DIR"))
+
+# every orders_db / cold_db change and its outbox event are written under this lock
+db_lock = threading.Lock()
+outbox = Outbox()
+
+# available quantity per product (stock.py): reserved before db_lock is taken,
+# released under it when an order is cancelled before it was delivered
+stock_ledger = stock.from_env()
+
+# ProcessOrder responses by idempotency key (idempotency.py)
+idempotency_store = idempotency.IdempotencyStore()
+
+# rows are in creation (key) order, so the orders due for their next timed
+# transition are always the ones between these cursors and "now"
+sweep_cursors = {"dispatch": 0, "delivery": 0}
+
+ON_DELIVERY_AFTER = 10
+DELIVERED_AFTER = 25
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# v2 listings (OrderPageV2): Status enum value per store status code, and the
+# columns a read_mask may name
+STATUS_V2 = [order_pb2.Status.Value("STATUS_" + status.upper().replace(" ", "_")) for status in STATUSES]
+ORDER_V2_FIELDS = frozenset(("status", "product", "email", "quantity", "created_at"))
+
+def update_order_status_based_on_time(row):
+    """Moves the order along its timeline, returns True when the status changed"""
+    previous = orders_db.status[row]
+    if previous == CANCELLED:
+        return False
+
+    elapsed = time.time() - orders_db.created_at(row)
     
-    if elapsed > 25:
-        order['status'] = 'delivered'
-    elif elapsed > 10:
-        order['status'] = 'on delivery'
+    if elapsed > DELIVERED_AFTER:
+        status = DELIVERED
+    elif elapsed > ON_DELIVERY_AFTER:
+        status = ON_DELIVERY
     else:
-        order['status'] = 'accepted'
+        status = ACCEPTED
+
+    if status == previous:
+        return False
+    orders_db.set_status(row, status)
+    return True
+
+def refresh_order(row):
+    # caller holds db_lock
+    if update_order_status_based_on_time(row):
+        outbox.add(orders_db.order_id(row), orders_db.email_of(row), orders_db.get_status(row))
+
+def advance_transitions(now):
+    """
+    Applies every timed transition due by now. Only touches the rows that became
+    due since the last call; afterwards every status in orders_db is current.
+    Caller holds db_lock.
+    """
+    for cursor, after in (("dispatch", ON_DELIVERY_AFTER), ("delivery", DELIVERED_AFTER)):
+        due = orders_db.count_before(order_ids.first_key_at(int((now - after) * 1000)))
+        for row in range(sweep_cursors[cursor], due):
+            refresh_order(row)
+        sweep_cursors[cursor] = max(due, sweep_cursors[cursor])
+
+def sweep_status_transitions():
+    """Emits the timed transitions even for orders nobody reads"""
+    now = time.time()
+    with db_lock:
+        advance_transitions(now)
+
+def new_order_id():
+    return order_ids.format_key(order_ids.next_key())
+
+def insert_order(key, product_id, email, quantity):
+    """Saves a new order together with its confirmation event, caller holds db_lock"""
+    row = orders_db.add(key, product_id, email, quantity, "accepted")
+    outbox.add(order_ids.format_key(key), email, "created")
+
+    if row < len(orders_db) - 1:
+        # landed before later keys, the rows behind it moved by one
+        swept = False
+        for cursor, position in sweep_cursors.items():
+            if row < position:
+                sweep_cursors[cursor] = position + 1
+                swept = True
+        if swept:
+            refresh_order(row)
+    return row
+
+def compact_orders(now):
+    """
+    Moves the oldest orders, created more than COLD_AFTER ago and already final,
+    from orders_db to cold_db. Stops at the first order that is still moving, so
+    every cold key stays below every hot key. Returns how many moved.
+    """
+    cutoff = order_ids.first_key_at(int((now - COLD_AFTER) * 1000))
+    moved = 0
+    while True:
+        with db_lock:
+            advance_transitions(now)
+            rows = orders_db.final_prefix(cutoff, COMPACT_BATCH)
+            if rows:
+                cold_db.append(orders_db.records(range(rows)))
+                orders_db.evict_prefix(rows)
+                for cursor, position in sweep_cursors.items():
+                    sweep_cursors[cursor] = max(0, position - rows)
+        moved += rows
+        if rows < COMPACT_BATCH:
+            return moved
+
+def compactor(interval=COMPACT_INTERVAL):
+    while True:
+        time.sleep(interval)
+        try:
+            compact_orders(time.time())
+        except Exception as e:
+            logger.error("Compactor error: %s", e)
+
+def read_fields(request, context):
+    """OrderPageV2 columns named by the request's read_mask (all when empty), None for an unknown one"""
+    fields = frozenset(request.read_mask.paths) or ORDER_V2_FIELDS
+    unknown = fields - ORDER_V2_FIELDS
+    if unknown:
+        context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+        context.set_details(f'Unknown read_mask fields: {", ".join(sorted(unknown))}')
+        return None
+    return fields
+
+def order_page_v2(records, fields, next_before=""):
+    """
+    OrderPageV2 of (key, status code, product_id, email, quantity) records, one
+    column per field; products and emails become indexes into the page's lists.
+    Only the columns in fields are filled.
+    """
+    page = order_pb2.OrderPageV2(next_before=next_before)
+    if not records:
+        return page
+    keys, codes, product_ids, emails, quantities = zip(*records)
+    page.ids.extend(keys)
+    if "status" in fields:
+        page.status.extend(map(STATUS_V2.__getitem__, codes))
+    for field, values, names in (("product", product_ids, page.products), ("email", emails, page.emails)):
+        if field in fields:
+            index = {}
+            getattr(page, field).extend([index.setdefault(value, len(index)) for value in values])
+            names.extend(index)
+    if "quantity" in fields:
+        page.quantity.extend(quantities)
+    if "created_at" in fields:
+        page.created_at.extend(map(order_ids.timestamp_ms, keys))
+    return page
+
+def list_bounds(request, context):
+    """before / since of a list request as int keys, None when one is not an order ID"""
+    bounds = {}
+    for field in ("before", "since"):
+        value = getattr(request, field)
+        if value:
+            bounds[field] = order_ids.parse(value)
+            if bounds[field] is None:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(f'Invalid {field} order id')
+                return None
+    return bounds
+
+def page_rows(limit, bounds):
+    """
+    Hot and cold rows of one page, newest first, and whether an older page
+    exists. Caller holds db_lock.
+    """
+    # one more row than asked tells whether an older page exists;
+    # the cold tier continues where the hot one ends
+    rows = orders_db.newest_first(limit=limit + 1, **bounds)
+    cold_rows = cold_db.newest_first(limit=limit + 1 - len(rows), **bounds) if len(rows) <= limit else range(0)
+    has_more = len(rows) + len(cold_rows) > limit
+    return rows[:limit], cold_rows[:limit - len(rows)], has_more
+
+def order_status_counts():
+    # counters kept by orders_db, no pass over the columns
+    with db_lock:
+        return orders_db.status_counts(), len(outbox)
+
+def status_sweeper(interval=1.0):
+    while True:
+        time.sleep(interval)
+        try:
+            sweep_status_transitions()
+        except Exception as e:
+            logger.error("Status sweeper error: %s", e)
 
 class OrderProcessorServicer(order_pb2_grpc.OrderProcessorServicer):
     def GetAllOrders(self, request, context):
-        logger.info("Fetching all orders history")
+        rpc_log.info("Fetching all orders history")
         response_list = []
         
-        # Sort
-        sorted_orders = sorted(orders_db.values(), key=lambda x: x['created_at'], reverse=True)
-        
-        for order in sorted_orders:
-            # status update
-            update_order_status_based_on_time(order)
-            
+        with db_lock:
+            # status update - catching up on due transitions makes every row current
+            advance_transitions(time.time())
+            # keys are time-ordered, newest first is the key column backwards;
+            # every cold key is older than every hot one
+            snapshot = orders_db.snapshot(orders_db.newest_first())
+            # cold records only ever change their status byte, decoded after the lock
+            cold = cold_db.view()
+        snapshot += cold.snapshot(cold.newest_first())
+
+        for order_id, status, product_id, email, quantity in snapshot:
             response_list.append(order_pb2.OrderResponse(
-                order_id=order['order_id'],
-                status=order['status'],
-                product_id=order['product_id'],
-                email=order['email'],
-                quantity=order['quantity']
+                order_id=order_id,
+                status=status,
+                product_id=product_id,
+                email=email,
+                quantity=quantity
             ))
             
         return order_pb2.OrderList(orders=response_list)
 
+    def GetOrderStats(self, request, context):
+        with db_lock:
+            # only the transitions due since the last call, then every counter is current
+            advance_transitions(time.time())
+            by_status = orders_db.status_counts()
+            by_product = orders_db.product_counts()
+            created = orders_db.created_counts()
+
+        return order_pb2.OrderStats(
+            total=sum(by_status.values()),
+            by_status=by_status,
+            by_product=by_product,
+            bucket_seconds=orders_db.bucket_seconds,
+            created=[order_pb2.TimeBucket(start=start, count=count) for start, count in created]
+        )
+
+    def ListOrders(self, request, context):
+        limit = min(request.limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        bounds = list_bounds(request, context)
+        if bounds is None:
+            return order_pb2.OrderPage()
+
+        with db_lock:
+            advance_transitions(time.time())
+            rows, cold_rows, has_more = page_rows(limit, bounds)
+            snapshot = orders_db.snapshot(rows) + cold_db.snapshot(cold_rows)
+
+        orders = [
+            order_pb2.OrderResponse(order_id=order_id, status=status, product_id=product_id, email=email, quantity=quantity)
+            for order_id, status, product_id, email, quantity in snapshot
+        ]
+        next_before = snapshot[-1][0] if has_more else ""
+        return order_pb2.OrderPage(orders=orders, next_before=next_before)
+
+    def GetAllOrdersV2(self, request, context):
+        fields = read_fields(request, context)
+        if fields is None:
+            return order_pb2.OrderPageV2()
+
+        with db_lock:
+            advance_transitions(time.time())
+            records = orders_db.records(orders_db.newest_first())
+            cold = cold_db.view()
+        records += cold.records(cold.newest_first())
+
+        return order_page_v2(records, fields)
+
+    def ListOrdersV2(self, request, context):
+        limit = min(request.limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        fields = read_fields(request, context)
+        bounds = list_bounds(request, context) if fields is not None else None
+        if bounds is None:
+            return order_pb2.OrderPageV2()
+
+        with db_lock:
+            advance_transitions(time.time())
+            rows, cold_rows, has_more = page_rows(limit, bounds)
+            records = orders_db.records(rows) + cold_db.records(cold_rows)
+
+        next_before = order_ids.format_key(records[-1][0]) if has_more else ""
+        return order_page_v2(records, fields, next_before)
+
     def ProcessOrder(self, request, context):
-        logger.info(f"Processing new order for: {request.product_id}")
-        
-        order_id = f"ORD-{str(uuid.uuid4())[:8].upper()}"
-        
-        # save to in-memory DB
-        orders_db[order_id] = {
-            "order_id": order_id,
-            "product_id": request.product_id,
-            "email": request.email,
-            "quantity": request.quantity,
-            "status": "accepted",
-            "created_at": time.time()
-        }
+        if not request.idempotency_key:
+            return self._place_order(request, context)
+
+        key = request.idempotency_key
+        left = context.time_remaining()
+        try:
+            stored = idempotency_store.begin(
+                key, (request.product_id, request.email, request.quantity),
+                idempotency.IDEMPOTENCY_WAIT if left is None else min(left, idempotency.IDEMPOTENCY_WAIT)
+            )
+        except idempotency.KeyReused:
+            context.set_code(grpc.StatusCode.ALREADY_EXISTS)
+            context.set_details('Idempotency key was used for a different order')
+            return order_pb2.OrderResponse()
+        except idempotency.StillRunning:
+            context.set_code(grpc.StatusCode.ABORTED)
+            context.set_details('An order with this idempotency key is still being processed')
+            return order_pb2.OrderResponse()
+        if stored is not None:
+            rpc_log.info("Replaying order for idempotency key: %s", key)
+            IDEMPOTENT_REPLAYS.inc()
+            return stored
+
+        try:
+            response = self._place_order(request, context)
+        except Exception:
+            idempotency_store.abandon(key)
+            raise
+        code = context.code()
+        if code is None or code == grpc.StatusCode.OK:
+            idempotency_store.finish(key, response)
+        else:
+            # refused (stock, quantity): not stored, a retry is processed again
+            idempotency_store.abandon(key)
+        return response
+
+    def _place_order(self, request, context):
+        rpc_log.info("Processing new order for: %s", request.product_id)
+        if request.quantity < 1:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details('Quantity must be at least 1')
+            return order_pb2.OrderResponse()
+
+        # lock-striped per product, a hot product does not queue every order on one lock
+        try:
+            stock_ledger.reserve(request.product_id, request.quantity)
+        except stock.OutOfStock:
+            context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
+            context.set_details(f'Out of stock: {request.product_id}')
+            return order_pb2.OrderResponse()
+
+        # time-ordered key (carries created_at), generated without taking db_lock
+        key = order_ids.next_key()
+        order_id = order_ids.format_key(key)
+
+        # save to in-memory DB together with the confirmation event
+        try:
+            with db_lock:
+                insert_order(key, request.product_id, request.email, request.quantity)
+        except Exception:
+            stock_ledger.release(request.product_id, request.quantity)
+            raise
         
         return order_pb2.OrderResponse(
             order_id=order_id,
@@ -81,56 +410,122 @@ class OrderProcessorServicer(order_pb2_grpc.OrderProcessorServicer):
 
     def GetOrderStatus(self, request, context):
         order_id = request.order_id
-        logger.info(f"Checking status for: {order_id}")
+        rpc_log.info("Checking status for: %s", order_id)
         
-        order = orders_db.get(order_id)
-        if not order:
+        order = None
+        with db_lock:
+            row = orders_db.row(order_id)
+            if row is not None:
+                refresh_order(row)
+                order = orders_db.values(row)
+            else:
+                # final already, nothing to refresh
+                row = cold_db.row(order_id)
+                if row is not None:
+                    order = cold_db.values(row)
+
+        if order is None:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details('Order not found')
             return order_pb2.OrderResponse()
 
-        update_order_status_based_on_time(order)
-
+        order_id, status, product_id, email, quantity = order
         return order_pb2.OrderResponse(
-            order_id=order['order_id'],
-            status=order['status'],
-            product_id=order['product_id'],
-            email=order['email'],
-            quantity=order['quantity']
+            order_id=order_id,
+            status=status,
+            product_id=product_id,
+            email=email,
+            quantity=quantity
         )
 
+    def GetOrders(self, request, context):
+        # request order, each ID once
+        requested = list(dict.fromkeys(request.order_ids))
+        if len(requested) > MAX_PAGE_SIZE:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f'At most {MAX_PAGE_SIZE} order ids per call')
+            return order_pb2.OrderLookup()
+
+        snapshot, not_found = [], []
+        with db_lock:
+            for order_id in requested:
+                row = orders_db.row(order_id)
+                if row is not None:
+                    refresh_order(row)
+                    snapshot.append(orders_db.values(row))
+                    continue
+                row = cold_db.row(order_id)
+                if row is not None:
+                    snapshot.append(cold_db.values(row))
+                else:
+                    not_found.append(order_id)
+
+        orders = [
+            order_pb2.OrderResponse(order_id=order_id, status=status, product_id=product_id, email=email, quantity=quantity)
+            for order_id, status, product_id, email, quantity in snapshot
+        ]
+        return order_pb2.OrderLookup(orders=orders, not_found=not_found)
+
     def CancelOrder(self, request, context):
         order_id = request.order_id
-        logger.info(f"Request to cancel: {order_id}")
+        rpc_log.info("Request to cancel: %s", order_id)
         
-        order = orders_db.get(order_id)
-        if not order:
+        order = None
+        previous = CANCELLED
+        with db_lock:
+            row = orders_db.row(order_id)
+            # state change
+            if row is not None:
+                # a delivery that is due counts, whether or not the sweeper got to it
+                refresh_order(row)
+                previous = orders_db.status[row]
+                if previous != CANCELLED:
+                    orders_db.set_status(row, CANCELLED)
+                    outbox.add(order_id, orders_db.email_of(row), "cancelled")
+                order = orders_db.values(row)
+            else:
+                row = cold_db.row(order_id)
+                if row is not None:
+                    previous = cold_db.status_of(row)
+                    if previous != CANCELLED:
+                        cold_db.set_status(row, CANCELLED)
+                        orders_db.recount_status(previous, CANCELLED)
+                        outbox.add(order_id, cold_db.email_of(row), "cancelled")
+                    order = cold_db.values(row)
+            # the reservation goes back once, with the transition that cancelled it,
+            # and only while the goods have not been delivered
+            if previous in (ACCEPTED, ON_DELIVERY):
+                stock_ledger.release(order[2], order[4])
+
+        if order is None:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details('Order not found')
             return order_pb2.OrderResponse()
 
-        # state change
-        order['status'] = 'cancelled'
-        
+        order_id, _, product_id, email, quantity = order
         return order_pb2.OrderResponse(
-            order_id=order['order_id'],
-            status=order['status'],
-            product_id=order['product_id'],
-            email=order['email'],
-            quantity=order['quantity']
+            order_id=order_id,
+            status='cancelled',
+            product_id=product_id,
+            email=email,
+            quantity=quantity
         )
 
     def GetAvailableProducts(self, request, context):
-        logger.info("Fetching products from SOAP service...")
+        rpc_log.info("Fetching products from SOAP service...")
         products_list = []
         
         try:
             session = Session()
-            transport = Transport(session=session)
+            left = context.time_remaining()
+            timeout = SOAP_TIMEOUT if left is None else max(0.001, min(left, SOAP_TIMEOUT))
+            transport = Transport(session=session, timeout=timeout, operation_timeout=timeout)
             client = Client(SOAP_SERVICE_URL, transport=transport)
             
             # ZEEP SOAP call
-            soap_response = client.service.getAvailableProducts()
+            with tracing.span("soap.client/getAvailableProducts"):
+                tracing.inject(session.headers)
+                soap_response = client.service.getAvailableProducts()
             
             if not soap_response:
                 return order_pb2.ProductList(products=[])
@@ -145,21 +540,53 @@ class OrderProcessorServicer(order_pb2_grpc.OrderProcessorServicer):
                 products_list.append(p)
                 
         except Exception as e:
-            logger.error(f"Error calling SOAP: {e}")
+            rpc_log.error("Error calling SOAP: %s", e)
             context.set_code(grpc.StatusCode.UNAVAILABLE)
             context.set_details(f'SOAP Service Unavailable: {str(e)}')
             return order_pb2.ProductList()
 
         return order_pb2.ProductList(products=products_list)
 
-def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+def start_background(metrics_port=METRICS_PORT):
+    """
+    Timed transitions swept and old orders compacted in the background, order
+    gauges registered (and served on metrics_port unless it is None). Used by
+    serve() and by the embedded single-process mode.
+    """
+    threading.Thread(target=status_sweeper, name="status-sweeper", daemon=True).start()
+    threading.Thread(target=compactor, name="compactor", daemon=True).start()
+    start_metrics_server(order_status_counts, metrics_port, stock_ledger.levels)
+
+def serve(port=GRPC_PORT, connection_factory=rabbitmq_connection, metrics_port=METRICS_PORT,
+          interceptors=(), block=True):
+    """
+    Starts the gRPC server with its background threads. connection_factory
+    and interceptors let the benchmarks swap RabbitMQ for an in-memory broker
+    and inject latency; with block=False the started server is returned
+    instead of waiting on it.
+    """
+    if GRPC_WORKERS > order_ids.MAX_THREADS:
+        raise ValueError(f"GRPC_WORKERS is {GRPC_WORKERS}, order IDs allow {order_ids.MAX_THREADS} threads")
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=GRPC_WORKERS),
+        interceptors=[*interceptors, tracing.GrpcServerTracingInterceptor(), RpcMetricsInterceptor()],
+        options=[("grpc.default_compression_level", COMPRESSION_LEVELS[GRPC_COMPRESSION_LEVEL.lower()])]
+    )
     order_pb2_grpc.add_OrderProcessorServicer_to_server(OrderProcessorServicer(), server)
     
-    port = "50051"
     server.add_insecure_port(f'[::]:{port}')
-    logger.info(f"gRPC Server started on port {port}")
+    logger.info("gRPC Server started on port %s", port)
     server.start()
+
+    # order events leave through the outbox
+    OutboxRelay(outbox, connection_factory).start()
+    start_background(metrics_port)
+
+    if not block:
+        return server
+
+    # kill -USR1: profile capture to PROFILE_DIR (see profiling.py)
+    profiling.install_signal_handler()
     try:
         while True:
             time.sleep(86400)
@@ -0,0 +1,127 @@
+"""
+Stock per product, reserved by ProcessOrder and released by CancelOrder (for
+orders not delivered yet).
+
+Every product's available quantity is split over STOCK_SHARDS counters, each
+with its own lock. A thread reserves from its own shard (threads get shards
+round-robin), so concurrent orders for one hot product mostly take different
+locks. Only when its shard runs short does a reservation take all of the
+product's locks (in shard order), check the total, and spread what is left
+evenly over the shards again.
+
+Products without a configured quantity are not tracked and never run out, so
+without STOCK_FILE nothing changes.
+"""
+import itertools
+import json
+import os
+import threading
+
+# products.json-style list: [{"id": "PROD-001", "stock": 500}, ...]; entries
+# without "stock" get STOCK_DEFAULT, or stay untracked when that is unset
+STOCK_FILE = os.getenv("STOCK_FILE")
+STOCK_DEFAULT = os.getenv("STOCK_DEFAULT")
+STOCK_SHARDS = int(os.getenv("STOCK_SHARDS", "16"))
+
+
+class OutOfStock(Exception):
+    pass
+
+
+def load_levels(path, default=None):
+    """{product_id: quantity} from a products.json-style file"""
+    with open(path) as f:
+        products = json.load(f)
+    levels = {}
+    for product in products:
+        quantity = product.get("stock", default)
+        if quantity is not None:
+            levels[product["id"]] = int(quantity)
+    return levels
+
+
+class StockLedger:
+    """
+    Lock-striped available quantities. reserve / release are safe to call from
+    any thread; callers may hold db_lock (stock locks are taken inside it,
+    never the other way round).
+    """
+
+    def __init__(self, shards=STOCK_SHARDS):
+        self.shards = max(1, shards)
+        # product_id -> (counts, locks), one of each per shard
+        self._products = {}
+        self._local = threading.local()
+        # next() on itertools.count is atomic under the GIL
+        self._next_shard = itertools.count()
+
+    def seed(self, levels):
+        """Sets the available quantity of every product in levels, replacing what was there"""
+        for product_id, quantity in levels.items():
+            self._products[product_id] = (self._spread(quantity), [threading.Lock() for _ in range(self.shards)])
+
+    def tracked(self, product_id):
+        return product_id in self._products
+
+    def available(self, product_id):
+        """Available quantity, None for untracked products; a snapshot without the locks"""
+        entry = self._products.get(product_id)
+        return None if entry is None else sum(entry[0])
+
+    def levels(self):
+        return {product_id: sum(counts) for product_id, (counts, _) in self._products.items()}
+
+    def reserve(self, product_id, quantity):
+        """Takes quantity from the product's stock, raises OutOfStock when there is not enough"""
+        entry = self._products.get(product_id)
+        if entry is None:
+            return
+        counts, locks = entry
+        shard = self._shard()
+        with locks[shard]:
+            if counts[shard] >= quantity:
+                counts[shard] -= quantity
+                return
+        self._reserve_all(product_id, counts, locks, quantity)
+
+    def release(self, product_id, quantity):
+        """Gives back a reservation (cancelled order)"""
+        entry = self._products.get(product_id)
+        if entry is None:
+            return
+        counts, locks = entry
+        shard = self._shard()
+        with locks[shard]:
+            counts[shard] += quantity
+
+    def _reserve_all(self, product_id, counts, locks, quantity):
+        for lock in locks:
+            lock.acquire()
+        try:
+            total = sum(counts)
+            if total < quantity:
+                raise OutOfStock(product_id)
+            # what is left, evenly over the shards: the next reservations take the fast path again
+            counts[:] = self._spread(total - quantity)
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def _spread(self, quantity):
+        base, extra = divmod(quantity, self.shards)
+        return [base + 1 if shard < extra else base for shard in range(self.shards)]
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = next(self._next_shard) % self.shards
+        return shard
+
+
+def from_env():
+    """The ledger ProcessOrder uses, seeded from STOCK_FILE when it is set"""
+    ledger = StockLedger()
+    if STOCK_FILE:
+        default = None if STOCK_DEFAULT is None else int(STOCK_DEFAULT)
+        ledger.seed(load_levels(STOCK_FILE, default))
+    return ledger
@@ -0,0 +1,257 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+import order_ids
+
+# status codes, the order of the timeline
+STATUSES = ("accepted", "on delivery", "delivered", "cancelled")
+ACCEPTED, ON_DELIVERY, DELIVERED, CANCELLED = range(len(STATUSES))
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+# evicting rows leaves email codes no hot row uses; the email dictionary is
+# rebuilt (a pass over the whole email column) once they are this share of it
+EMAIL_REBUILD_SHARE = 0.5
+
+
+class Dictionary:
+    """Dictionary encoding: every distinct value is stored once, columns hold its small int code"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class OrderStore:
+    """
+    Orders as columns (one row per order) instead of one dict each, rows sorted
+    by the int64 order key (see order_ids.py). Keys are time-ordered, so rows
+    are in creation order: lookups bisect the key column, newest-first and
+    since/before scans are slices, and created_at comes from the key itself.
+
+    product_id and email are dictionary-encoded, status is a byte.
+
+    Counts per status, per product and per creation time bucket (the last
+    max_buckets of bucket_seconds each) are kept up to date on every add and
+    set_status, so reading them does not touch the columns.
+
+    Not thread-safe, callers hold db_lock.
+    """
+
+    def __init__(self, bucket_seconds=60, max_buckets=1440):
+        self.products = Dictionary()
+        self.emails = Dictionary()
+        self.keys = array("q")
+        self.product = array("I")
+        self.email = array("I")
+        self.quantity = array("i")
+        self.status = array("B")
+        # hot rows per email code, and how many codes are down to none
+        self.email_refs = array("I")
+        self.dead_emails = 0
+
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.status_totals = [0] * len(STATUSES)
+        self.product_totals = array("q")
+        self.created_buckets = Counter()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, order_id):
+        return self.row(order_id) is not None
+
+    def clear(self):
+        self.__init__(self.bucket_seconds, self.max_buckets)
+
+    def add(self, key, product_id, email, quantity, status):
+        """Inserts in key order and returns the row, nearly always an append"""
+        product = self.products.encode(product_id)
+        code = STATUS_CODES[status]
+        self._count(key, product, code)
+
+        keys = self.keys
+        row = len(keys)
+        if row and keys[-1] > key:
+            # two threads' IDs from the same millisecond arrived out of order
+            row = bisect_left(keys, key)
+            self.keys.insert(row, key)
+            self.product.insert(row, product)
+            self.email.insert(row, self._encode_email(email))
+            self.quantity.insert(row, quantity)
+            self.status.insert(row, code)
+            return row
+
+        keys.append(key)
+        self.product.append(product)
+        self.email.append(self._encode_email(email))
+        self.quantity.append(quantity)
+        self.status.append(code)
+        return row
+
+    def _encode_email(self, email):
+        code = self.emails.encode(email)
+        refs = self.email_refs
+        if code == len(refs):
+            refs.append(1)
+        else:
+            if not refs[code]:
+                self.dead_emails -= 1
+            refs[code] += 1
+        return code
+
+    def _count(self, key, product, code):
+        self.status_totals[code] += 1
+        if product == len(self.product_totals):
+            self.product_totals.append(0)
+        self.product_totals[product] += 1
+
+        bucket = order_ids.timestamp_ms(key) // (self.bucket_seconds * 1000)
+        buckets = self.created_buckets
+        if bucket not in buckets and len(buckets) >= self.max_buckets:
+            oldest = min(buckets)
+            if bucket < oldest:
+                return
+            del buckets[oldest]
+        buckets[bucket] += 1
+
+    def set_status(self, row, code):
+        """The one way to change a status, keeps status_totals current"""
+        previous = self.status[row]
+        if previous != code:
+            self.status[row] = code
+            self.recount_status(previous, code)
+
+    def recount_status(self, previous, code):
+        # also for status changes of orders already moved to the cold tier
+        self.status_totals[previous] -= 1
+        self.status_totals[code] += 1
+
+    def final_prefix(self, before, limit):
+        """How many leading rows have a key < before and a final status, at most limit"""
+        keys, status = self.keys, self.status
+        end = min(bisect_left(keys, before), limit)
+        rows = 0
+        # DELIVERED and CANCELLED are the last codes of the timeline
+        while rows < end and status[rows] >= DELIVERED:
+            rows += 1
+        return rows
+
+    def records(self, rows):
+        """(key, status code, product_id, email, quantity) - what the cold tier stores"""
+        products, emails = self.products.values, self.emails.values
+        return [
+            (self.keys[row], self.status[row], products[self.product[row]], emails[self.email[row]], self.quantity[row])
+            for row in rows
+        ]
+
+    def evict_prefix(self, rows):
+        """
+        Drops the first rows (moved to the cold tier). The counters keep counting
+        them; addresses only they used leave the email dictionary with its next
+        rebuild, once enough of them piled up (EMAIL_REBUILD_SHARE).
+        """
+        refs = self.email_refs
+        for code in self.email[:rows]:
+            refs[code] -= 1
+            if not refs[code]:
+                self.dead_emails += 1
+        for column in (self.keys, self.product, self.email, self.quantity, self.status):
+            del column[:rows]
+
+        if self.dead_emails > len(self.emails) * EMAIL_REBUILD_SHARE:
+            self._rebuild_emails()
+
+    def _rebuild_emails(self):
+        emails, previous = Dictionary(), self.emails
+        # old code -> new code, live addresses keep their relative order
+        new_codes = array("I", [0]) * len(previous)
+        for code, value in enumerate(previous.values):
+            if self.email_refs[code]:
+                new_codes[code] = emails.encode(value)
+        self.email = array("I", map(new_codes.__getitem__, self.email))
+        self.email_refs = array("I", [count for count in self.email_refs if count])
+        self.emails = emails
+        self.dead_emails = 0
+
+    def row(self, order_id):
+        key = order_ids.parse(order_id)
+        if key is None:
+            return None
+        row = bisect_left(self.keys, key)
+        if row < len(self.keys) and self.keys[row] == key:
+            return row
+        return None
+
+    def order_id(self, row):
+        return order_ids.format_key(self.keys[row])
+
+    def created_at(self, row):
+        return order_ids.timestamp_ms(self.keys[row]) / 1000
+
+    def get_status(self, row):
+        return STATUSES[self.status[row]]
+
+    def email_of(self, row):
+        return self.emails.values[self.email[row]]
+
+    def values(self, row):
+        """(order_id, status, product_id, email, quantity) - the OrderResponse fields"""
+        return (
+            order_ids.format_key(self.keys[row]),
+            STATUSES[self.status[row]],
+            self.products.values[self.product[row]],
+            self.emails.values[self.email[row]],
+            self.quantity[row],
+        )
+
+    def snapshot(self, rows):
+        """values() for many rows, column by column"""
+        keys, status, quantity = self.keys, self.status, self.quantity
+        product, products = self.product, self.products.values
+        email, emails = self.email, self.emails.values
+        prefix = order_ids.PREFIX
+        return [
+            (f"{prefix}{keys[row]:016X}", STATUSES[status[row]], products[product[row]], emails[email[row]], quantity[row])
+            for row in rows
+        ]
+
+    def newest_first(self, limit=None, before=None, since=None):
+        """
+        Rows newest first, optionally only keys < before and > since (int keys),
+        at most limit of them - a range over the key column, no sorting.
+        """
+        hi = len(self.keys) if before is None else bisect_left(self.keys, before)
+        lo = 0 if since is None else bisect_right(self.keys, since)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return range(hi - 1, lo - 1, -1)
+
+    def count_before(self, key):
+        return bisect_left(self.keys, key)
+
+    def status_counts(self):
+        return Counter(dict(zip(STATUSES, self.status_totals)))
+
+    def product_counts(self):
+        return dict(zip(self.products.values, self.product_totals))
+
+    def created_counts(self):
+        """[(bucket start in epoch seconds, orders created in it)], oldest first"""
+        return [(bucket * self.bucket_seconds, count) for bucket, count in sorted(self.created_buckets.items())]
+
+    def nbytes(self):
+        """Column payload, without the dictionaries"""
+        columns = (self.keys, self.product, self.email, self.quantity, self.status)
+        return sum(column.itemsize * len(column) for column in columns)
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(current_dir)
+sys.path.insert(0, app_dir)
+
+
+class Context:
+    """Enough of grpc.ServicerContext to call servicer methods directly"""
+
+    def __init__(self, time_remaining=None):
+        self._code = None
+        self.details = None
+        self._time_remaining = time_remaining
+
+    def set_code(self, code):
+        self._code = code
+
+    def set_details(self, details):
+        self.details = details
+
+    def code(self):
+        return self._code
+
+    def time_remaining(self):
+        return self._time_remaining
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """server.py with its stores emptied"""
+    import server
+    import stock
+    import idempotency
+
+    with server.db_lock:
+        server.orders_db.clear()
+        server.sweep_cursors.update(dispatch=0, delivery=0)
+    monkeypatch.setattr(server, "stock_ledger", stock.StockLedger())
+    monkeypatch.setattr(server, "idempotency_store", idempotency.IdempotencyStore())
+    yield server
+    # removes its files, the next append starts a new directory
+    server.cold_db.close()
+
+
+@pytest.fixture
+def call(server):
+    """call(method, request) -> (response, context) on a fresh context"""
+    servicer = server.OrderProcessorServicer()
+
+    def call(method, request, context=None):
+        context = context or Context()
+        return getattr(servicer, method)(request, context), context
+
+    return call
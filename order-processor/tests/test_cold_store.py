@@ -0,0 +1,134 @@
+import os
+import time
+
+import order_pb2
+import order_ids
+from cold_store import ColdStore
+from store import CANCELLED, DELIVERED, OrderStore
+
+
+def old_key(i, now=None):
+    # created long enough ago to be final and past COLD_AFTER
+    return order_ids.make(int(((now or time.time()) - 3600) * 1000), sequence=i % 32, slot=i // 32)
+
+
+def filled_store(size, emails=lambda i: f"customer{i}@example.com"):
+    orders = OrderStore()
+    base = order_ids.make(1760000000000)
+    for i in range(size):
+        orders.add(base + i, f"PROD-00{i % 3}", emails(i), 1 + i % 4, "delivered")
+    return orders
+
+
+def test_evicted_rows_read_back_from_the_cold_tier(tmp_path):
+    orders, cold = filled_store(1000), ColdStore(str(tmp_path))
+    expected = orders.records(range(len(orders)))
+
+    cold.append(orders.records(range(600)))
+    orders.evict_prefix(600)
+
+    assert orders.records(range(len(orders))) == expected[600:]
+    assert cold.records(range(len(cold))) == expected[:600]
+    order_id = order_ids.format_key(expected[10][0])
+    assert orders.row(order_id) is None
+    assert cold.values(cold.row(order_id)) == (order_id, "delivered", "PROD-001", "customer10@example.com", 3)
+    assert cold.last_key() == expected[599][0]
+    # newest first, limits and key bounds like the hot store
+    assert list(cold.newest_first(limit=2)) == [599, 598]
+    assert list(cold.newest_first(before=expected[5][0], since=expected[2][0])) == [4, 3]
+    cold.close()
+
+
+def test_email_dictionary_is_rebuilt_once_half_of_it_is_unused():
+    # the first 400 addresses are used once, the rest share 10
+    orders = filled_store(1000, lambda i: f"once{i}@example.com" if i < 400 else f"shared{i % 10}@example.com")
+    expected = orders.records(range(len(orders)))
+    assert len(orders.emails) == 410
+
+    orders.evict_prefix(100)
+    # 100 of 410 unused: kept until more pile up
+    assert len(orders.emails) == 410
+    orders.evict_prefix(200)
+    assert len(orders.emails) == 110
+    assert orders.dead_emails == 0
+    assert orders.records(range(len(orders))) == expected[300:]
+
+    # an address that comes back after being evicted is live again
+    orders.add(expected[-1][0] + 1, "PROD-000", "once350@example.com", 1, "accepted")
+    assert orders.email_of(len(orders) - 1) == "once350@example.com"
+    assert len(orders.emails) == 110
+
+
+def test_cold_status_changes_in_place(tmp_path):
+    orders, cold = filled_store(10), ColdStore(str(tmp_path))
+    cold.append(orders.records(range(10)))
+    cold.set_status(3, CANCELLED)
+    assert cold.status_of(3) == CANCELLED
+    assert cold.values(3)[1] == "cancelled"
+    assert cold.status_of(4) == DELIVERED
+    cold.close()
+
+
+def test_view_stays_readable_after_appends_and_clear(tmp_path):
+    orders, cold = filled_store(20), ColdStore(str(tmp_path))
+    cold.append(orders.records(range(10)))
+    view = cold.view()
+
+    cold.append(orders.records(range(10, 20)))
+    assert len(view) == 10 and len(cold) == 20
+    # a status written after the view was taken is what the view reads
+    cold.set_status(2, CANCELLED)
+    assert view.values(2)[1] == "cancelled"
+
+    expected = orders.records(range(10))
+    expected[2] = (expected[2][0], CANCELLED, *expected[2][2:])
+    # unlinked, not truncated: the view keeps its pages
+    cold.clear()
+    assert len(cold) == 0
+    assert view.records(range(10)) == expected
+    cold.close()
+
+
+def test_each_store_gets_its_own_directory_on_first_append(tmp_path):
+    first, second = ColdStore(str(tmp_path)), ColdStore(str(tmp_path))
+    # nothing on disk until there is something to store
+    assert os.listdir(tmp_path) == []
+    assert list(first.newest_first()) == [] and first.row("ORD-0000000000000001") is None
+
+    first.append([(1, DELIVERED, "PROD-001", "a@example.com", 1)])
+    second.append([(1, DELIVERED, "PROD-002", "b@example.com", 2)])
+    assert first.directory != second.directory
+    assert first.values(0)[2] == "PROD-001" and second.values(0)[2] == "PROD-002"
+
+    for cold in (first, second):
+        cold.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_compacted_orders_are_served_from_the_cold_tier(server, call):
+    now = time.time()
+    with server.db_lock:
+        for i in range(5):
+            server.insert_order(old_key(i, now), "PROD-001", f"customer{i}@example.com", 1)
+        recent = order_ids.next_key()
+        server.insert_order(recent, "PROD-002", "recent@example.com", 2)
+
+    assert server.compact_orders(now) == 5
+    assert len(server.orders_db) == 1 and len(server.cold_db) == 5
+
+    cold_id = order_ids.format_key(old_key(3, now))
+    response, context = call("GetOrderStatus", order_pb2.OrderIdRequest(order_id=cold_id))
+    assert context.code() is None
+    assert (response.order_id, response.status, response.email) == (cold_id, "delivered", "customer3@example.com")
+
+    listing, _ = call("GetAllOrders", order_pb2.Empty())
+    assert [o.order_id for o in listing.orders] == [order_ids.format_key(recent)] + [
+        order_ids.format_key(old_key(i, now)) for i in reversed(range(5))
+    ]
+
+    # a page that starts in the hot tier and continues in the cold one
+    page, _ = call("ListOrders", order_pb2.ListOrdersRequest(limit=3))
+    assert [o.order_id for o in page.orders] == [o.order_id for o in listing.orders[:3]]
+    page, _ = call("ListOrders", order_pb2.ListOrdersRequest(limit=3, before=page.next_before))
+    assert [o.order_id for o in page.orders] == [o.order_id for o in listing.orders[3:]]
+    assert page.next_before == ""
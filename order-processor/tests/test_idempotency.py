@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+import order_pb2
+from idempotency import IdempotencyStore, KeyReused, StillRunning
+
+
+def begin_in_thread(store, key, fingerprint, timeout=5):
+    """begin() in another thread; the returned dict gets its result or exception"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = store.begin(key, fingerprint, timeout)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def test_duplicate_in_flight_waits_for_the_first_response():
+    store = IdempotencyStore()
+    assert store.begin("k", "order") is None
+
+    waiter, outcome = begin_in_thread(store, "k", "order")
+    time.sleep(0.05)
+    assert waiter.is_alive()
+
+    store.finish("k", "response")
+    waiter.join()
+    assert outcome == {"result": "response"}
+    # later duplicates get it straight away
+    assert store.begin("k", "order", timeout=0) == "response"
+
+
+def test_abandoned_key_goes_to_the_next_caller():
+    store = IdempotencyStore()
+    assert store.begin("k", "order") is None
+    waiter, outcome = begin_in_thread(store, "k", "order")
+    time.sleep(0.05)
+
+    store.abandon("k")
+    waiter.join()
+    # the waiter now runs the request itself
+    assert outcome == {"result": None}
+    store.finish("k", "second try")
+    assert store.begin("k", "order") == "second try"
+
+
+def test_key_reused_for_another_request():
+    store = IdempotencyStore()
+    store.begin("k", "order")
+    with pytest.raises(KeyReused):
+        store.begin("k", "other order")
+    store.finish("k", "response")
+    with pytest.raises(KeyReused):
+        store.begin("k", "other order")
+
+
+def test_duplicate_gives_up_after_its_timeout():
+    store = IdempotencyStore()
+    store.begin("k", "order")
+    with pytest.raises(StillRunning):
+        store.begin("k", "order", timeout=0.05)
+    with pytest.raises(StillRunning):
+        store.begin("k", "order", timeout=0)
+
+
+def test_keys_expire_and_only_finished_ones_are_evicted():
+    store = IdempotencyStore(max_size=2, ttl=0)
+    store.begin("a", "order")
+    store.finish("a", "response")
+    # ttl 0: gone, the key is free again
+    assert store.begin("a", "order") is None
+
+    store.ttl = 60
+    store.begin("b", "order")
+    store.finish("b", "response")
+    store.begin("c", "order")
+    # over max_size: "b" (finished) goes, "a" and "c" are still running
+    assert len(store) == 2
+    assert store.begin("b", "order") is None
+
+
+def order_request(key, quantity=1):
+    return order_pb2.OrderRequest(product_id="PROD-001", email="a@example.com", quantity=quantity, idempotency_key=key)
+
+
+def test_concurrent_duplicates_create_one_order(server, call):
+    order_ids = []
+    lock = threading.Lock()
+    start = threading.Barrier(8)
+
+    def place():
+        start.wait()
+        response, context = call("ProcessOrder", order_request("key-1"))
+        assert context.code() is None
+        with lock:
+            order_ids.append(response.order_id)
+
+    threads = [threading.Thread(target=place) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(order_ids) == 8 and len(set(order_ids)) == 1
+    assert len(server.orders_db) == 1
+
+    _, context = call("ProcessOrder", order_request("key-1", quantity=2))
+    assert context.code().name == "ALREADY_EXISTS"
+    assert len(server.orders_db) == 1
+
+
+def test_refused_order_is_not_stored(server, call):
+    server.stock_ledger.seed({"PROD-001": 0})
+    _, context = call("ProcessOrder", order_request("key-2"))
+    assert context.code().name == "FAILED_PRECONDITION"
+
+    server.stock_ledger.seed({"PROD-001": 5})
+    response, context = call("ProcessOrder", order_request("key-2"))
+    assert context.code() is None
+    assert response.order_id in server.orders_db
+    assert server.stock_ledger.available("PROD-001") == 4
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import order_ids
+
+
+def generate(threads, per_thread):
+    """Keys from threads running at once, in the order each thread got them"""
+    start = threading.Barrier(threads)
+    results = [None] * threads
+
+    def work(i):
+        start.wait()
+        results[i] = [order_ids.next_key() for _ in range(per_thread)]
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def test_keys_are_unique_and_increasing_per_thread():
+    results = generate(32, 500)
+    keys = [key for thread_keys in results for key in thread_keys]
+    assert len(set(keys)) == len(keys)
+    for thread_keys in results:
+        assert thread_keys == sorted(thread_keys)
+        assert len(set(thread_keys)) == len(thread_keys)
+
+
+def test_slots_are_reused_without_repeating_keys():
+    # more threads over time than there are slots, each slot passes through several of them
+    free_before = len(order_ids._free_slots)
+    keys = []
+    for _ in range(3):
+        for thread_keys in generate(free_before, 50):
+            keys.extend(thread_keys)
+    assert len(set(keys)) == len(keys)
+    assert len(order_ids._free_slots) == free_before
+
+
+def test_keys_follow_time_across_threads():
+    first = generate(1, 1)[0][0]
+    time.sleep(0.002)
+    # another thread, a later millisecond: a larger key whatever the slots
+    assert generate(1, 1)[0][0] > first
+
+
+def test_too_many_threads_at_once_is_an_error():
+    release = threading.Event()
+    free = len(order_ids._free_slots)
+    taken = threading.Barrier(free + 1)
+
+    def hold_slot():
+        order_ids.next_key()
+        taken.wait()
+        release.wait()
+
+    holders = [threading.Thread(target=hold_slot) for _ in range(free)]
+    for holder in holders:
+        holder.start()
+    taken.wait()
+    errors = []
+
+    def one_more():
+        try:
+            order_ids.next_key()
+        except RuntimeError as e:
+            errors.append(e)
+
+    try:
+        extra = threading.Thread(target=one_more)
+        extra.start()
+        extra.join()
+        assert len(errors) == 1
+    finally:
+        release.set()
+        for holder in holders:
+            holder.join()
+
+
+def test_format_parse_and_time_order():
+    earlier = order_ids.make(1760000000000, slot=5, sequence=3)
+    later = order_ids.make(1760000000001)
+    assert earlier < later
+    assert order_ids.format_key(earlier) < order_ids.format_key(later)
+    assert order_ids.parse(order_ids.format_key(earlier)) == earlier
+    assert order_ids.timestamp_ms(earlier) == 1760000000000
+    assert order_ids.first_key_at(1760000000001) <= later
+    assert order_ids.parse("ORD-123") is None
+    assert order_ids.parse("ORD-ZZZZZZZZZZZZZZZZ") is None
+    # one spelling per order: what format_key writes and nothing else
+    assert order_ids.parse("ORD-00000000000000AB") == 0xAB
+    for other in ("ORD-00000000000000ab", "ORD-00000000_00000AB", "ORD--000000000000001",
+                  "ORD-+000000000000001", "ORD- 00000000000000A", "ORD-00000000000000A "):
+        assert order_ids.parse(other) is None, other
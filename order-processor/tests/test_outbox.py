@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+
+import pytest
+
+import outbox
+from outbox import Outbox, OutboxRelay
+
+
+class Broker:
+    """Queues as lists; publishes stay invisible until tx_commit, like AMQP tx"""
+
+    def __init__(self):
+        self.queues = {}
+        self.fail_commits = 0
+        self.connections = 0
+        self.committed = threading.Event()
+
+    def connection(self):
+        self.connections += 1
+        return Connection(self)
+
+
+class Connection:
+    is_open = True
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def channel(self):
+        return Channel(self.broker)
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def close(self):
+        # an open transaction dies with its connection
+        self.is_open = False
+
+
+class Channel:
+    def __init__(self, broker):
+        self.broker = broker
+        self.pending = []
+
+    def queue_declare(self, queue, **kwargs):
+        self.broker.queues.setdefault(queue, [])
+
+    def exchange_declare(self, exchange, **kwargs):
+        self.broker.queues.setdefault(exchange, [])
+
+    def tx_select(self):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.pending.append((exchange or routing_key, json.loads(body)))
+
+    def tx_commit(self):
+        if self.broker.fail_commits:
+            self.broker.fail_commits -= 1
+            self.pending = []
+            raise ConnectionError("connection lost during commit")
+        for queue, body in self.pending:
+            self.broker.queues[queue].append(body)
+        self.pending = []
+        self.broker.committed.set()
+
+
+@pytest.fixture
+def relay_for():
+    relays = []
+
+    def start(events, broker):
+        relay = OutboxRelay(events, broker.connection, batch_size=10, linger=0)
+        relays.append(relay)
+        relay.start()
+        return relay
+
+    yield start
+    for relay in relays:
+        relay.stop()
+        relay.join(5)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def lane_queue(order_id, event_type):
+    return outbox.partition_queue(outbox.NOTIFICATION_LANES[event_type], outbox.partition_for(order_id))
+
+
+def test_committed_batch_leaves_the_outbox(relay_for):
+    events, broker = Outbox(), Broker()
+    events.add("ORD-0000000000000001", "a@example.com", "created")
+    events.add("ORD-0000000000000001", "a@example.com", "on delivery")
+    events.add("ORD-0000000000000002", "b@example.com", "cancelled")
+    relay_for(events, broker)
+
+    wait_until(lambda: len(events) == 0)
+    first = broker.queues[lane_queue("ORD-0000000000000001", "order_confirmation")]
+    assert [e["new_status"] for e in first if e["order_id"] == "ORD-0000000000000001"] == ["created"]
+    status = broker.queues[lane_queue("ORD-0000000000000001", "status_update")]
+    assert [e["new_status"] for e in status if e["order_id"] == "ORD-0000000000000001"] == ["on delivery"]
+    cancelled = broker.queues[lane_queue("ORD-0000000000000002", "order_cancellation")]
+    assert {"order_id": "ORD-0000000000000002", "email": "b@example.com", "type": "order_cancellation", "new_status": "cancelled"} in cancelled
+    # every status change also reaches the gateways' fanout, in order and without the email
+    assert broker.queues[outbox.ORDER_EVENTS_EXCHANGE] == [
+        {"order_id": "ORD-0000000000000001", "new_status": "created"},
+        {"order_id": "ORD-0000000000000001", "new_status": "on delivery"},
+        {"order_id": "ORD-0000000000000002", "new_status": "cancelled"},
+    ]
+
+
+def test_failed_commit_keeps_the_batch_for_the_next_connection(relay_for):
+    events, broker = Outbox(), Broker()
+    broker.fail_commits = 1
+    for status in ("created", "on delivery", "delivered"):
+        events.add("ORD-0000000000000001", "a@example.com", status)
+    relay_for(events, broker)
+
+    wait_until(lambda: broker.connections == 1 and broker.fail_commits == 0)
+    # nothing was acked: the outbox still holds the whole batch, the broker has none of it
+    assert len(events) == 3
+    assert broker.queues[outbox.ORDER_EVENTS_EXCHANGE] == []
+
+    # the relay reconnects after its backoff and publishes the batch again, in order
+    wait_until(lambda: len(events) == 0)
+    assert broker.connections == 2
+    assert [e["new_status"] for e in broker.queues[outbox.ORDER_EVENTS_EXCHANGE]] == ["created", "on delivery", "delivered"]
+
+
+def test_wait_batch_leaves_events_queued_until_acked():
+    events = Outbox()
+    for i in range(5):
+        events.add(f"ORD-000000000000000{i}", "a@example.com", "created")
+
+    batch = events.wait_batch(3, linger=0)
+    assert [event["order_id"] for event, _ in batch] == [f"ORD-000000000000000{i}" for i in range(3)]
+    assert len(events) == 5
+    events.ack(len(batch))
+    assert [event["order_id"] for event, _ in events.wait_batch(10, linger=0)] == ["ORD-0000000000000003", "ORD-0000000000000004"]
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+
+import pytest
+
+import order_ids
+import order_pb2
+import stock
+from stock import OutOfStock, StockLedger
+
+
+def run_threads(count, target):
+    start = threading.Barrier(count)
+
+    def work():
+        start.wait()
+        target()
+
+    threads = [threading.Thread(target=work) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_reservations_never_oversell():
+    ledger = StockLedger(shards=4)
+    ledger.seed({"PROD-001": 1000})
+    reserved = []
+
+    def buy():
+        got = 0
+        while True:
+            try:
+                ledger.reserve("PROD-001", 3)
+            except OutOfStock:
+                break
+            got += 3
+        reserved.append(got)
+
+    run_threads(16, buy)
+    # 1000 // 3 orders fit, the last unit stays
+    assert sum(reserved) == 999
+    assert ledger.available("PROD-001") == 1
+
+
+def test_concurrent_reserve_and_release_balance_out():
+    ledger = StockLedger(shards=8)
+    ledger.seed({"PROD-001": 50})
+    failures = []
+
+    def order_and_cancel():
+        for _ in range(500):
+            try:
+                ledger.reserve("PROD-001", 2)
+            except OutOfStock:
+                failures.append(1)
+                continue
+            ledger.release("PROD-001", 2)
+
+    run_threads(16, order_and_cancel)
+    # at most 16 reservations of 2 are out at once, 50 always covers them
+    assert failures == []
+    assert ledger.available("PROD-001") == 50
+    assert ledger.levels() == {"PROD-001": 50}
+
+
+def test_reservation_larger_than_one_shard_takes_from_all():
+    ledger = StockLedger(shards=4)
+    ledger.seed({"PROD-001": 10})
+    ledger.reserve("PROD-001", 9)
+    assert ledger.available("PROD-001") == 1
+    with pytest.raises(OutOfStock):
+        ledger.reserve("PROD-001", 2)
+    assert ledger.available("PROD-001") == 1
+
+
+def test_untracked_products_never_run_out():
+    ledger = StockLedger()
+    ledger.reserve("PROD-404", 10 ** 9)
+    ledger.release("PROD-404", 1)
+    assert not ledger.tracked("PROD-404")
+    assert ledger.available("PROD-404") is None
+
+
+def test_levels_from_a_catalog_file(tmp_path):
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps([{"id": "PROD-001", "stock": 5}, {"id": "PROD-002"}]))
+    assert stock.load_levels(str(path)) == {"PROD-001": 5}
+    assert stock.load_levels(str(path), default=100) == {"PROD-001": 5, "PROD-002": 100}
+
+
+def place(call, quantity=3):
+    response, context = call("ProcessOrder", order_pb2.OrderRequest(product_id="PROD-001", email="a@example.com", quantity=quantity))
+    assert context.code() is None
+    return response.order_id
+
+
+def cancel_concurrently(call, order_id, threads=8):
+    run_threads(threads, lambda: call("CancelOrder", order_pb2.OrderIdRequest(order_id=order_id)))
+
+
+def test_process_order_reserves_and_refuses_past_stock(server, call):
+    server.stock_ledger.seed({"PROD-001": 5})
+    place(call, 3)
+    assert server.stock_ledger.available("PROD-001") == 2
+
+    _, context = call("ProcessOrder", order_pb2.OrderRequest(product_id="PROD-001", email="a@example.com", quantity=3))
+    assert context.code().name == "FAILED_PRECONDITION"
+    assert server.stock_ledger.available("PROD-001") == 2
+    assert len(server.orders_db) == 1
+
+
+def test_cancel_releases_a_hot_order_once(server, call):
+    server.stock_ledger.seed({"PROD-001": 10})
+    order_id = place(call, 3)
+
+    cancel_concurrently(call, order_id)
+    call("CancelOrder", order_pb2.OrderIdRequest(order_id=order_id))
+    assert server.stock_ledger.available("PROD-001") == 10
+
+
+def insert_old_order(server, quantity, now):
+    # placed an hour ago (its stock reserved then), delivered since
+    key = order_ids.make(int((now - 3600) * 1000))
+    server.stock_ledger.reserve("PROD-001", quantity)
+    with server.db_lock:
+        server.insert_order(key, "PROD-001", "a@example.com", quantity)
+    return order_ids.format_key(key)
+
+
+def test_cancelling_a_delivered_hot_order_releases_nothing(server, call):
+    server.stock_ledger.seed({"PROD-001": 10})
+    # the sweeper has not marked it delivered yet, CancelOrder catches up first
+    order_id = insert_old_order(server, 4, time.time())
+
+    response, _ = call("CancelOrder", order_pb2.OrderIdRequest(order_id=order_id))
+    assert response.status == "cancelled"
+    assert server.stock_ledger.available("PROD-001") == 6
+
+
+def test_cancelling_a_delivered_cold_order_releases_nothing(server, call):
+    server.stock_ledger.seed({"PROD-001": 10})
+    now = time.time()
+    order_id = insert_old_order(server, 4, now)
+    assert server.compact_orders(now) == 1
+    assert server.cold_db.row(order_id) is not None
+
+    cancel_concurrently(call, order_id)
+    response, _ = call("CancelOrder", order_pb2.OrderIdRequest(order_id=order_id))
+    assert response.status == "cancelled"
+    assert server.stock_ledger.available("PROD-001") == 6
+    assert server.orders_db.status_counts()["cancelled"] == 1
@@ -0,0 +1,247 @@
+"""
+Minimal distributed tracing shared by the Python services (keep the copies in
+api-gateway, order-processor and notification-service identical).
+
+Context travels as a W3C `traceparent` header - HTTP/SOAP headers, gRPC
+metadata and AMQP message headers. Sampling is decided once at the root span
+and inherited downstream; unsampled spans only carry ids, nothing is exported.
+Sampled spans are written as JSON lines by a background thread, see
+tools/trace_report.py for the critical path breakdown.
+"""
+import collections
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+try:
+    import grpc
+except ImportError:
+    # notification-service has no gRPC
+    grpc = None
+
+logger = logging.getLogger("tracing")
+
+SERVICE_NAME = os.getenv("SERVICE_NAME", "unknown")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_FILE = os.getenv("TRACE_FILE", f"traces/{SERVICE_NAME}.jsonl")
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class SpanContext:
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id, span_id, sampled):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+class Span(SpanContext):
+    __slots__ = ("name", "parent_id", "start", "attrs")
+
+    def __init__(self, name, trace_id, parent_id, sampled, attrs):
+        super().__init__(trace_id, f"{random.getrandbits(64):016x}", sampled)
+        self.name = name
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.start = time.time()
+
+    def set(self, key, value):
+        if self.sampled:
+            self.attrs[key] = value
+
+    def finish(self):
+        if self.sampled:
+            _exporter.export(self, time.time())
+
+
+def parse_traceparent(header):
+    """SpanContext from a traceparent header, None when missing or malformed"""
+    if not header:
+        return None
+    if isinstance(header, bytes):
+        header = header.decode()
+    parts = header.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return SpanContext(parts[1], parts[2], parts[3] == "01")
+
+
+def current_span():
+    return _current.get()
+
+
+def start_span(name, parent=None, **attrs):
+    """New span under parent (or the current span); a root span makes the sampling decision"""
+    parent = parent or _current.get()
+    if parent is None:
+        return Span(name, f"{random.getrandbits(128):032x}", None, random.random() < TRACE_SAMPLE_RATE, attrs)
+    return Span(name, parent.trace_id, parent.span_id, parent.sampled, attrs)
+
+
+class span:
+    """with span("soap/validateProduct"): ... - started, made current and finished"""
+
+    def __init__(self, name, parent=None, **attrs):
+        self._span = start_span(name, parent, **attrs)
+
+    def __enter__(self):
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        if exc is not None:
+            self._span.set("error", repr(exc))
+        self._span.finish()
+
+
+def inject(headers=None):
+    """Adds the traceparent of the current span to a headers dict"""
+    headers = {} if headers is None else headers
+    current = _current.get()
+    if current is not None:
+        headers["traceparent"] = current.traceparent
+    return headers
+
+
+class SpanExporter(threading.Thread):
+    """Appends finished spans to TRACE_FILE, drops instead of blocking when it falls behind"""
+
+    def __init__(self, path=TRACE_FILE, max_pending=10000):
+        super().__init__(name="span-exporter", daemon=True)
+        self.path = path
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._launched = False
+        self._lock = threading.Lock()
+
+    def export(self, span, end):
+        if not self._launched:
+            with self._lock:
+                if not self._launched:
+                    self._launched = True
+                    self.start()
+        try:
+            self._queue.put_nowait((span, end))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a") as out:
+            while True:
+                span, end = self._queue.get()
+                out.write(json.dumps({
+                    "trace_id": span.trace_id,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "service": SERVICE_NAME,
+                    "name": span.name,
+                    "start": span.start,
+                    "duration": end - span.start,
+                    "attrs": span.attrs,
+                }) + "\n")
+                if self._queue.empty():
+                    out.flush()
+
+
+_exporter = SpanExporter()
+
+
+class TracingMiddleware:
+    """ASGI middleware - root span per HTTP request, continues an incoming traceparent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        parent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                parent = parse_traceparent(value)
+                break
+
+        with span(f"{scope['method']} {scope['path']}", parent=parent) as request_span:
+            await self.app(scope, receive, send)
+            route = scope.get("route")
+            if route is not None:
+                request_span.name = f"{scope['method']} {route.path}"
+
+
+if grpc is not None:
+    class _CallDetails(
+        collections.namedtuple("_CallDetails", ("method", "timeout", "metadata", "credentials", "wait_for_ready", "compression")),
+        grpc.ClientCallDetails
+    ):
+        pass
+
+    class GrpcClientTracingInterceptor(grpc.UnaryUnaryClientInterceptor):
+        """Client span per call, traceparent goes out as gRPC metadata"""
+
+        def intercept_unary_unary(self, continuation, client_call_details, request):
+            call_span = start_span(f"grpc.client/{client_call_details.method.rsplit('/', 1)[-1]}")
+            metadata = list(client_call_details.metadata or [])
+            metadata.append(("traceparent", call_span.traceparent))
+            details = _CallDetails(
+                client_call_details.method, client_call_details.timeout, metadata,
+                client_call_details.credentials, client_call_details.wait_for_ready,
+                client_call_details.compression
+            )
+            call = continuation(details, request)
+            call.add_done_callback(lambda _: call_span.finish())
+            return call
+
+    class GrpcServerTracingInterceptor(grpc.ServerInterceptor):
+        """Server span per unary RPC, parented by the caller's traceparent metadata"""
+
+        def __init__(self):
+            self._handlers = {}
+
+        def intercept_service(self, continuation, handler_call_details):
+            method = handler_call_details.method
+            wrapped = self._handlers.get(method)
+            if wrapped is None:
+                handler = continuation(handler_call_details)
+                if handler is None or handler.unary_unary is None:
+                    return handler
+                wrapped = self._handlers[method] = self._wrap(f"grpc.server/{method.rsplit('/', 1)[-1]}", handler)
+            return wrapped
+
+        @staticmethod
+        def _wrap(name, handler):
+            inner = handler.unary_unary
+
+            def traced(request, context):
+                parent = None
+                for key, value in context.invocation_metadata():
+                    if key == "traceparent":
+                        parent = parse_traceparent(value)
+                        break
+                with span(name, parent=parent) as rpc_span:
+                    response = inner(request, context)
+                    code = context.code()
+                    if code is not None:
+                        rpc_span.set("code", code.name)
+                    return response
+
+            return grpc.unary_unary_rpc_method_handler(
+                traced,
+                request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer
+            )
@@ -0,0 +1,43 @@
+package com.validator;
+
+import java.util.Collections;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+
+/**
+ * One version of the product catalog: the products in file order and a hash
+ * index by ID. Never modified, a reload builds a new one.
+ */
+public final class Catalog {
+
+    private final long version;
+    private final Product[] products;
+    private final Map<String, Product> byId;
+
+    public Catalog(long version, List<Product> products) {
+        this.version = version;
+        this.products = products.toArray(new Product[0]);
+        Map<String, Product> index = new HashMap<>(products.size() * 4 / 3 + 1);
+        for (Product product : products) {
+            index.put(product.getId(), product);
+        }
+        this.byId = Collections.unmodifiableMap(index);
+    }
+
+    public static Catalog empty() {
+        return new Catalog(0, Collections.emptyList());
+    }
+
+    public long getVersion() { return version; }
+
+    public int size() { return products.length; }
+
+    public boolean contains(String productId) {
+        return productId != null && byId.containsKey(productId);
+    }
+
+    public Product[] getProducts() {
+        return products.clone();
+    }
+}
@@ -0,0 +1,102 @@
+package com.validator;
+
+import com.fasterxml.jackson.core.type.TypeReference;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import java.io.IOException;
+import java.nio.file.Files;
+import java.nio.file.NoSuchFileException;
+import java.nio.file.Path;
+import java.util.List;
+import java.util.concurrent.Executors;
+import java.util.concurrent.ScheduledExecutorService;
+import java.util.concurrent.TimeUnit;
+import java.util.logging.Logger;
+
+/**
+ * Keeps the current Catalog of a products.json file. The file's modification
+ * time and size are polled; when either changed the file is parsed into a new
+ * Catalog that replaces the current one with a single volatile write, so a call
+ * sees the old or the new catalog, never a mix of both. A file that does not
+ * parse (an editor half way through writing it) leaves the current one in place.
+ *
+ * Polling instead of a WatchService: docker-compose bind-mounts the single
+ * file, and inotify does not see host-side changes on every kind of mount.
+ */
+public class CatalogLoader {
+
+    private static final Logger logger = Logger.getLogger(CatalogLoader.class.getName());
+
+    private final Path path;
+    private final ObjectMapper mapper = new ObjectMapper();
+    private volatile Catalog catalog = Catalog.empty();
+
+    // the file state last seen by reloadIfChanged, loaded or not
+    private long seenModified = -1;
+    private long seenSize = -1;
+
+    public CatalogLoader(Path path) {
+        this.path = path;
+    }
+
+    public Catalog current() {
+        return catalog;
+    }
+
+    /** Loads the file when it changed since the last look, returns whether the catalog was replaced */
+    public synchronized boolean reloadIfChanged() {
+        long modified;
+        long size;
+        try {
+            modified = Files.getLastModifiedTime(path).toMillis();
+            size = Files.size(path);
+        } catch (NoSuchFileException e) {
+            if (seenModified != 0) {
+                logger.warning("products.json not found at " + path.toAbsolutePath() + ", keeping catalog version " + catalog.getVersion());
+                seenModified = 0;
+                seenSize = 0;
+            }
+            return false;
+        } catch (IOException e) {
+            logger.warning("Cannot stat " + path + ": " + e.getMessage());
+            return false;
+        }
+        if (modified == seenModified && size == seenSize) {
+            return false;
+        }
+        seenModified = modified;
+        seenSize = size;
+
+        try {
+            List<Product> products = mapper.readValue(path.toFile(), new TypeReference<List<Product>>(){});
+            Catalog loaded = new Catalog(catalog.getVersion() + 1, products);
+            catalog = loaded;
+            logger.info("Loaded " + loaded.size() + " products from JSON, catalog version " + loaded.getVersion());
+            return true;
+        } catch (IOException e) {
+            // retried once the file changes again
+            logger.severe("Error reading JSON, keeping catalog version " + catalog.getVersion() + ": " + e.getMessage());
+            return false;
+        }
+    }
+
+    /** Loads the file now, then checks it every pollMillis on a daemon thread (0: never again) */
+    public void start(long pollMillis) {
+        reloadIfChanged();
+        if (pollMillis <= 0) {
+            return;
+        }
+        ScheduledExecutorService poller = Executors.newSingleThreadScheduledExecutor(task -> {
+            Thread thread = new Thread(task, "catalog-poller");
+            thread.setDaemon(true);
+            return thread;
+        });
+        poller.scheduleWithFixedDelay(() -> {
+            try {
+                reloadIfChanged();
+            } catch (RuntimeException e) {
+                // an exception would cancel the schedule
+                logger.severe("Catalog reload failed: " + e);
+            }
+        }, pollMillis, pollMillis, TimeUnit.MILLISECONDS);
+    }
+}
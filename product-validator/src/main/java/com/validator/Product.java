@@ -1,7 +1,10 @@
 package com.validator;
 
+import com.fasterxml.jackson.annotation.JsonIgnoreProperties;
 import java.io.Serializable;
 
+// products.json may carry fields for other services (order-processor's "stock")
+@JsonIgnoreProperties(ignoreUnknown = true)
 public class Product implements Serializable {
     private String id;
     private String name;
@@ -10,6 +10,14 @@ public interface ProductValidator {
     @WebMethod
     boolean validateProduct(@WebParam(name = "productId") String productId);
 
+    // one answer per ID, in request order, all from the same catalog version
+    @WebMethod
+    boolean[] validateProducts(@WebParam(name = "productIds") String[] productIds);
+
     @WebMethod
     Product[] getAvailableProducts();
+
+    // goes up by one on every reload of products.json
+    @WebMethod
+    long getCatalogVersion();
 }
\ No newline at end of file
@@ -1,52 +1,57 @@
 package com.validator;
 
-import com.fasterxml.jackson.databind.ObjectMapper;
-import com.fasterxml.jackson.core.type.TypeReference;
 import jakarta.jws.WebService;
-import java.io.File;
-import java.io.IOException;
-import java.util.Collections;
-import java.util.List;
+import java.nio.file.Paths;
 import java.util.logging.Logger;
 
 @WebService(endpointInterface = "com.validator.ProductValidator")
 public class ProductValidatorImpl implements ProductValidator {
     
     private static final Logger logger = Logger.getLogger(ProductValidatorImpl.class.getName());
-    private List<Product> productsCache;
+    // path inside the container
+    private static final String PRODUCTS_FILE = env("PRODUCTS_FILE", "/app/data/products.json");
+    // how often products.json is checked for changes, 0 loads it once
+    private static final long CATALOG_POLL_MS = Long.parseLong(env("CATALOG_POLL_MS", "2000"));
+
+    private final CatalogLoader catalog;
     
     public ProductValidatorImpl() {
-        loadProducts();
+        catalog = new CatalogLoader(Paths.get(PRODUCTS_FILE));
+        catalog.start(CATALOG_POLL_MS);
+        logger.info("Catalog from " + PRODUCTS_FILE + ", checked every " + CATALOG_POLL_MS + " ms");
     }
 
-
-    private void loadProducts() {
-        ObjectMapper mapper = new ObjectMapper();
-        try {
-            // path inside the container
-            File file = new File("/app/data/products.json");
-            if (file.exists()) {
-                productsCache = mapper.readValue(file, new TypeReference<List<Product>>(){});
-                logger.info("Loaded " + productsCache.size() + " products from JSON");
-            } else {
-                logger.warning("products.json not found at " + file.getAbsolutePath());
-                productsCache = Collections.emptyList();
-            }
-        } catch (IOException e) {
-            logger.severe("Error reading JSON: " + e.getMessage());
-            productsCache = Collections.emptyList();
-        }
+    private static String env(String name, String fallback) {
+        String value = System.getenv(name);
+        return value == null || value.isEmpty() ? fallback : value;
     }
     
     @Override
     public boolean validateProduct(String productId) {
-        // availability check against cached products
-        return productsCache.stream()
-                .anyMatch(p -> p.getId().equals(productId));
+        // hash lookup in the current catalog version
+        return catalog.current().contains(productId);
+    }
+
+    @Override
+    public boolean[] validateProducts(String[] productIds) {
+        if (productIds == null) {
+            return new boolean[0];
+        }
+        Catalog current = catalog.current();
+        boolean[] valid = new boolean[productIds.length];
+        for (int i = 0; i < productIds.length; i++) {
+            valid[i] = current.contains(productIds[i]);
+        }
+        return valid;
     }
 
     @Override
     public Product[] getAvailableProducts() {
-        return productsCache.toArray(new Product[0]);
+        return catalog.current().getProducts();
+    }
+
+    @Override
+    public long getCatalogVersion() {
+        return catalog.current().getVersion();
     }
-}
\ No newline at end of file
+}
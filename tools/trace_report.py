@@ -0,0 +1,125 @@
+"""
+Offline critical path report for the span files written by tracing.py.
+
+    python tools/trace_report.py traces/*.jsonl
+    python tools/trace_report.py traces/*.jsonl --slowest 5 --route "POST /orders"
+
+For every trace the critical path of the root span is walked backwards from its
+end: the child that finished last is on the path, then the child that finished
+last before that child started, and so on. Time not covered by a child is the
+span's own (self) time. Spans that end after the root (the notification
+consumed from RabbitMQ) are reported separately as async tail.
+"""
+import argparse
+import json
+import statistics
+import sys
+from collections import defaultdict
+
+
+def load_spans(paths):
+    traces = defaultdict(dict)
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                span = json.loads(line)
+                span["end"] = span["start"] + span["duration"]
+                traces[span["trace_id"]][span["span_id"]] = span
+    return traces
+
+
+def label(span):
+    return f"{span['service']}:{span['name']}"
+
+
+def critical_path(span, children, until=None):
+    """{label: seconds} of span's critical path, clipped to `until`"""
+    end = min(span["end"], until) if until is not None else span["end"]
+    breakdown = defaultdict(float)
+    cursor = end
+    candidates = sorted(
+        (c for c in children.get(span["span_id"], []) if c["start"] < end),
+        key=lambda c: min(c["end"], end),
+        reverse=True
+    )
+    for child in candidates:
+        child_end = min(child["end"], cursor)
+        if child_end <= child["start"] or child["start"] >= cursor:
+            continue
+        breakdown[label(span)] += cursor - child_end
+        for name, seconds in critical_path(child, children, until=child_end).items():
+            breakdown[name] += seconds
+        cursor = child["start"]
+    breakdown[label(span)] += max(0.0, cursor - span["start"])
+    return breakdown
+
+
+def analyse(trace):
+    children = defaultdict(list)
+    roots = []
+    for span in trace.values():
+        if span["parent_id"] in trace:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+    root = min(roots, key=lambda s: s["start"])
+    path = critical_path(root, children)
+    tail = [s for s in trace.values() if s["end"] > root["end"] and s is not root]
+    return root, path, tail
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="span files (jsonl)")
+    parser.add_argument("--route", help="only traces whose root span has this name, e.g. 'POST /orders'")
+    parser.add_argument("--slowest", type=int, default=3, help="print the N slowest traces in detail")
+    args = parser.parse_args(argv)
+
+    results = []
+    for trace in load_spans(args.files).values():
+        root, path, tail = analyse(trace)
+        if args.route and root["name"] != args.route:
+            continue
+        results.append((root, path, tail))
+
+    if not results:
+        print("no traces found")
+        return 1
+
+    durations = [root["duration"] for root, _, _ in results]
+    print(f"{len(results)} traces, root duration p50={pct(durations, 0.5) * 1000:.1f}ms "
+          f"p95={pct(durations, 0.95) * 1000:.1f}ms p99={pct(durations, 0.99) * 1000:.1f}ms")
+
+    # where the time goes on the critical path, overall and for the tail (>= p95) traces
+    threshold = pct(durations, 0.95)
+    for title, selected in (("all traces", results), (f"tail traces (>= {threshold * 1000:.1f}ms)", [r for r in results if r[0]["duration"] >= threshold])):
+        shares = defaultdict(list)
+        for root, path, _ in selected:
+            for name, seconds in path.items():
+                shares[name].append(seconds)
+        print(f"\ncritical path, {title}:")
+        print(f"  {'hop':<55} {'mean ms':>9} {'p99 ms':>9} {'share':>7}")
+        total = sum(sum(v) for v in shares.values()) or 1
+        for name, values in sorted(shares.items(), key=lambda kv: -sum(kv[1])):
+            print(f"  {name:<55} {statistics.mean(values) * 1000:>9.2f} {pct(values, 0.99) * 1000:>9.2f} {sum(values) / total:>7.1%}")
+
+    print(f"\n{args.slowest} slowest traces:")
+    for root, path, tail in sorted(results, key=lambda r: -r[0]["duration"])[:args.slowest]:
+        print(f"  {root['trace_id']} {root['name']} {root['duration'] * 1000:.1f}ms")
+        for name, seconds in sorted(path.items(), key=lambda kv: -kv[1]):
+            print(f"    {name:<55} {seconds * 1000:>9.2f}ms")
+        for span in sorted(tail, key=lambda s: s["start"]):
+            print(f"    async {label(span):<49} +{(span['end'] - root['end']) * 1000:.1f}ms after response")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())